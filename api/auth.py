@@ -8,6 +8,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from config import DEFAULT_TIER, DEFAULT_PRIORITY
+
 API_KEY_NAME = "X-API-KEY"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=False)
 
@@ -21,7 +23,10 @@ def load_api_from_env()-> dict:
         keys[hashlib.sha256(apiKey.encode()).hexdigest()] = {
             "name": os.getenv(f"API_KEY_NAME_{i}", f"User {i}"),
             "email": os.getenv(f"API_KEY_EMAIL_{i}", f"User{i}@example.com"),
-            "active": os.getenv(f"API_KEY_ACTIVE_{i}", "true").lower() == "true"
+            "active": os.getenv(f"API_KEY_ACTIVE_{i}", "true").lower() == "true",
+            "tier": os.getenv(f"API_KEY_TIER_{i}", DEFAULT_TIER).lower(),
+            "priority": os.getenv(f"API_KEY_PRIORITY_{i}", DEFAULT_PRIORITY).lower(),
+            "admin": os.getenv(f"API_KEY_ADMIN_{i}", "false").lower() == "true"
         }
         i += 1
     return keys
@@ -67,12 +72,35 @@ async def get_api_key(api_key_header: Optional[str] = Security(api_key_header))
     return api_key_header
 
 
-def add_api_key(api_key: str, name: str, email: str) -> bool:
+async def get_admin_api_key(api_key_header: Optional[str] = Security(api_key_header)) -> str:
+    user_info = verify_api_key(api_key_header)
+    if not user_info.get("admin", False):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This endpoint requires an admin API key.",
+        )
+    return api_key_header
+
+
+def get_api_key_tier(api_key: str) -> str:
+    user_info = VALID_API_KEYS.get(hash_api_key(api_key), {})
+    return user_info.get("tier", DEFAULT_TIER)
+
+
+def get_api_key_priority(api_key: str) -> str:
+    user_info = VALID_API_KEYS.get(hash_api_key(api_key), {})
+    return user_info.get("priority", DEFAULT_PRIORITY)
+
+
+def add_api_key(api_key: str, name: str, email: str, tier: str = DEFAULT_TIER,
+                priority: str = DEFAULT_PRIORITY) -> bool:
     api_key_hash = hash_api_key(api_key)
     VALID_API_KEYS[api_key_hash] = {
         "name": name,
         "email": email,
-        "active": True
+        "active": True,
+        "tier": tier,
+        "priority": priority
     }
     return True
 
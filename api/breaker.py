@@ -0,0 +1,228 @@
+"""
+Circuit breaker por fuente de navegador (OFAC, ICIJ Offshore Leaks).
+
+Cuando una fuente empieza a pedir verificación humana o a fallar, cada búsqueda
+siguiente igual lanzaría Chromium, esperaría todas las pausas y fallaría (y un
+captcha se agrava con más tráfico). El breaker tiene tres estados:
+
+- closed: las búsquedas pasan; se cuentan fallas seguidas y la tasa de error.
+- open: se responde sin lanzar el navegador, con el último resultado guardado
+  de la misma búsqueda o con un error, hasta que vence el plazo.
+- half_open: pasa una sola búsqueda de prueba. Si sale bien se cierra; si
+  falla se abre de nuevo por el doble de tiempo (hasta BREAKER_MAX_OPEN_SECONDS).
+
+Un captcha lo abre de inmediato por BREAKER_CHALLENGE_OPEN_SECONDS; las fallas
+y timeouts por BREAKER_OPEN_SECONDS. El estado es por proceso, como las cuotas
+de memoria y las métricas.
+"""
+import math
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from api.cache import TTLCache
+from api.metrics import circuit_rejections
+from config import (
+    BREAKER_ENABLED,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_ERROR_RATE,
+    BREAKER_MIN_REQUESTS,
+    BREAKER_WINDOW,
+    BREAKER_OPEN_SECONDS,
+    BREAKER_CHALLENGE_OPEN_SECONDS,
+    BREAKER_MAX_OPEN_SECONDS,
+    BREAKER_FALLBACK_TTL,
+    BREAKER_FALLBACK_MAX,
+    SEARCH_SOURCE_TIMEOUT
+)
+
+STATES = ("closed", "half_open", "open")
+# Una búsqueda de prueba que no informó resultado en este plazo (p. ej. se cayó el
+# worker del lote) se da por perdida y se deja pasar otra
+PROBE_LEASE = SEARCH_SOURCE_TIMEOUT * 2
+
+# Último resultado exitoso de cada búsqueda, para responder mientras el breaker está abierto
+fallbacks = TTLCache("breaker-fallback", BREAKER_FALLBACK_TTL, max_entries=BREAKER_FALLBACK_MAX)
+
+
+class CircuitOpen(Exception):
+    """La fuente tiene el breaker abierto: no se lanza el navegador"""
+
+    def __init__(self, source: str, retry_after: int, reason: Optional[str],
+                 fallback: Optional[Tuple[float, List[Dict]]] = None):
+        self.source = source
+        self.retry_after = retry_after
+        self.reason = reason
+        # (momento en que se guardó, resultados crudos) o None
+        self.fallback = fallback
+        super().__init__(f"{source} circuit open, retry in {retry_after} seconds")
+
+
+def _fallback_key(source: str, query: str) -> Tuple[str, str]:
+    return source, " ".join(query.split()).casefold()
+
+
+def _summary(error: str) -> str:
+    # Los errores de Playwright traen varias líneas: en el estado queda la primera
+    return (error or "").strip().splitlines()[0] if (error or "").strip() else "unknown error"
+
+
+def remember(source: str, query: str, items: List[Dict]):
+    """Guarda el resultado de una búsqueda exitosa (llamar desde el event loop)"""
+    fallbacks.set(_fallback_key(source, query), (time.time(), items))
+
+
+class CircuitBreaker:
+    def __init__(self, source: str):
+        self.source = source
+        self.state = "closed"
+        self.reason: Optional[str] = None
+        self.opened_at: Optional[float] = None
+        self.open_until = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self.consecutive_failures = 0
+        # Reaperturas seguidas sin una prueba exitosa: duplican el plazo
+        self._backoff = 0
+        self._probe_started: Optional[float] = None
+        # (momento, falló) de las búsquedas dentro de BREAKER_WINDOW
+        self._window: deque = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        while self._window and now - self._window[0][0] > BREAKER_WINDOW:
+            self._window.popleft()
+
+    def _error_rate(self, now: float) -> Tuple[float, int]:
+        self._trim(now)
+        total = len(self._window)
+        return (sum(1 for _, failed in self._window if failed) / total if total else 0.0), total
+
+    def _open(self, reason: str, base: float):
+        now = time.monotonic()
+        seconds = min(base * 2 ** self._backoff, BREAKER_MAX_OPEN_SECONDS)
+        # Con jitter para que varios workers no prueben la fuente a la vez
+        self.open_until = now + seconds * random.uniform(0.9, 1.1)
+        self.opened_at = time.time()
+        self.state = "open"
+        self.reason = reason
+        self.trips += 1
+        self._backoff += 1
+        self._probe_started = None
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.open_until - time.monotonic()))
+
+    def allow(self) -> Tuple[bool, bool]:
+        """(puede pasar, es la búsqueda de prueba)"""
+        if not BREAKER_ENABLED:
+            return True, False
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "closed":
+                return True, False
+            if self.state == "open":
+                if now < self.open_until:
+                    return False, False
+                self.state = "half_open"
+            if self._probe_started is not None and now - self._probe_started < PROBE_LEASE:
+                return False, False
+            self._probe_started = now
+            return True, True
+
+    def check(self, query: str) -> bool:
+        """Lanza CircuitOpen si la búsqueda no puede pasar; devuelve si es la de prueba"""
+        allowed, probe = self.allow()
+        if not allowed:
+            with self._lock:
+                self.rejected += 1
+                retry_after = self.retry_after() if self.state == "open" else 1
+                reason = self.reason
+            circuit_rejections.inc(source=self.source)
+            raise CircuitOpen(self.source, retry_after, reason, fallbacks.get(_fallback_key(self.source, query)))
+        return probe
+
+    def release(self, probe: bool):
+        """La búsqueda de prueba terminó sin resultado (cancelada o sin lugar en el pool)"""
+        with self._lock:
+            if probe and self.state == "half_open":
+                self._probe_started = None
+
+    def record_success(self, probe: bool = False):
+        """Solo la búsqueda de prueba cierra el breaker: las que ya estaban en curso al abrirse no cuentan"""
+        with self._lock:
+            if self.state == "open" or (self.state == "half_open" and not probe):
+                return
+            self._window.append((time.monotonic(), False))
+            self.consecutive_failures = 0
+            if self.state == "half_open":
+                self.state = "closed"
+                self.reason = None
+                self._backoff = 0
+                self._probe_started = None
+                # La ventana anterior era del corte: empieza de nuevo
+                self._window.clear()
+
+    def record_failure(self, error: str, probe: bool = False):
+        """En half_open solo la búsqueda de prueba reabre el breaker; las que ya estaban en curso quedan en la ventana"""
+        error = _summary(error)
+        with self._lock:
+            now = time.monotonic()
+            self._window.append((now, True))
+            if self.state == "half_open" and not probe:
+                return
+            self.consecutive_failures += 1
+            if self.state == "half_open":
+                self._open(f"Probe failed: {error}", BREAKER_OPEN_SECONDS)
+                return
+            if self.state == "open":
+                return
+            rate, total = self._error_rate(now)
+            if self.consecutive_failures >= BREAKER_FAILURE_THRESHOLD:
+                self._open(f"{self.consecutive_failures} consecutive failures, last: {error}", BREAKER_OPEN_SECONDS)
+            elif total >= BREAKER_MIN_REQUESTS and rate > BREAKER_ERROR_RATE:
+                self._open(f"Error rate {rate:.0%} over the last {total} searches, last: {error}", BREAKER_OPEN_SECONDS)
+
+    def record_challenge(self, error: str, probe: bool = False):
+        with self._lock:
+            self._window.append((time.monotonic(), True))
+            if self.state == "half_open" and not probe:
+                return
+            self.consecutive_failures += 1
+            if self.state != "open":
+                self._open(error, BREAKER_CHALLENGE_OPEN_SECONDS)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            rate, total = self._error_rate(now)
+            return {
+                "state": self.state,
+                "reason": self.reason,
+                "opened_at": datetime.fromtimestamp(self.opened_at).isoformat() if self.opened_at else None,
+                "retry_in_seconds": max(0, math.ceil(self.open_until - now)) if self.state == "open" else 0,
+                "consecutive_failures": self.consecutive_failures,
+                "error_rate": round(rate, 3),
+                "window_requests": total,
+                "trips": self.trips,
+                "rejected": self.rejected
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get(source: str) -> CircuitBreaker:
+    breaker = _breakers.get(source)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.setdefault(source, CircuitBreaker(source))
+    return breaker
+
+
+def get_breaker_stats() -> Dict[str, dict]:
+    return {source: breaker.snapshot() for source, breaker in sorted(_breakers.items())}
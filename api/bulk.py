@@ -0,0 +1,280 @@
+"""
+Screening masivo de nombres contra las fuentes de riesgo
+"""
+import asyncio
+import concurrent.futures
+import csv
+import io
+import logging
+import queue
+import re
+import threading
+import time
+import unicodedata
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from api.executors import SourceExecutor
+
+logger = logging.getLogger(__name__)
+
+# Una fuente local recibe todos los nombres y responde {nombre: resultado} en una pasada
+LocalScreener = Callable[[List[str]], Awaitable[Dict[str, dict]]]
+# Una fuente de navegador responde un nombre a la vez
+BrowserScreener = Callable[[str], Awaitable[dict]]
+# Una fuente de sesión procesa en un hilo varios nombres con el mismo navegador
+SessionScreener = Callable[[Iterator[str]], Iterator[Tuple[str, dict]]]
+
+_WHITESPACE = re.compile(r"\s+")
+_CSV_HEADERS = {"name", "entity_name", "nombre"}
+
+
+def normalize_entity_name(name: str) -> str:
+    """Normaliza un nombre: Unicode NFKC y sin espacios extremos ni repetidos"""
+    name = unicodedata.normalize("NFKC", name or "")
+    return _WHITESPACE.sub(" ", name).strip()
+
+
+def dedupe_names(names: Iterable[str], max_length: int = 200) -> List[str]:
+    """Normaliza y elimina duplicados sin distinguir mayúsculas, conservando el orden"""
+    seen = set()
+    unique = []
+    for raw in names:
+        name = normalize_entity_name(raw)[:max_length].strip()
+        key = name.casefold()
+        if name and key not in seen:
+            seen.add(key)
+            unique.append(name)
+    return unique
+
+
+def parse_names_file(content: bytes, filename: str = "") -> List[str]:
+    """Extrae nombres de un archivo de texto (uno por línea) o CSV (primera columna)"""
+    text = content.decode("utf-8-sig", errors="replace")
+
+    if not filename.lower().endswith(".csv"):
+        return text.splitlines()
+
+    names = [row[0] for row in csv.reader(io.StringIO(text)) if row]
+    if names and names[0].strip().lower() in _CSV_HEADERS:
+        names = names[1:]
+    return names
+
+
+class BulkProgress:
+    """Avance de un screening masivo: completados, throughput y ETA"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.completed = 0
+        self.started = time.monotonic()
+
+    def advance(self, count: int = 1):
+        self.completed += count
+
+    def snapshot(self) -> dict:
+        elapsed = time.monotonic() - self.started
+        throughput = self.completed / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.completed
+        eta = remaining / throughput if throughput > 0 else None
+
+        return {
+            "type": "progress",
+            "completed": self.completed,
+            "total": self.total,
+            "elapsed_seconds": round(elapsed, 2),
+            "throughput_per_second": round(throughput, 3),
+            "eta_seconds": round(eta, 1) if eta is not None else None
+        }
+
+
+async def stream_bulk_screening(
+    names: List[str],
+    local_sources: Dict[str, LocalScreener],
+    browser_sources: Dict[str, Tuple[BrowserScreener, int]],
+    session_sources: Dict[str, Tuple[SessionScreener, int]] = None,
+    progress_interval: float = 2.0,
+    session_executors: Dict[str, SourceExecutor] = None
+) -> AsyncIterator[dict]:
+    """
+    Ejecuta el screening y produce los resultados a medida que llegan.
+
+    Las fuentes locales responden todos los nombres de una vez; las de navegador
+    consumen una cola propia con su concurrencia, y las de sesión reutilizan un
+    navegador por worker para toda su parte de la cola. Cada cierto tiempo se
+    intercala una línea de progreso y al final se emite un resumen. Si una fuente
+    de sesión tiene un pool en session_executors, cada worker ocupa uno de sus hilos.
+    Si todos los workers terminan sin responder algún nombre (p. ej. el pool falló
+    antes de correr el worker), esos nombres se reportan con error.
+    """
+    session_sources = session_sources or {}
+    session_executors = session_executors or {}
+    total = len(names) * (len(local_sources) + len(browser_sources) + len(session_sources))
+    progress = BulkProgress(total)
+    # Cola acotada para aplicar backpressure si el cliente lee más lento
+    results: asyncio.Queue = asyncio.Queue(maxsize=1000)
+    loop = asyncio.get_running_loop()
+    # Avisa a los hilos de sesión que el consumidor ya no está
+    stopped = threading.Event()
+
+    def result_line(source: str, name: str, result: dict) -> dict:
+        return {
+            "type": "result",
+            "source": source,
+            "query": name,
+            "hits": result.get("hits", 0),
+            "results": result.get("results", []),
+            "error": result.get("error")
+        }
+
+    async def run_local(source: str, screener: LocalScreener):
+        try:
+            matches = await screener(names)
+        except Exception as e:
+            logger.error(f"Error in bulk {source} screening: {str(e)}")
+            matches = {}
+            error = str(e)
+        else:
+            error = None
+
+        for name in names:
+            result = matches.get(name) or {"hits": 0, "results": [], "error": error}
+            await results.put(result_line(source, name, result))
+
+    async def run_browser_worker(source: str, screener: BrowserScreener, pending: asyncio.Queue):
+        while True:
+            try:
+                name = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                result = await screener(name)
+            except Exception as e:
+                logger.error(f"Error in bulk {source} screening for '{name}': {str(e)}")
+                result = {"hits": 0, "results": [], "error": str(e)}
+            await results.put(result_line(source, name, result))
+
+    # Workers de sesión vivos por fuente: el último en salir responde los nombres que quedaron en la cola
+    live_sessions: Dict[str, int] = {}
+    live_lock = threading.Lock()
+
+    def run_session_worker(source: str, screener: SessionScreener, pending: queue.Queue):
+        taken = []
+        answered = set()
+
+        def next_names() -> Iterator[str]:
+            while not stopped.is_set():
+                try:
+                    name = pending.get_nowait()
+                except queue.Empty:
+                    return
+                taken.append(name)
+                yield name
+
+        def emit(line: dict):
+            future = asyncio.run_coroutine_threadsafe(results.put(line), loop)
+            while not stopped.is_set():
+                try:
+                    future.result(timeout=1)
+                    return
+                except concurrent.futures.TimeoutError:
+                    continue
+            future.cancel()
+
+        error = None
+        try:
+            for name, result in screener(next_names()):
+                answered.add(name)
+                emit(result_line(source, name, result))
+        except Exception as e:
+            logger.error(f"Error in bulk {source} session: {str(e)}")
+            error = str(e)
+
+        # Los nombres tomados y no respondidos (p. ej. si el navegador falló) se reportan con error
+        for name in taken:
+            if name not in answered and not stopped.is_set():
+                emit(result_line(source, name, {"hits": 0, "results": [], "error": error or "Search interrupted"}))
+
+        # Si la sesión falló antes de tomar nombres (p. ej. Chromium no arrancó) y no queda otro
+        # worker de la fuente, los nombres de la cola también se reportan con error
+        with live_lock:
+            live_sessions[source] -= 1
+            last = live_sessions[source] == 0
+        while last and not stopped.is_set():
+            try:
+                name = pending.get_nowait()
+            except queue.Empty:
+                break
+            emit(result_line(source, name, {"hits": 0, "results": [], "error": error or "Search interrupted"}))
+
+    # (fuente, tarea) de cada worker, para saber con qué error falló si no respondió todo
+    tasks = []
+    for source, screener in local_sources.items():
+        tasks.append((source, asyncio.create_task(run_local(source, screener))))
+
+    for source, (screener, concurrency) in browser_sources.items():
+        pending: asyncio.Queue = asyncio.Queue()
+        for name in names:
+            pending.put_nowait(name)
+        for _ in range(max(1, min(concurrency, len(names)))):
+            tasks.append((source, asyncio.create_task(run_browser_worker(source, screener, pending))))
+
+    for source, (screener, concurrency) in session_sources.items():
+        session_pending: queue.Queue = queue.Queue()
+        for name in names:
+            session_pending.put_nowait(name)
+        live_sessions[source] = max(1, min(concurrency, len(names)))
+        for _ in range(live_sessions[source]):
+            executor = session_executors.get(source)
+            if executor is not None:
+                tasks.append((source, asyncio.create_task(
+                    executor.run(run_session_worker, source, screener, session_pending, wait=True, priority="batch")
+                )))
+            else:
+                tasks.append((source, loop.run_in_executor(None, run_session_worker, source, screener, session_pending)))
+
+    workers_done = asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
+
+    def unanswered_lines(answered: set) -> Iterator[dict]:
+        errors = {}
+        for (source, task), outcome in zip(tasks, workers_done.result()):
+            if isinstance(outcome, BaseException):
+                logger.error(f"Bulk {source} worker failed: {outcome!r}")
+                errors.setdefault(source, str(outcome) or type(outcome).__name__)
+        for source in list(local_sources) + list(browser_sources) + list(session_sources):
+            error = errors.get(source, "Search interrupted")
+            for name in names:
+                if (source, name) not in answered:
+                    yield result_line(source, name, {"hits": 0, "results": [], "error": error})
+
+    answered = set()
+    last_report = time.monotonic()
+    try:
+        while progress.completed < total:
+            if results.empty() and workers_done.done():
+                # Todos los workers terminaron y faltan nombres: se reportan en vez de esperar para siempre
+                for item in unanswered_lines(answered):
+                    progress.advance()
+                    yield item
+                break
+            getter = asyncio.ensure_future(results.get())
+            await asyncio.wait({getter, workers_done}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                continue
+            item = getter.result()
+            answered.add((item["source"], item["query"]))
+            progress.advance()
+            yield item
+
+            if time.monotonic() - last_report >= progress_interval:
+                last_report = time.monotonic()
+                yield progress.snapshot()
+
+        summary = progress.snapshot()
+        summary["type"] = "summary"
+        yield summary
+    finally:
+        # Si el cliente se desconecta se cancelan los workers pendientes
+        stopped.set()
+        for _, task in tasks:
+            task.cancel()
@@ -0,0 +1,75 @@
+"""
+Caché en memoria con TTL para datos de fuentes que cambian poco (p. ej. la
+lista completa de firmas inhabilitadas del World Bank).
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from api.metrics import cache_requests
+
+
+class TTLCache:
+    def __init__(self, name: str, ttl: float, max_entries: int = None):
+        self.name = name
+        self.ttl = ttl
+        # Con muchas keys distintas (p. ej. resultados paginados) se acota la cantidad en memoria
+        self.max_entries = max_entries
+        # key -> (expira, valor)
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def expires_in(self, key: Hashable) -> float:
+        """Segundos que le quedan a la entrada (0 si no está o venció)"""
+        entry = self._entries.get(key)
+        return max(entry[0] - time.monotonic(), 0.0) if entry else 0.0
+
+    def set(self, key: Hashable, value: Any):
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        for key in [key for key, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        # Mismo TTL para todas: el orden de inserción es el orden de vencimiento
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, key: Hashable = None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Devuelve el valor cacheado o lo carga. Si varios requests piden la misma
+        key a la vez, solo uno la carga y el resto espera ese resultado.
+        Los valores vacíos (descarga fallida) no se guardan.
+        """
+        value = self.get(key)
+        if value is not None:
+            cache_requests.inc(cache=self.name, result="hit")
+            return value
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            value = self.get(key)
+            if value is not None:
+                cache_requests.inc(cache=self.name, result="hit")
+                return value
+
+            cache_requests.inc(cache=self.name, result="miss")
+            value = await loader()
+            if value:
+                self.set(key, value)
+            return value
@@ -0,0 +1,278 @@
+"""
+Pools de hilos acotados por fuente.
+
+Cada fuente (OFAC, ICIJ, World Bank) tiene sus propios workers y una cola con
+profundidad máxima, así una ráfaga en una fuente no acapara los hilos de las
+demás ni acumula navegadores sin límite. Si la cola está llena el trabajo se
+rechaza de inmediato con ExecutorSaturated en lugar de esperar.
+
+Los trabajos tienen una clase de prioridad: interactive se despacha antes que
+batch. Para que batch no quede sin avanzar, un trabajo batch que esperó más de
+BATCH_AGING_SECONDS pasa adelante; y para que un lote largo no bloquee a los
+analistas, batch nunca ocupa todos los workers de una fuente que tenga dos o
+más. Con un solo worker batch lo puede usar (si no, nunca avanzaría), así que un
+lote puede demorar a las búsquedas interactivas de esa fuente.
+"""
+import asyncio
+import collections
+import concurrent.futures
+import threading
+import time
+from typing import Deque, Dict, List, Optional
+
+from config import SOURCE_EXECUTORS, PRIORITY_CLASSES, BATCH_AGING_SECONDS
+
+
+class ExecutorSaturated(Exception):
+    """La cola de la fuente está llena; retry_after estima cuándo habrá lugar"""
+
+    def __init__(self, source: str, retry_after: int):
+        super().__init__(f"{source} executor is saturated")
+        self.source = source
+        self.retry_after = retry_after
+
+
+class _Job:
+    __slots__ = ("future", "func", "args", "priority", "enqueued_at")
+
+    def __init__(self, func, args, priority):
+        self.future = concurrent.futures.Future()
+        self.func = func
+        self.args = args
+        self.priority = priority
+        self.enqueued_at = time.monotonic()
+
+
+class _ClassStats:
+    """Esperas y latencias de una clase de prioridad"""
+
+    def __init__(self):
+        self.dispatched = 0
+        self.completed = 0
+        self.running = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def snapshot(self, queue_depth: int) -> dict:
+        return {
+            "queue_depth": queue_depth,
+            "running": self.running,
+            "dispatched": self.dispatched,
+            "completed": self.completed,
+            "avg_wait_seconds": round(self.total_wait / self.dispatched, 3) if self.dispatched else 0.0,
+            "max_wait_seconds": round(self.max_wait, 3),
+            # Latencia = espera en cola + ejecución
+            "avg_latency_seconds": round(self.total_latency / self.completed, 3) if self.completed else 0.0,
+            "max_latency_seconds": round(self.max_latency, 3)
+        }
+
+
+class SourceExecutor:
+    def __init__(self, source: str, max_workers: int, max_queue: int, batch_aging: float = BATCH_AGING_SECONDS):
+        self.source = source
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.batch_aging = batch_aging
+        # Batch deja al menos un worker libre para trabajo interactivo (salvo con un solo worker)
+        self.max_batch_workers = max(1, max_workers - 1)
+        self._queues: Dict[str, Deque[_Job]] = {priority: collections.deque() for priority in PRIORITY_CLASSES}
+        self._classes: Dict[str, _ClassStats] = {priority: _ClassStats() for priority in PRIORITY_CLASSES}
+        self._condition = threading.Condition()
+        self._threads = []
+        self._idle = 0
+        self._running = 0
+        # Contadores para /api/v1/executors
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def _queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _retry_after(self) -> int:
+        # Lo que tardaría en vaciarse la cola al ritmo medio de ejecución
+        avg_run = self.total_run / self.completed if self.completed else 5.0
+        return max(1, round(avg_run * (self._queued() + 1) / self.max_workers))
+
+    def _next_job(self) -> Optional[_Job]:
+        interactive = self._queues["interactive"]
+        batch = self._queues["batch"]
+        batch_allowed = self._classes["batch"].running < self.max_batch_workers
+
+        if batch and batch_allowed:
+            # Envejecimiento: batch pasa adelante si interactive no deja nada o si ya esperó demasiado
+            if not interactive or time.monotonic() - batch[0].enqueued_at >= self.batch_aging:
+                return batch.popleft()
+        if interactive:
+            return interactive.popleft()
+        return None
+
+    def submit(self, func, *args, priority: str = "interactive") -> concurrent.futures.Future:
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority class '{priority}'. Use {', '.join(PRIORITY_CLASSES)}")
+
+        with self._condition:
+            queued = self._queued()
+            # Trabajos que quedarían esperando sin un worker libre que los tome
+            waiting = queued - self._idle
+            if waiting >= self.max_queue and len(self._threads) >= self.max_workers:
+                self.rejected += 1
+                raise ExecutorSaturated(self.source, self._retry_after())
+
+            job = _Job(func, args, priority)
+            self._queues[priority].append(job)
+            self.submitted += 1
+            # Los hilos se crean a demanda hasta max_workers, como ThreadPoolExecutor
+            if queued + 1 > self._idle and len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._worker,
+                    name=f"{self.source}-worker-{len(self._threads)}",
+                    daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+            self._condition.notify()
+        return job.future
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                self._idle += 1
+                job = self._next_job()
+                while job is None:
+                    # Se despierta cada segundo para revisar el envejecimiento de batch
+                    self._condition.wait(timeout=1)
+                    job = self._next_job()
+                self._idle -= 1
+                # Si el request ya se fue (deadline, desconexión) el trabajo no se ejecuta
+                if not job.future.set_running_or_notify_cancel():
+                    continue
+                wait = time.monotonic() - job.enqueued_at
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                self._running += 1
+                job_class = self._classes[job.priority]
+                job_class.running += 1
+                job_class.dispatched += 1
+                job_class.total_wait += wait
+                job_class.max_wait = max(job_class.max_wait, wait)
+
+            started = time.monotonic()
+            try:
+                result = job.func(*job.args)
+            except BaseException as e:
+                job.future.set_exception(e)
+                failed = True
+            else:
+                job.future.set_result(result)
+                failed = False
+
+            with self._condition:
+                finished = time.monotonic()
+                self._running -= 1
+                self.completed += 1
+                self.failed += failed
+                self.total_run += finished - started
+                latency = finished - job.enqueued_at
+                job_class.running -= 1
+                job_class.completed += 1
+                job_class.total_latency += latency
+                job_class.max_latency = max(job_class.max_latency, latency)
+                # Al liberarse un lugar de batch otro worker puede tomar un trabajo batch en espera
+                self._condition.notify_all()
+
+    async def run(self, func, *args, wait: bool = False, priority: str = "interactive"):
+        """
+        Ejecuta func en el pool con la prioridad indicada. Con wait=True, en vez de
+        rechazar cuando la cola está llena se reintenta hasta que haya lugar (para
+        trabajos en lote).
+        """
+        while True:
+            try:
+                future = self.submit(func, *args, priority=priority)
+                break
+            except ExecutorSaturated as e:
+                if not wait:
+                    raise
+                await asyncio.sleep(min(e.retry_after, 1))
+        return await asyncio.wrap_future(future)
+
+    def cancel_pending(self) -> int:
+        """Descarta los trabajos que todavía esperan en cola (al apagar el servidor)"""
+        with self._condition:
+            jobs = [job for queue in self._queues.values() for job in queue]
+            for queue in self._queues.values():
+                queue.clear()
+            self._condition.notify_all()
+        for job in jobs:
+            job.future.cancel()
+        return len(jobs)
+
+    def drain(self, timeout: float) -> bool:
+        """Espera a que terminen los trabajos en curso; False si venció el plazo"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._running or self._queued():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def stats(self) -> dict:
+        with self._condition:
+            started = self.completed + self._running
+            oldest = min((queue[0].enqueued_at for queue in self._queues.values() if queue), default=None)
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "max_batch_workers": self.max_batch_workers,
+                "running": self._running,
+                "queue_depth": self._queued(),
+                "oldest_wait_seconds": round(time.monotonic() - oldest, 3) if oldest else 0.0,
+                "avg_wait_seconds": round(self.total_wait / started, 3) if started else 0.0,
+                "max_wait_seconds": round(self.max_wait, 3),
+                "avg_run_seconds": round(self.total_run / self.completed, 3) if self.completed else 0.0,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "classes": {
+                    priority: stats.snapshot(len(self._queues[priority]))
+                    for priority, stats in self._classes.items()
+                }
+            }
+
+
+# Un pool por fuente, tamaños en SOURCE_EXECUTORS (config.py)
+executors: Dict[str, SourceExecutor] = {
+    source: SourceExecutor(source, settings["max_workers"], settings["max_queue"])
+    for source, settings in SOURCE_EXECUTORS.items()
+}
+
+
+def get_executor(source: str) -> Optional[SourceExecutor]:
+    return executors.get(source)
+
+
+def get_executor_stats() -> Dict[str, dict]:
+    return {source: executor.stats() for source, executor in executors.items()}
+
+
+def cancel_pending_jobs() -> int:
+    return sum(executor.cancel_pending() for executor in executors.values())
+
+
+def drain_executors(timeout: float) -> List[str]:
+    """Espera a los pools con un plazo total; devuelve las fuentes que siguen ocupadas"""
+    deadline = time.monotonic() + timeout
+    return [
+        source for source, executor in executors.items()
+        if not executor.drain(max(0.0, deadline - time.monotonic()))
+    ]
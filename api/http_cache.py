@@ -0,0 +1,114 @@
+"""
+Semántica de cache HTTP para las búsquedas: ETag, Cache-Control y 304.
+
+El ETag no sale del cuerpo (que trae un timestamp nuevo en cada respuesta) sino
+de la versión de los datos de cada fuente y de la búsqueda pedida, así se puede
+calcular antes de buscar y responder 304 sin volver a scrapear:
+
+- World Bank: hash de la lista cacheada; vale mientras la lista siga en caché.
+- OFAC e ICIJ: se scrapean en vivo, la versión es el intervalo de refresco
+  actual (SOURCE_CACHE_MAX_AGE), que cambia al vencer.
+
+Solo se cachean respuestas completas: con fuentes en timeout, error o
+rechazadas se envía Cache-Control: no-store. Las respuestas con next_cursor
+llevan max-age pero no ETag (el cursor vence con el resultado guardado).
+"""
+import hashlib
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import orjson
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from api.cache import TTLCache
+from config import SOURCE_CACHE_MAX_AGE, HTTP_CACHE_SCOPE, SEARCH_RESULTS_TTL
+
+# Fuentes cuya versión depende de una entrada de caché: fuente -> (caché, key)
+_tracked: Dict[str, Tuple[TTLCache, str]] = {}
+_versions: Dict[str, str] = {}
+
+# Campos del request que no cambian el resultado de una búsqueda completa
+_IGNORED_FIELDS = {"source_timeout", "total_timeout"}
+
+
+def track_cache(source: str, cache: TTLCache, key: str):
+    _tracked[source] = (cache, key)
+
+
+def set_data_version(source: str, data) -> str:
+    """Registra la versión de los datos recién cargados de una fuente"""
+    version = hashlib.sha1(orjson.dumps(data, option=orjson.OPT_SORT_KEYS)).hexdigest()[:16]
+    _versions[source] = version
+    return version
+
+
+def data_version(source: str) -> Tuple[Optional[str], int]:
+    """(versión, segundos de validez); la versión es None si todavía no se conoce"""
+    if source in _tracked:
+        cache, key = _tracked[source]
+        remaining = int(cache.expires_in(key))
+        return (_versions.get(source) if remaining > 0 else None), remaining
+
+    max_age = SOURCE_CACHE_MAX_AGE[source]
+    now = time.time()
+    return str(int(now // max_age)), int(max_age - now % max_age)
+
+
+def search_etag(sources: Iterable[str], search_request: BaseModel) -> Tuple[Optional[str], int]:
+    """(ETag débil, max-age) de una búsqueda, o (None, 0) si falta la versión de alguna fuente"""
+    parts = []
+    max_age = None
+    for source in sources:
+        version, remaining = data_version(source)
+        if version is None:
+            return None, 0
+        parts.append(f"{source}={version}")
+        max_age = remaining if max_age is None else min(max_age, remaining)
+
+    params = search_request.model_dump(exclude=_IGNORED_FIELDS)
+    digest = hashlib.sha1(orjson.dumps([parts, params], option=orjson.OPT_SORT_KEYS)).hexdigest()[:24]
+    # Débil: dos respuestas con el mismo ETag solo difieren en el timestamp
+    return f'W/"{digest}"', max_age or 0
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Comparación débil: se ignora el prefijo W/
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == wanted:
+            return True
+    return False
+
+
+def _cache_control(max_age: int) -> str:
+    return f"{HTTP_CACHE_SCOPE}, max-age={max(max_age, 0)}"
+
+
+def not_modified(etag: str, max_age: int) -> Response:
+    response = Response(status_code=304, headers={"ETag": etag, "Cache-Control": _cache_control(max_age)})
+    response.headers.add_vary_header("X-API-Key")
+    return response
+
+
+def apply_cache_headers(response: Response, etag: Optional[str], max_age: int, cacheable: bool,
+                        has_cursor: bool = False) -> Response:
+    if not cacheable or etag is None:
+        response.headers["Cache-Control"] = "no-store"
+        return response
+    if has_cursor:
+        # El next_cursor deja de servir cuando vence el resultado guardado: sin ETag para que no
+        # se revalide una copia con un cursor vencido
+        response.headers["Cache-Control"] = _cache_control(min(max_age, int(SEARCH_RESULTS_TTL)))
+        response.headers.add_vary_header("X-API-Key")
+        return response
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = _cache_control(max_age)
+    response.headers.add_vary_header("X-API-Key")
+    return response
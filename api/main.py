@@ -1,34 +1,199 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Depends, HTTPException, status, Request, UploadFile, File, Form, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.datastructures import MutableHeaders
 from datetime import datetime
 import asyncio
-from typing import Dict, List
+import functools
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+import json
 import logging
+import os
+import secrets
+import weakref
+
+import orjson
 
 from api.models import (
     EntitySearchRequest,
+    MultiSourceSearchRequest,
+    BulkSearchRequest,
     SearchResponse,
     MultiSourceSearchResponse,
     ErrorResponse,
     HealthCheckResponse
 )
 
-from api.auth import get_api_key
-from api.rate_limiter import check_rate_limit, rate_limiter
+from api.auth import get_api_key, get_admin_api_key, get_api_key_priority
+from api.rate_limiter import (
+    check_rate_limit,
+    acquire_concurrency_slot,
+    concurrency_limiter,
+    get_tier,
+    rate_limiter,
+    ConcurrencySlot
+)
+from api.bulk import dedupe_names, parse_names_file, stream_bulk_screening
+from api.executors import ExecutorSaturated, cancel_pending_jobs, drain_executors, executors, get_executor_stats
+from api.process_pool import isolated, shutdown_workers
+from api.metrics import http_request_duration, source_search_duration, render_metrics
+from api.cache import TTLCache
+from api.tracing import ServerTimingMiddleware
+from api.compression import CompressionMiddleware
+from api.responses import FastJSONResponse
+from api.pagination import CursorExpired, next_page, paginate
+from api import breaker, http_cache, readiness
+from api.breaker import CircuitOpen
+from api.sources import CHALLENGE_ERROR, SOURCES, Source, first_hit_stages, lazy, preload_modules, register
+from api.profiler import ProfilerBusy, profile
+from config import (
+    BULK_MAX_NAMES,
+    BULK_BROWSER_CONCURRENCY,
+    BULK_PROGRESS_INTERVAL,
+    BULK_ARCHIVE_DIR,
+    BULK_ARCHIVE_FORMAT,
+    BULK_ARCHIVE_COMPRESSION,
+    SEARCH_SOURCE_TIMEOUT,
+    SEARCH_TOTAL_TIMEOUT,
+    PRIORITY_CLASSES,
+    SCRAPER_EXECUTION_MODE,
+    WORLD_BANK_CACHE_TTL,
+    ENDPOINT_COSTS,
+    SEARCH_PAGE_MAX_LIMIT,
+    SHUTDOWN_DRAIN_TIMEOUT,
+    STARTUP_WARMUP,
+    STARTUP_BROWSER_PROBE,
+    READINESS_REQUIRED_SOURCES,
+    WORLD_BANK_SNAPSHOT
+)
 
-from scrappers.ofac import search_ofac
-from scrappers.offshore import ICIJOffshoreLeaksScraper
-from scrappers.world_bank import WorldBankScraper
+from scrappers.cancellation import CancellationToken, ScrapeCancelled
+from scrappers import export, telemetry
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
+STARTED_AT = time.time()
+
+# Los scrapers se importan en el primer uso (api/sources.py): Playwright, BeautifulSoup y requests
+# no se cargan al arrancar la API
+search_ofac = lazy("scrappers.ofac:search_ofac")
+search_ofac_batch = lazy("scrappers.ofac:search_ofac_batch")
+ICIJOffshoreLeaksScraper = lazy("scrappers.offshore:ICIJOffshoreLeaksScraper")
+WorldBankScraper = lazy("scrappers.world_bank:WorldBankScraper")
+
+
+def scrape_offshore(query: str, max_pages: Optional[int], cancel_token: Optional[CancellationToken] = None):
+    return ICIJOffshoreLeaksScraper(headless=True).scrape_search_results(query, max_pages, cancel_token)
+
+
+def scrape_world_bank(params: Optional[Dict], cancel_token: Optional[CancellationToken] = None):
+    return WorldBankScraper().scrape(params, cancel_token)
+
+
+def search_ofac_session(names: Iterator[str], cancel_token: Optional[CancellationToken] = None):
+    return search_ofac_batch(names, cancel_token=cancel_token)
+
+
+# En modo process (SCRAPER_EXECUTION_MODE) cada scraper corre en el subproceso de su worker
+ofac_search = isolated("ofac", search_ofac)
+ofac_session = isolated("ofac-batch", search_ofac_session)
+offshore_search = isolated("offshore-leaks", scrape_offshore)
+world_bank_download = isolated("world-bank", scrape_world_bank)
+browser_probe = isolated("browser-probe", lazy("scrappers.browser:probe_browser"))
+
+# La lista de firmas inhabilitadas cambia poco: se descarga como máximo una vez por TTL
+world_bank_cache = TTLCache("world-bank", WORLD_BANK_CACHE_TTL)
+http_cache.track_cache("world-bank", world_bank_cache, "firms")
+readiness.track_cache("world-bank", world_bank_cache, "firms")
+
+# Tokens de las búsquedas en curso: al apagar se cancelan las que siguen corriendo
+active_tokens: "weakref.WeakSet[CancellationToken]" = weakref.WeakSet()
+
+
+def load_world_bank_snapshot() -> bool:
+    # run.py --prod descarga la lista una vez y cada worker la toma de ahí en lugar de bajarla de nuevo
+    if not WORLD_BANK_SNAPSHOT:
+        return False
+    try:
+        with open(WORLD_BANK_SNAPSHOT, "rb") as f:
+            firms = orjson.loads(f.read())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Cannot load World Bank snapshot {WORLD_BANK_SNAPSHOT}: {str(e)}")
+        return False
+    world_bank_cache.set("firms", firms)
+    http_cache.set_data_version("world-bank", firms)
+    readiness.record_success("world-bank", refreshed=True)
+    logger.info(f"World Bank list loaded from snapshot ({len(firms)} firms)")
+    return True
+
+
+async def probe_source_browser(source: str):
+    # Lanza Chromium una vez en el pool de la fuente; en modo process deja listo el subproceso del worker
+    try:
+        seconds = await run_in_executor(browser_probe, None, source=source, wait=True, priority="batch")
+    except Exception as e:
+        readiness.record_failure(source, f"Browser unavailable: {str(e).splitlines()[0]}", fatal=True)
+        raise
+    readiness.record_probe(source)
+    logger.info(f"Browser ready for {source} in {seconds:.2f}s")
+
+
+async def warm_up():
+    # En segundo plano, después de que el servidor ya responde: lo que pagaría la primera búsqueda
+    steps = [get_world_bank_firms(priority="batch", wait=True)]
+    if SCRAPER_EXECUTION_MODE == "thread":
+        # En modo process los scrapers se importan en los subprocesos
+        steps.append(run_in_executor(preload_modules))
+    if STARTUP_BROWSER_PROBE:
+        steps += [probe_source_browser(source.key) for source in SOURCES.values() if not source.local]
+    try:
+        for outcome in await asyncio.gather(*steps, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                logger.warning(f"Startup warmup step failed: {str(outcome).splitlines()[0]}")
+    finally:
+        readiness.finish_warmup()
+    logger.info("Startup warmup finished")
+
+
+async def shutdown_scrapers():
+    # uvicorn ya esperó a los requests en curso (GRACEFUL_SHUTDOWN_TIMEOUT); lo que siga
+    # corriendo se cancela y se le da SHUTDOWN_DRAIN_TIMEOUT para cerrar su navegador
+    cancelled = 0
+    for token in list(active_tokens):
+        if not token.cancelled:
+            token.cancel("server shutting down")
+            cancelled += 1
+    discarded = cancel_pending_jobs()
+    busy = await asyncio.get_running_loop().run_in_executor(None, drain_executors, SHUTDOWN_DRAIN_TIMEOUT)
+    processes = shutdown_workers()
+    logger.info(
+        f"Shutdown: {cancelled} scrapes cancelled, {discarded} queued jobs discarded, "
+        f"{processes} scraper processes closed, still busy: {', '.join(busy) or 'none'}"
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_world_bank_snapshot()
+    warmup = asyncio.create_task(warm_up()) if STARTUP_WARMUP else None
+    if warmup is None:
+        readiness.finish_warmup()
+    try:
+        yield
+    finally:
+        if warmup is not None and not warmup.done():
+            warmup.cancel()
+        await shutdown_scrapers()
+
 
 # Iniciar FastAPI
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Añadir políticas de CORS
 app.add_middleware(
@@ -39,17 +204,67 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.middleware("http")
-async def add_rate_limit_headers(request: Request, call_next):
-    response = await call_next(request)
+class RateLimitHeadersMiddleware:
+    # Middleware ASGI puro: a diferencia de @app.middleware("http") no envuelve el canal
+    # receive, así request.is_disconnected() sí detecta cuando el cliente se va
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_rate_limit_headers(message):
+            if message["type"] == "http.response.start":
+                rate_info = scope.get("state", {}).get("rate_limit")
+                if rate_info:
+                    headers = MutableHeaders(scope=message)
+                    headers["X-RateLimit-Limit"] = str(rate_info['limit'])
+                    headers["X-RateLimit-Remaining"] = str(rate_info['remaining'])
+                    headers["X-RateLimit-Reset"] = str(rate_info['reset'])
+            await send(message)
+
+        await self.app(scope, receive, send_with_rate_limit_headers)
+
+
+class MetricsMiddleware:
+    # Latencia por endpoint; en respuestas en streaming cuenta hasta el último byte
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Las rutas inexistentes van a una sola serie para no multiplicar etiquetas
+            endpoint = scope["path"] if scope.get("endpoint") is not None else "unmatched"
+            http_request_duration.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                endpoint=endpoint,
+                status=str(status_code)
+            )
 
-    if hasattr(request.state, 'rate_limit'):
-        rate_info = request.state.rate_limit
-        response.headers["X-RateLimit-Limit"] = str(rate_info['limit'])
-        response.headers["X-RateLimit-Remaining"] = str(rate_info['remaining'])
-        response.headers["X-RateLimit-Reset"] = str(rate_info['reset'])
 
-    return response
+# Compresión lo más adentro posible: el resto de middlewares solo toca cabeceras
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RateLimitHeadersMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -76,9 +291,232 @@ async def general_exception_handler(request: Request, exc: Exception):
         }
     )
 
-async def run_in_executor(func, *args):
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(None, func, *args)
+async def run_in_executor(func, *args, source: Optional[str] = None, wait: bool = False,
+                          priority: str = "interactive"):
+    # Los scrapers corren en el pool acotado de su fuente; sin fuente, en el executor por defecto.
+    # Los tiempos que registre el scraper en el hilo se suman al desglose del request (Server-Timing)
+    records = []
+
+    def traced(*call_args):
+        with telemetry.collect() as collected:
+            try:
+                return func(*call_args)
+            finally:
+                records.extend(collected)
+
+    try:
+        if source is not None:
+            return await executors[source].run(traced, *args, wait=wait, priority=priority)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, traced, *args)
+    finally:
+        telemetry.attach(records)
+
+
+@contextmanager
+def observe_source(source: str):
+    # Latencia de cada búsqueda por fuente y resultado, para /metrics
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        raise
+    except (asyncio.CancelledError, ScrapeCancelled):
+        outcome = "cancelled"
+        raise
+    except ExecutorSaturated:
+        outcome = "rejected"
+        raise
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        source_search_duration.observe(time.perf_counter() - started, source=source, status=outcome)
+
+
+# Motivo con el que with_deadline cancela el token: fetch_source lo registra como falla de la fuente
+DEADLINE_EXCEEDED = "deadline exceeded"
+
+
+async def with_deadline(awaitable, source: str, timeout: float, cancel_token: Optional[CancellationToken] = None):
+    # Al vencer el plazo se cancela el token para que el scraper cierre su navegador y libere el hilo.
+    # El token se cancela antes que la tarea, así quien la corre sabe que fue por el plazo
+    with observe_source(source):
+        task = asyncio.ensure_future(awaitable)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=timeout)
+        except asyncio.CancelledError:
+            if cancel_token is not None:
+                cancel_token.cancel("search cancelled")
+            task.cancel()
+            raise
+        if not done:
+            if cancel_token is not None:
+                cancel_token.cancel(DEADLINE_EXCEEDED)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            raise asyncio.TimeoutError()
+        return task.result()
+
+
+async def run_with_deadline(func, *args, source: str, timeout: float, cancel_token: Optional[CancellationToken] = None,
+                            priority: str = "interactive"):
+    return await with_deadline(
+        run_in_executor(func, *args, source=source, priority=priority), source, timeout, cancel_token
+    )
+
+
+async def get_world_bank_firms(cancel_token: Optional[CancellationToken] = None, priority: str = "interactive",
+                               wait: bool = False) -> List[Dict]:
+    async def download():
+        try:
+            firms = await run_in_executor(
+                world_bank_download, None, cancel_token, source="world-bank", wait=wait, priority=priority
+            )
+        except (ScrapeCancelled, ExecutorSaturated):
+            raise
+        except Exception as e:
+            readiness.record_failure("world-bank", str(e))
+            raise
+        http_cache.set_data_version("world-bank", firms)
+        if firms:
+            readiness.record_success("world-bank", refreshed=True)
+        else:
+            readiness.record_failure("world-bank", "World Bank download returned no data")
+        return firms
+    return await world_bank_cache.get_or_load("firms", download)
+
+
+async def revalidate(request: Request, api_key: str, sources: List[str], search_request) -> Optional[Response]:
+    """304 sin volver a buscar si el If-None-Match del cliente sigue vigente"""
+    etag, max_age = http_cache.search_etag(sources, search_request)
+    if etag is None or not http_cache.etag_matches(request, etag):
+        return None
+    await check_rate_limit(request, api_key, ENDPOINT_COSTS["not-modified"])
+    return http_cache.not_modified(etag, max_age)
+
+
+def cached_search_response(content, sources: List[str], search_request, cacheable: bool,
+                           has_cursor: bool) -> FastJSONResponse:
+    etag, max_age = http_cache.search_etag(sources, search_request)
+    return http_cache.apply_cache_headers(FastJSONResponse(content), etag, max_age, cacheable, has_cursor)
+
+
+async def charge_with_slot(request: Request, api_key: str, cost: int, slot: ConcurrencySlot):
+    """Cobra la cuota con el lugar de concurrencia ya tomado; si la cuota no alcanza, lo libera"""
+    try:
+        await check_rate_limit(request, api_key, cost)
+    except BaseException:
+        slot.release()
+        raise
+
+
+def request_priority(request: Request, api_key: str) -> str:
+    # La cabecera X-Priority permite elegir la clase por request; si no, la de la API key
+    priority = (request.headers.get("X-Priority") or get_api_key_priority(api_key)).strip().lower()
+    if priority not in PRIORITY_CLASSES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid X-Priority '{priority}'. Valid values: {', '.join(PRIORITY_CLASSES)}"
+        )
+    return priority
+
+
+@asynccontextmanager
+async def cancel_on_disconnect(request: Request, poll_interval: float = 1.0):
+    # Vigila la conexión mientras corre el scraping; si el cliente se va, cancela el token
+    cancel_token = CancellationToken()
+    active_tokens.add(cancel_token)
+
+    async def watch():
+        while not cancel_token.cancelled:
+            if await request.is_disconnected():
+                logger.info(f"Client disconnected from {request.url.path}, cancelling scrape")
+                cancel_token.cancel("client disconnected")
+                return
+            await asyncio.sleep(poll_interval)
+
+    watcher = asyncio.create_task(watch())
+    try:
+        yield cancel_token
+    finally:
+        watcher.cancel()
+        active_tokens.discard(cancel_token)
+
+
+def client_disconnected_error() -> HTTPException:
+    # 499 (convención de nginx): nadie va a leer esta respuesta
+    return HTTPException(status_code=499, detail="Client disconnected")
+
+
+def source_busy_error(exc: ExecutorSaturated) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail={
+            "error": "Source busy",
+            "message": f"Too many {exc.source} searches in progress, retry in {exc.retry_after} seconds"
+        },
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+def busy_response(source: str, query: str, exc: ExecutorSaturated) -> SearchResponse:
+    return SearchResponse.model_construct(
+        source=source,
+        query=query,
+        hits=0,
+        results=[],
+        timestamp=datetime.now().isoformat(),
+        error=f"Source busy, retry in {exc.retry_after} seconds",
+        status="rejected"
+    )
+
+
+def cancelled_response(source: str, query: str, reason: str) -> SearchResponse:
+    return SearchResponse.model_construct(
+        source=source,
+        query=query,
+        hits=0,
+        results=[],
+        timestamp=datetime.now().isoformat(),
+        message=reason,
+        status="cancelled"
+    )
+
+
+def timeout_response(source: str, query: str, timeout: float) -> SearchResponse:
+    return SearchResponse.model_construct(
+        source=source,
+        query=query,
+        hits=0,
+        results=[],
+        timestamp=datetime.now().isoformat(),
+        error=f"Search did not finish within {timeout:g} seconds",
+        status="timeout"
+    )
+
+
+def map_offshore_entity(entity: Dict) -> Dict:
+    return {
+        "entity_name": entity.get("entity_name"),
+        "entity_url": entity.get("entity_url"),
+        "jurisdiction": entity.get("jurisdiction"),
+        "linked_to": entity.get("linked_to"),
+        "data_from": entity.get("data_from")
+    }
+
+
+def map_world_bank_firm(firm: Dict) -> Dict:
+    return {
+        "firm_name": firm.get("SUPP_NAME"),
+        "address": firm.get("SUPP_ADDR"),
+        "country": firm.get("COUNTRY_NAME"),
+        "from_date": firm.get("DEBAR_FROM_DATE"),
+        "to_date": firm.get("DEBAR_TO_DATE"),
+        "grounds": firm.get("DEBAR_REASON")
+    }
 
 
 # Estado endpoint
@@ -91,162 +529,207 @@ async def health_check():
     }
 
 
-# Búsqueda individual OFAC
-@app.post(
-    "/api/v1/search/ofac",
-    response_model=SearchResponse,
-    tags=["Search"]
-)
-async def search_ofac_endpoint(
-    request: Request,
-    search_request: EntitySearchRequest,
-    api_key: str = Depends(get_api_key)
-):
-    try:
-        await check_rate_limit(request, api_key)
+# Liveness: el proceso responde (no mira las fuentes ni el warmup)
+@app.get("/health/live", tags=["General"])
+async def liveness_check():
+    return {
+        "status": "alive",
+        "uptime_seconds": round(time.time() - STARTED_AT, 1),
+        "timestamp": datetime.now().isoformat()
+    }
 
-        logger.info(f"OFAC search request for: {search_request.entity_name}")
 
-        result = await run_in_executor(search_ofac, search_request.entity_name)
+# Readiness: 503 hasta terminar el warmup o mientras una fuente requerida no pueda responder
+@app.get("/health/ready", tags=["General"])
+async def readiness_check():
+    report = readiness.report(
+        ALL_SOURCES, READINESS_REQUIRED_SOURCES, get_executor_stats(), require_warm=STARTUP_WARMUP,
+        circuits=breaker.get_breaker_stats()
+    )
+    status_code = status.HTTP_200_OK if report["status"] == "ready" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return FastJSONResponse(report, status_code=status_code)
 
-        if result["hits"] > 0:
-            message = f"Se encontraron {result['hits']} resultado(s) para '{search_request.entity_name}' en OFAC"
-        else:
-            message = f"No se encontraron resultados para '{search_request.entity_name}' en OFAC"
 
-        return SearchResponse(
-            source=result["source"],
-            query=result["query"],
-            hits=result["hits"],
-            results=result["results"],
-            timestamp=datetime.now().isoformat(),
-            message=message
-        )
+# Fuentes de búsqueda: cada una declara cómo se busca, cómo se mapean sus resultados y su costo
+async def fetch_ofac(query: str, cancel_token: Optional[CancellationToken], priority: str):
+    result = await run_in_executor(ofac_search, query, cancel_token, source="ofac", priority=priority)
+    return result["results"], result.get("error")
 
-    except HTTPException:
+
+async def fetch_offshore(query: str, cancel_token: Optional[CancellationToken], priority: str):
+    entities, challenge = await run_in_executor(
+        offshore_search, query, 2, cancel_token, source="offshore-leaks", priority=priority
+    )
+    return entities, CHALLENGE_ERROR if challenge else None
+
+
+async def fetch_world_bank(query: str, cancel_token: Optional[CancellationToken], priority: str):
+    all_firms = await get_world_bank_firms(cancel_token, priority)
+    return (WorldBankScraper().filter_by_name(query, all_firms) if all_firms else []), None
+
+
+async def fetch_source(source: Source, query: str, cancel_token: Optional[CancellationToken], priority: str):
+    # Busca en la fuente y deja el resultado en su readiness y su circuit breaker; las fuentes
+    # locales lo registran al descargar su lista (get_world_bank_firms)
+    if source.local:
+        return await source.fetch(query, cancel_token, priority)
+    # Con el breaker abierto lanza CircuitOpen sin tocar el navegador
+    source_breaker = breaker.get(source.key)
+    probe = source_breaker.check(query)
+    try:
+        items, error = await source.fetch(query, cancel_token, priority)
+    except (ScrapeCancelled, ExecutorSaturated, asyncio.CancelledError):
+        if cancel_token is not None and cancel_token.reason == DEADLINE_EXCEEDED:
+            record_source_failure(source.key, "Search did not finish before its deadline", probe)
+        else:
+            # Una prueba cancelada o sin lugar en el pool no decide nada
+            source_breaker.release(probe)
         raise
     except Exception as e:
-        logger.error(f"Error in OFAC search: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error searching OFAC: {str(e)}"
-        )
+        record_source_failure(source.key, str(e), probe)
+        raise
+    record_source_result(source.key, error, probe)
+    if error is None:
+        breaker.remember(source.key, query, items)
+    return items, error
 
 
-# Búsqueda Individual Offshore Leaks endpoint
-@app.post(
-    "/api/v1/search/offshore-leaks",
-    response_model=SearchResponse,
-    tags=["Search"]
-)
-async def search_offshore_leaks_endpoint(
-    request: Request,
-    search_request: EntitySearchRequest,
-    api_key: str = Depends(get_api_key)
-):
-    try:
-        await check_rate_limit(request, api_key)
+def record_source_result(source: str, error: Optional[str], probe: bool = False):
+    if error is None:
+        readiness.record_success(source)
+        breaker.get(source).record_success(probe)
+    elif error == CHALLENGE_ERROR:
+        readiness.record_challenge(source)
+        breaker.get(source).record_challenge(error, probe)
+    else:
+        record_source_failure(source, error, probe)
 
-        logger.info(f"Offshore Leaks search request for: {search_request.entity_name}")
 
-        scraper = ICIJOffshoreLeaksScraper(headless=True)
+def record_source_failure(source: str, error: str, probe: bool = False):
+    readiness.record_failure(source, error)
+    breaker.get(source).record_failure(error, probe)
 
-        entities, challenge = await run_in_executor(
-            scraper.scrape_search_results,
-            search_request.entity_name,
-            2 
-        )
 
+def circuit_open_response(source: Source, query: str, exc: CircuitOpen) -> SearchResponse:
+    # Con el breaker abierto: el último resultado guardado de la misma búsqueda, o solo el error
+    if exc.fallback is not None:
+        cached_at, items = exc.fallback
+        results = source.map_results(items)
+        error = (f"{source.title} temporarily unavailable, serving results cached at "
+                 f"{datetime.fromtimestamp(cached_at).isoformat()}; retry in {exc.retry_after} seconds")
+    else:
         results = []
-        for entity in entities:
-            results.append({
-                "entity_name": entity.get("entity_name"),
-                "entity_url": entity.get("entity_url"),
-                "jurisdiction": entity.get("jurisdiction"),
-                "linked_to": entity.get("linked_to"),
-                "data_from": entity.get("data_from")
-            })
-
-        if len(results) > 0:
-            message = f"Se encontraron {len(results)} resultado(s) para '{search_request.entity_name}' en ICIJ Offshore Leaks"
-        else:
-            message = f"No se encontraron resultados para '{search_request.entity_name}' en ICIJ Offshore Leaks"
+        error = f"{source.title} temporarily unavailable ({exc.reason}), retry in {exc.retry_after} seconds"
+    return SearchResponse.model_construct(
+        source=source.name,
+        query=query,
+        hits=len(results),
+        results=results,
+        timestamp=datetime.now().isoformat(),
+        message=f"Circuit open for {source.title}: no new search was made",
+        error=error,
+        status="degraded"
+    )
 
-        return SearchResponse(
-            source="ICIJ Offshore Leaks",
-            query=search_request.entity_name,
-            hits=len(results),
-            results=results,
-            timestamp=datetime.now().isoformat(),
-            message=message,
-            error="Human verification challenge detected" if challenge else None
-        )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error in Offshore Leaks search: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error searching Offshore Leaks: {str(e)}"
-        )
+register(Source("ofac", "OFAC", "OFAC", fetch_ofac, ENDPOINT_COSTS["ofac"]))
+register(Source("offshore-leaks", "ICIJ Offshore Leaks", "ICIJ Offshore Leaks", fetch_offshore,
+                ENDPOINT_COSTS["offshore-leaks"], map_offshore_entity))
+register(Source("world-bank", "World Bank Debarred Firms", "World Bank", fetch_world_bank,
+                ENDPOINT_COSTS["world-bank"], map_world_bank_firm, local=True))
 
+# Fuentes que consulta /all
+ALL_SOURCES = list(SOURCES)
+# Las fuentes de navegador tienen circuit breaker (se crean ya para que su estado se vea cerrado)
+for registered in SOURCES.values():
+    if not registered.local:
+        breaker.get(registered.key)
 
-# Búsqueda Individual World Bank endpoint
-@app.post(
-    "/api/v1/search/world-bank",
-    response_model=SearchResponse,
-    tags=["Search"]
-)
-async def search_world_bank_endpoint(
-    request: Request,
-    search_request: EntitySearchRequest,
-    api_key: str = Depends(get_api_key)
-):
-    try:
-        # Validar el rate limit de max 20 per minuto
-        await check_rate_limit(request, api_key)
-
-        logger.info(f"World Bank search request for: {search_request.entity_name}")
-        scraper = WorldBankScraper()
-        all_firms = await run_in_executor(scraper.scrape)
-        if all_firms:
-            filtered_firms = scraper.filter_by_name(search_request.entity_name, all_firms)
-        else:
-            filtered_firms = []
-        results = []
-        for firm in filtered_firms:
-            results.append({
-                "firm_name": firm.get("SUPP_NAME"),
-                "address": firm.get("SUPP_ADDR"),
-                "country": firm.get("COUNTRY_NAME"),
-                "from_date": firm.get("DEBAR_FROM_DATE"),
-                "to_date": firm.get("DEBAR_TO_DATE"),
-                "grounds": firm.get("DEBAR_REASON")
-            })
-
-        if len(results) > 0:
-            message = f"Se encontraron {len(results)} resultado(s) para '{search_request.entity_name}' en World Bank"
-        else:
-            message = f"No se encontraron resultados para '{search_request.entity_name}' en World Bank"
 
-        return SearchResponse(
-            source="World Bank Debarred Firms",
-            query=search_request.entity_name,
-            hits=len(results),
-            results=results,
-            timestamp=datetime.now().isoformat(),
-            message=message
-        )
+@asynccontextmanager
+async def no_concurrency_slot():
+    # nullcontext recién es asíncrono desde Python 3.10
+    yield
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error in World Bank search: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error searching World Bank: {str(e)}"
-        )
+
+def search_endpoint(source: Source):
+    """Endpoint de búsqueda individual de una fuente del registro"""
+    async def endpoint(
+        request: Request,
+        search_request: EntitySearchRequest,
+        api_key: str = Depends(get_api_key)
+    ):
+        try:
+            not_modified = await revalidate(request, api_key, [source.key], search_request)
+            if not_modified is not None:
+                return not_modified
+            priority = request_priority(request, api_key)
+
+            # Las fuentes de navegador ocupan un lugar de concurrencia de la key
+            slot = no_concurrency_slot() if source.local else acquire_concurrency_slot(api_key)
+            async with slot:
+                # La cuota (según el plan de la key y el costo de la fuente) se cobra recién cuando
+                # el request ya no puede rechazarse por prioridad o concurrencia
+                await check_rate_limit(request, api_key, source.cost)
+
+                logger.info(f"{source.title} search request for: {search_request.entity_name}")
+
+                async with cancel_on_disconnect(request) as cancel_token:
+                    with observe_source(source.key):
+                        items, error = await fetch_source(source, search_request.entity_name, cancel_token, priority)
+            results = source.map_results(items)
+
+            if len(results) > 0:
+                message = f"Se encontraron {len(results)} resultado(s) para '{search_request.entity_name}' en {source.title}"
+            else:
+                message = f"No se encontraron resultados para '{search_request.entity_name}' en {source.title}"
+
+            response = SearchResponse.model_construct(
+                source=source.name,
+                query=search_request.entity_name,
+                hits=len(results),
+                results=results,
+                timestamp=datetime.now().isoformat(),
+                message=message,
+                error=error
+            )
+            response = paginate(response, api_key, search_request.limit, search_request.fields)
+            # Una respuesta con error (p. ej. página de verificación) no es un resultado: no se cachea
+            return cached_search_response(response, [source.key], search_request, error is None,
+                                          response.next_cursor is not None)
+
+        except HTTPException:
+            raise
+        except CircuitOpen as e:
+            logger.warning(f"{source.title} circuit open, search answered without scraping")
+            response = paginate(circuit_open_response(source, search_request.entity_name, e),
+                                api_key, search_request.limit, search_request.fields)
+            response = cached_search_response(response, [source.key], search_request, False,
+                                              response.next_cursor is not None)
+            response.headers["Retry-After"] = str(e.retry_after)
+            return response
+        except ScrapeCancelled:
+            raise client_disconnected_error()
+        except ExecutorSaturated as e:
+            raise source_busy_error(e)
+        except Exception as e:
+            logger.error(f"Error in {source.title} search: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error searching {source.title}: {str(e)}"
+            )
+
+    return endpoint
+
+
+# Búsqueda individual en cada fuente: /api/v1/search/<fuente>
+for registered in SOURCES.values():
+    app.post(
+        f"/api/v1/search/{registered.key}",
+        response_model=SearchResponse,
+        tags=["Search"],
+        name=f"search_{registered.key.replace('-', '_')}"
+    )(search_endpoint(registered))
 
 
 # Búsqueda en la todas las fuentes previstas.
@@ -257,140 +740,128 @@ async def search_world_bank_endpoint(
 )
 async def search_all_sources_endpoint(
     request: Request,
-    search_request: EntitySearchRequest,
+    search_request: MultiSourceSearchRequest,
     api_key: str = Depends(get_api_key)
 ):
     try:
-        await check_rate_limit(request, api_key)
-        async def search_ofac_internal():
-            try:
-                result = await run_in_executor(search_ofac, search_request.entity_name)
-                if result["hits"] > 0:
-                    message = f"Se encontraron {result['hits']} resultado(s) en OFAC"
-                else:
-                    message = f"No se encontraron resultados en OFAC"
-                return SearchResponse(
-                    source=result["source"],
-                    query=result["query"],
-                    hits=result["hits"],
-                    results=result["results"],
-                    timestamp=datetime.now().isoformat(),
-                    message=message
-                )
-            except Exception as e:
-                logger.error(f"Error in OFAC search: {str(e)}")
-                return SearchResponse(
-                    source="OFAC",
-                    query=search_request.entity_name,
-                    hits=0,
-                    results=[],
-                    timestamp=datetime.now().isoformat(),
-                    error=str(e)
-                )
+        not_modified = await revalidate(request, api_key, ALL_SOURCES, search_request)
+        if not_modified is not None:
+            return not_modified
+        priority = request_priority(request, api_key)
+        slot = acquire_concurrency_slot(api_key)
+        await charge_with_slot(request, api_key, ENDPOINT_COSTS["all"], slot)
 
-        async def search_offshore_internal():
+        # En modo "all" las fuentes arrancan a la vez, así que el plazo efectivo es el menor de los dos
+        total_timeout = search_request.total_timeout or SEARCH_TOTAL_TIMEOUT
+        source_timeout = min(search_request.source_timeout or SEARCH_SOURCE_TIMEOUT, total_timeout)
+
+        async def search_internal(source: Source, timeout: float):
             try:
-                scraper = ICIJOffshoreLeaksScraper(headless=True)
-                entities, challenge = await run_in_executor(
-                    scraper.scrape_search_results,
-                    search_request.entity_name,
-                    2 
+                cancel_token = request_token.child()
+                items, error = await with_deadline(
+                    fetch_source(source, search_request.entity_name, cancel_token, priority),
+                    source.key,
+                    timeout,
+                    cancel_token
                 )
-
-                results = []
-                for entity in entities:
-                    results.append({
-                        "entity_name": entity.get("entity_name"),
-                        "entity_url": entity.get("entity_url"),
-                        "jurisdiction": entity.get("jurisdiction"),
-                        "linked_to": entity.get("linked_to"),
-                        "data_from": entity.get("data_from")
-                    })
+                results = source.map_results(items)
 
                 if len(results) > 0:
-                    message = f"Se encontraron {len(results)} resultado(s) en ICIJ Offshore Leaks"
+                    message = f"Se encontraron {len(results)} resultado(s) en {source.title}"
                 else:
-                    message = f"No se encontraron resultados en ICIJ Offshore Leaks"
+                    message = f"No se encontraron resultados en {source.title}"
 
-                return SearchResponse(
-                    source="ICIJ Offshore Leaks",
+                return SearchResponse.model_construct(
+                    source=source.name,
                     query=search_request.entity_name,
                     hits=len(results),
                     results=results,
                     timestamp=datetime.now().isoformat(),
                     message=message,
-                    error="Human verification challenge detected" if challenge else None
+                    error=error
                 )
+            except asyncio.TimeoutError:
+                logger.warning(f"{source.title} search timed out after {timeout:g}s")
+                return timeout_response(source.name, search_request.entity_name, timeout)
+            except ExecutorSaturated as e:
+                logger.warning(f"{source.title} executor saturated, search rejected")
+                return busy_response(source.name, search_request.entity_name, e)
+            except CircuitOpen as e:
+                logger.warning(f"{source.title} circuit open, search answered without scraping")
+                return circuit_open_response(source, search_request.entity_name, e)
             except Exception as e:
-                logger.error(f"Error in Offshore Leaks search: {str(e)}")
-                return SearchResponse(
-                    source="ICIJ Offshore Leaks",
+                logger.error(f"Error in {source.title} search: {str(e)}")
+                return SearchResponse.model_construct(
+                    source=source.name,
                     query=search_request.entity_name,
                     hits=0,
                     results=[],
                     timestamp=datetime.now().isoformat(),
-                    error=str(e)
+                    error=str(e),
+                    status="error"
                 )
 
-        async def search_worldbank_internal():
-            try:
-                scraper = WorldBankScraper()
-                all_firms = await run_in_executor(scraper.scrape)
-
-                if all_firms:
-                    filtered_firms = scraper.filter_by_name(search_request.entity_name, all_firms)
-                else:
-                    filtered_firms = []
-
-                results = []
-                for firm in filtered_firms:
-                    results.append({
-                        "firm_name": firm.get("SUPP_NAME"),
-                        "address": firm.get("SUPP_ADDR"),
-                        "country": firm.get("COUNTRY_NAME"),
-                        "from_date": firm.get("DEBAR_FROM_DATE"),
-                        "to_date": firm.get("DEBAR_TO_DATE"),
-                        "grounds": firm.get("DEBAR_REASON")
-                    })
+        async def search_first_hit(stages):
+            # Las etapas corren en orden (locales primero) y las fuentes de cada etapa en paralelo;
+            # la primera fuente con hits termina la búsqueda y cancela el resto
+            deadline = asyncio.get_running_loop().time() + total_timeout
+            completed = []
+            for index, stage in enumerate(stages):
+                remaining = deadline - asyncio.get_running_loop().time()
+                timeout = max(0.001, min(source_timeout, remaining))
+                tasks = {asyncio.create_task(search(timeout)): source for source, search in stage}
+                pending = set(tasks)
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    completed.extend(task.result() for task in done)
+                    hit = next((response for response in completed if response.hits > 0), None)
+                    if hit is None:
+                        continue
 
-                if len(results) > 0:
-                    message = f"Se encontraron {len(results)} resultado(s) en World Bank"
-                else:
-                    message = f"No se encontraron resultados en World Bank"
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+                    skipped = [tasks[task] for task in pending]
+                    skipped += [source for later in stages[index + 1:] for source, _ in later]
+                    logger.info(f"First hit in {hit.source}, cancelled: {', '.join(skipped) or 'none'}")
+                    return completed + [
+                        cancelled_response(source, search_request.entity_name, f"Not needed: hit found in {hit.source}")
+                        for source in skipped
+                    ], hit.source
+            return completed, None
 
-                return SearchResponse(
-                    source="World Bank Debarred Firms",
-                    query=search_request.entity_name,
-                    hits=len(results),
-                    results=results,
-                    timestamp=datetime.now().isoformat(),
-                    message=message
-                )
-            except Exception as e:
-                logger.error(f"Error in World Bank search: {str(e)}")
-                return SearchResponse(
-                    source="World Bank Debarred Firms",
-                    query=search_request.entity_name,
-                    hits=0,
-                    results=[],
-                    timestamp=datetime.now().isoformat(),
-                    error=str(e)
+        # Cada fuente usa un token hijo: se cancela sola al vencer su plazo, o todas si el cliente se desconecta
+        matched_source = None
+        async with slot, cancel_on_disconnect(request) as request_token:
+            if search_request.mode == "first_hit":
+                sources, matched_source = await search_first_hit([
+                    [(source.name, functools.partial(search_internal, source)) for source in stage]
+                    for stage in first_hit_stages()
+                ])
+            else:
+                sources = await asyncio.gather(
+                    *(search_internal(source, source_timeout) for source in SOURCES.values())
                 )
+        if request_token.cancelled:
+            raise client_disconnected_error()
 
-        sources = await asyncio.gather(
-            search_ofac_internal(),
-            search_offshore_internal(),
-            search_worldbank_internal()
-        )
-
+        # limit y fields se aplican a cada fuente; cada una trae su propio next_cursor
+        sources = [paginate(source, api_key, search_request.limit, search_request.fields) for source in sources]
         total_hits = sum(source.hits for source in sources)
 
-        return MultiSourceSearchResponse(
+        response = MultiSourceSearchResponse.model_construct(
             query=search_request.entity_name,
             total_hits=total_hits,
             sources=sources,
-            timestamp=datetime.now().isoformat()
+            timestamp=datetime.now().isoformat(),
+            partial=any(source.status in ("timeout", "rejected", "degraded") for source in sources),
+            mode=search_request.mode,
+            matched_source=matched_source
         )
+        # Solo se cachea si todas las fuentes respondieron (las canceladas por first_hit cuentan)
+        cacheable = all(source.status in ("ok", "cancelled") and not source.error for source in sources)
+        return cached_search_response(response, ALL_SOURCES, search_request, cacheable,
+                                      any(source.next_cursor for source in sources))
 
     except HTTPException:
         raise
@@ -402,17 +873,381 @@ async def search_all_sources_endpoint(
         )
 
 
+# Páginas siguientes de una búsqueda con limit, servidas desde el resultado guardado
+@app.get(
+    "/api/v1/search/page",
+    response_model=SearchResponse,
+    tags=["Search"]
+)
+async def search_page_endpoint(
+    request: Request,
+    cursor: str = Query(..., description="next_cursor from a previous search or page"),
+    limit: Optional[int] = Query(None, ge=0, le=SEARCH_PAGE_MAX_LIMIT, description="Page size. Same as the first page if omitted"),
+    fields: Optional[str] = Query(None, description="Comma separated result fields. Same as the first page if omitted"),
+    api_key: str = Depends(get_api_key)
+):
+    await check_rate_limit(request, api_key, ENDPOINT_COSTS["page"])
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    try:
+        return FastJSONResponse(next_page(cursor, api_key, limit, field_list))
+    except CursorExpired:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"error": "Cursor not found", "message": "The cursor is invalid or expired, repeat the search"}
+        )
+
+
+# Screening masivo: fuentes locales en una pasada y de navegador en cola propia
+BULK_SOURCES = ["ofac", "offshore-leaks", "world-bank"]
+
+
+async def bulk_screen_world_bank(names: List[str], cancel_token: Optional[CancellationToken] = None) -> Dict[str, dict]:
+    all_firms = await get_world_bank_firms(cancel_token, priority="batch", wait=True)
+    scraper = WorldBankScraper()
+    matches = await run_in_executor(
+        scraper.match_names, names, all_firms, source="world-bank", wait=True, priority="batch"
+    )
+    return {
+        name: {
+            "hits": len(firms),
+            "results": [map_world_bank_firm(firm) for firm in firms]
+        }
+        for name, firms in matches.items()
+    }
+
+
+def bulk_screen_ofac(names: Iterator[str], cancel_token: Optional[CancellationToken] = None) -> Iterator[Tuple[str, dict]]:
+    # Una sola sesión de navegador por worker para todos sus nombres; con el breaker abierto
+    # los nombres se responden sin pasar por el navegador
+    source_breaker = breaker.get("ofac")
+    skipped: List[Tuple[str, CircuitOpen]] = []
+    # Nombres que pasaron como búsqueda de prueba y todavía no tienen resultado
+    probes = set()
+    names = iter(names)
+
+    def allowed_names() -> Iterator[str]:
+        for name in names:
+            try:
+                probe = source_breaker.check(name)
+            except CircuitOpen as e:
+                skipped.append((name, e))
+                continue
+            if probe:
+                probes.add(name)
+            yield name
+
+    def flush_skipped() -> Iterator[Tuple[str, dict]]:
+        while skipped:
+            name, exc = skipped.pop(0)
+            yield name, circuit_open_result(SOURCES["ofac"], name, exc)
+
+    # La sesión (y Chromium) arranca recién con el primer nombre que el breaker deja pasar
+    allowed = allowed_names()
+    first = next(allowed, None)
+    yield from flush_skipped()
+    if first is None:
+        return
+
+    try:
+        for result in ofac_session(itertools.chain([first], allowed), cancel_token):
+            probe = result["query"] in probes
+            probes.discard(result["query"])
+            record_source_result("ofac", result.get("error"), probe)
+            yield result["query"], {
+                "hits": result["hits"],
+                "results": result["results"],
+                "error": result.get("error")
+            }
+            yield from flush_skipped()
+    except (ScrapeCancelled, ExecutorSaturated):
+        raise
+    except Exception as e:
+        record_source_failure("ofac", str(e), bool(probes))
+        raise
+    finally:
+        # Una prueba que quedó sin resultado (sesión cancelada o caída) libera el lugar de prueba
+        if probes:
+            source_breaker.release(True)
+    yield from flush_skipped()
+
+
+def circuit_open_result(source: Source, name: str, exc: CircuitOpen) -> dict:
+    response = circuit_open_response(source, name, exc)
+    return {"hits": response.hits, "results": response.results, "error": response.error}
+
+
+async def bulk_screen_offshore(name: str, cancel_token: Optional[CancellationToken] = None) -> dict:
+    # El lote espera lugar en el pool en vez de fallar con 503, y siempre como batch
+    source_breaker = breaker.get("offshore-leaks")
+    try:
+        probe = source_breaker.check(name)
+    except CircuitOpen as e:
+        return circuit_open_result(SOURCES["offshore-leaks"], name, e)
+    try:
+        with observe_source("offshore-leaks"):
+            entities, challenge = await run_in_executor(
+                offshore_search, name, 2, cancel_token, source="offshore-leaks", wait=True, priority="batch"
+            )
+    except (ScrapeCancelled, ExecutorSaturated, asyncio.CancelledError):
+        source_breaker.release(probe)
+        raise
+    except Exception as e:
+        record_source_failure("offshore-leaks", str(e), probe)
+        raise
+    results = [map_offshore_entity(entity) for entity in entities]
+    error = CHALLENGE_ERROR if challenge else None
+    record_source_result("offshore-leaks", error, probe)
+    return {
+        "hits": len(results),
+        "results": results,
+        "error": error
+    }
+
+
+class SlotStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse que libera el lugar de concurrencia cuando el stream termina.
+    on_close corre también si el generador nunca arrancó (el cliente se fue antes),
+    caso en el que su finally no se ejecuta.
+    """
+
+    def __init__(self, content, slot: ConcurrencySlot, on_close: Optional[Callable[[], Awaitable]] = None,
+                 **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+            if self.on_close is not None:
+                await self.on_close()
+
+
+BULK_ARCHIVE_FIELDS = ["source", "query", "hits", "error", "results"]
+
+
+def open_bulk_archive() -> Optional[export.BackgroundWriter]:
+    """Archivo donde se escribe el screening a medida que se transmite, si BULK_ARCHIVE_DIR está definido"""
+    if not BULK_ARCHIVE_DIR:
+        return None
+    compression = None if BULK_ARCHIVE_COMPRESSION == "none" else BULK_ARCHIVE_COMPRESSION
+    path = export.default_path(f"bulk_{secrets.token_hex(4)}", BULK_ARCHIVE_FORMAT, compression, BULK_ARCHIVE_DIR)
+    try:
+        # gzip y los row groups de Parquet se escriben en un hilo aparte, no en el event loop
+        return export.BackgroundWriter(
+            export.ExportWriter(path, BULK_ARCHIVE_FORMAT, compression, fields=BULK_ARCHIVE_FIELDS)
+        )
+    except (export.ExportError, OSError) as e:
+        logger.error(f"Cannot open bulk archive {path}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"error": "Bulk archive unavailable", "message": str(e)}
+        )
+
+
+async def bulk_screening_response(request: Request, raw_names: List[str], sources: Optional[List[str]],
+                                  api_key: str) -> StreamingResponse:
+    sources = sources or BULK_SOURCES
+    unknown = [source for source in sources if source not in BULK_SOURCES]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown sources: {', '.join(unknown)}. Valid sources: {', '.join(BULK_SOURCES)}"
+        )
+
+    names = dedupe_names(raw_names)
+    if not names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No valid entity names were provided"
+        )
+    if len(names) > BULK_MAX_NAMES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Maximum {BULK_MAX_NAMES} unique names per bulk request"
+        )
+
+    # El screening masivo ocupa un lugar de concurrencia de la key hasta que termina el stream;
+    # la cuota se cobra después de validar la lista y tomar el lugar
+    slot = acquire_concurrency_slot(api_key)
+    await charge_with_slot(request, api_key, ENDPOINT_COSTS["bulk"], slot)
+    try:
+        archive = open_bulk_archive()
+    except HTTPException:
+        slot.release()
+        raise
+
+    # Si el cliente se desconecta a mitad del stream se cancelan los scrapers en curso
+    cancel_token = CancellationToken()
+    active_tokens.add(cancel_token)
+
+    local_sources = {}
+    if "world-bank" in sources:
+        local_sources["World Bank Debarred Firms"] = functools.partial(bulk_screen_world_bank, cancel_token=cancel_token)
+
+    session_sources = {}
+    if "ofac" in sources:
+        session_sources["OFAC"] = (
+            functools.partial(bulk_screen_ofac, cancel_token=cancel_token),
+            BULK_BROWSER_CONCURRENCY["ofac"]
+        )
+
+    browser_sources = {}
+    if "offshore-leaks" in sources:
+        browser_sources["ICIJ Offshore Leaks"] = (
+            functools.partial(bulk_screen_offshore, cancel_token=cancel_token),
+            BULK_BROWSER_CONCURRENCY["offshore-leaks"]
+        )
+
+    logger.info(f"Bulk screening of {len(names)} names ({len(raw_names)} received) in {', '.join(sources)}")
+
+    closed = False
+
+    async def close_job(finished: bool):
+        # Una sola vez: al terminar el stream o, si nunca empezó, al cerrar la respuesta
+        nonlocal closed
+        if closed:
+            return
+        closed = True
+        if not finished:
+            logger.info("Bulk screening stream closed early, cancelling scrapes")
+            cancel_token.cancel("client disconnected")
+        active_tokens.discard(cancel_token)
+        if archive:
+            # Si el stream se cortó el archivo queda con lo recibido hasta ese momento
+            await asyncio.get_running_loop().run_in_executor(None, archive.close)
+            if archive.error is not None:
+                logger.error(f"Bulk screening archive {archive.path} failed: {str(archive.error)}")
+            logger.info(f"Bulk screening archived: {archive.count} rows in {archive.path}")
+
+    async def ndjson_lines():
+        yield json.dumps({
+            "type": "job",
+            "received": len(raw_names),
+            "unique_names": len(names),
+            "duplicates_removed": len(raw_names) - len(names),
+            "sources": sources,
+            "archive": os.path.basename(archive.path) if archive else None,
+            "timestamp": datetime.now().isoformat()
+        }, ensure_ascii=False) + "\n"
+        finished = False
+        try:
+            async for line in stream_bulk_screening(
+                names, local_sources, browser_sources, session_sources, BULK_PROGRESS_INTERVAL,
+                session_executors={"OFAC": executors["ofac"]}
+            ):
+                if archive and line["type"] == "result":
+                    row = {field: line[field] for field in BULK_ARCHIVE_FIELDS}
+                    if not archive.try_write(row):
+                        # El archivo va atrasado: se espera lugar en su cola fuera del event loop,
+                        # y mientras tanto no se leen más resultados
+                        await asyncio.get_running_loop().run_in_executor(None, archive.write, row)
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+            finished = True
+        finally:
+            await close_job(finished)
+
+    return SlotStreamingResponse(
+        ndjson_lines(), slot, on_close=functools.partial(close_job, False), media_type="application/x-ndjson"
+    )
+
+
+# Screening masivo a partir de una lista JSON
+@app.post(
+    "/api/v1/search/bulk",
+    tags=["Search"]
+)
+async def bulk_search_endpoint(
+    request: Request,
+    bulk_request: BulkSearchRequest,
+    api_key: str = Depends(get_api_key)
+):
+    return await bulk_screening_response(request, bulk_request.entity_names, bulk_request.sources, api_key)
+
+
+# Screening masivo a partir de un archivo (.txt un nombre por línea, o .csv primera columna)
+@app.post(
+    "/api/v1/search/bulk/file",
+    tags=["Search"]
+)
+async def bulk_search_file_endpoint(
+    request: Request,
+    file: UploadFile = File(...),
+    sources: Optional[str] = Form(None, description="Comma separated sources"),
+    api_key: str = Depends(get_api_key)
+):
+    content = await file.read()
+    raw_names = parse_names_file(content, file.filename or "")
+    source_list = [source.strip() for source in sources.split(",") if source.strip()] if sources else None
+    return await bulk_screening_response(request, raw_names, source_list, api_key)
+
+
+# Métricas en formato Prometheus
+@app.get("/metrics", tags=["General"], response_class=PlainTextResponse)
+async def metrics_endpoint():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Estado de los pools por fuente: workers, profundidad de cola y tiempos de espera
+@app.get(
+    "/api/v1/executors",
+    tags=["General"]
+)
+async def get_executors_status(api_key: str = Depends(get_api_key)):
+    return {
+        "mode": SCRAPER_EXECUTION_MODE,
+        "executors": get_executor_stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+# Profiling por muestreo del proceso en vivo (solo API keys de administrador)
+@app.get(
+    "/api/v1/admin/profile",
+    tags=["Admin"]
+)
+async def profile_endpoint(
+    seconds: float = Query(10, gt=0, le=60, description="Sampling duration in seconds"),
+    interval_ms: float = Query(10, ge=1, le=1000, description="Milliseconds between samples"),
+    format: str = Query("collapsed", pattern="^(collapsed|svg)$", description="collapsed stacks or flamegraph svg"),
+    api_key: str = Depends(get_admin_api_key)
+):
+    logger.info(f"Profiling for {seconds:g}s every {interval_ms:g}ms ({format})")
+    try:
+        # El muestreo corre en su propio hilo; el event loop sigue atendiendo mientras tanto
+        output = await asyncio.to_thread(profile, seconds, interval_ms / 1000, format)
+    except ProfilerBusy:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"error": "Profiler busy", "message": "Another profiling session is already running"}
+        )
+
+    if format == "svg":
+        return Response(output, media_type="image/svg+xml")
+    return PlainTextResponse(output)
+
+
 # Rate Limit Status
 @app.get(
     "/api/v1/rate-limit",
     tags=["General"]
 )
 async def get_rate_limit_status(api_key: str = Depends(get_api_key)):
-    rate_info = rate_limiter.get_rate_limit_info(api_key)
+    tier = get_tier(api_key)
+    rate_info = await rate_limiter.get_rate_limit_info(api_key, tier["quota_per_minute"])
 
     return {
         "api_key": f"{api_key[:8]}...{api_key[-4:]}",
+        "tier": tier["name"],
         "rate_limit": rate_info,
+        "concurrency": {
+            "limit": tier["max_concurrent"],
+            "in_flight": concurrency_limiter.get_in_flight(api_key)
+        },
+        "endpoint_costs": ENDPOINT_COSTS,
         "timestamp": datetime.now().isoformat()
     }
 
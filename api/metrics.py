@@ -0,0 +1,248 @@
+"""
+Métricas en formato Prometheus (text exposition 0.0.4) sin dependencias.
+
+Registro en memoria del proceso: cada observación es un incremento bajo un
+lock, y el texto se arma solo cuando alguien consulta /metrics. Con varios
+workers de uvicorn cada proceso expone sus propias series.
+"""
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from scrappers import telemetry
+
+LabelValues = Tuple[str, ...]
+
+# Buckets en segundos: de una consulta local (ms) a un scraping con navegador (minutos)
+LATENCY_BUCKETS = (0.005, 0.025, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 90, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """Gauge cuyo valor se calcula al consultar /metrics (p. ej. la cola de un pool)"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=(), callback: Callable[[], Dict[LabelValues, float]] = None):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+
+    def collect(self) -> List[str]:
+        values = sorted(self.callback().items()) if self.callback else []
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values]
+
+
+class CallbackCounter(Gauge):
+    """Contador acumulado que ya lleva otro componente y se lee al consultar /metrics"""
+    kind = "counter"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Por serie: conteo por bucket (no acumulado), suma y total
+        self._series: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (counts[:], total, count)) for key, (counts, total, count) in self._series.items())
+        lines = []
+        for key, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by endpoint", ("method", "endpoint", "status")
+))
+source_search_duration = registry.register(Histogram(
+    "source_search_duration_seconds", "Scraping latency by source and outcome", ("source", "status")
+))
+browser_launch_duration = registry.register(Histogram(
+    "browser_launch_seconds", "Time to launch Chromium", ("source",)
+))
+page_load_duration = registry.register(Histogram(
+    "page_load_seconds", "Time for page.goto to reach networkidle", ("source",)
+))
+download_duration = registry.register(Histogram(
+    "download_seconds", "Time to download a source dataset", ("source",)
+))
+challenge_detections = registry.register(Counter(
+    "challenge_detections_total", "Human verification challenges detected", ("source",)
+))
+rate_limit_rejections = registry.register(Counter(
+    "rate_limit_rejections_total", "Requests rejected by the rate limiter", ("reason",)
+))
+cache_requests = registry.register(Counter(
+    "cache_requests_total", "Cache lookups by result", ("cache", "result")
+))
+circuit_rejections = registry.register(Counter(
+    "circuit_rejections_total", "Searches answered without scraping because the circuit was open", ("source",)
+))
+
+
+def _executor_values(field: str, by_class: bool = False) -> Callable[[], Dict[LabelValues, float]]:
+    # Import diferido: api.executors no depende de las métricas
+    def collect():
+        from api.executors import get_executor_stats
+        values = {}
+        for source, stats in get_executor_stats().items():
+            if by_class:
+                for priority, class_stats in stats["classes"].items():
+                    values[(source, priority)] = class_stats[field]
+            else:
+                values[(source,)] = stats[field]
+        return values
+    return collect
+
+
+registry.register(Gauge(
+    "executor_queue_depth", "Jobs waiting in a source pool", ("source", "priority"),
+    _executor_values("queue_depth", by_class=True)
+))
+registry.register(Gauge(
+    "executor_running", "Jobs running in a source pool", ("source",), _executor_values("running")
+))
+registry.register(CallbackCounter(
+    "executor_rejected_total", "Jobs rejected because the source pool was full", ("source",),
+    _executor_values("rejected")
+))
+registry.register(Gauge(
+    "executor_avg_wait_seconds", "Average queue wait in a source pool", ("source", "priority"),
+    _executor_values("avg_wait_seconds", by_class=True)
+))
+
+
+def _cache_hit_ratio() -> Dict[LabelValues, float]:
+    with cache_requests._lock:
+        values = dict(cache_requests._values)
+    ratios = {}
+    for cache in {key[0] for key in values}:
+        hits = values.get((cache, "hit"), 0)
+        total = hits + values.get((cache, "miss"), 0)
+        ratios[(cache,)] = hits / total if total else 0.0
+    return ratios
+
+
+registry.register(Gauge("cache_hit_ratio", "Cache hits over lookups", ("cache",), _cache_hit_ratio))
+
+
+def _circuit_states() -> Dict[LabelValues, float]:
+    # 0 closed, 1 half_open, 2 open
+    from api.breaker import STATES, get_breaker_stats
+    return {(source,): STATES.index(stats["state"]) for source, stats in get_breaker_stats().items()}
+
+
+registry.register(Gauge(
+    "circuit_state", "Circuit breaker state by source (0 closed, 1 half_open, 2 open)", ("source",), _circuit_states
+))
+
+
+# Tiempos y eventos que reportan los scrapers (ver scrappers/telemetry.py)
+_TELEMETRY_HISTOGRAMS = {
+    "browser_launch": browser_launch_duration,
+    "page_load": page_load_duration,
+    "download": download_duration
+}
+
+
+def _telemetry_sink(record: telemetry.Record):
+    kind, name, value, labels, _ = record
+    if kind == "timing" and name in _TELEMETRY_HISTOGRAMS:
+        _TELEMETRY_HISTOGRAMS[name].observe(value, **labels)
+    elif kind == "event" and name == "challenge_detected":
+        challenge_detections.inc(**labels)
+
+
+telemetry.add_sink(_telemetry_sink)
+
+
+def render_metrics() -> str:
+    return registry.render()
@@ -2,13 +2,17 @@
 Modelos para las respuestas y solicitudes de la API
 """
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 
+from config import SEARCH_PAGE_MAX_LIMIT
+
 
 class EntitySearchRequest(BaseModel):
     """Modelo de solicitud para búsqueda de entidad"""
     entity_name: str = Field(..., min_length=1, max_length=200, description="Nombre de la entidad a buscar")
+    limit: Optional[int] = Field(None, ge=0, le=SEARCH_PAGE_MAX_LIMIT, description="Maximum results per page (per source in /all). 0 returns only the hit count. All results if omitted")
+    fields: Optional[List[str]] = Field(None, max_length=20, description="Result fields to return, e.g. ['firm_name', 'entity_name']. All fields if omitted")
 
     class Config:
         json_schema_extra = {
@@ -18,6 +22,37 @@ class EntitySearchRequest(BaseModel):
         }
 
 
+class MultiSourceSearchRequest(EntitySearchRequest):
+    """Modelo de solicitud para búsqueda en múltiples fuentes con tiempos máximos"""
+    source_timeout: Optional[float] = Field(None, gt=0, le=600, description="Maximum seconds per source. Server default if omitted")
+    total_timeout: Optional[float] = Field(None, gt=0, le=600, description="Maximum seconds for the whole search. Server default if omitted")
+    mode: Literal["all", "first_hit"] = Field("all", description="'all' waits for every source; 'first_hit' returns as soon as any source has hits, querying local sources first")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "entity_name": "London Foundation",
+                "source_timeout": 60,
+                "total_timeout": 90,
+                "mode": "all"
+            }
+        }
+
+
+class BulkSearchRequest(BaseModel):
+    """Modelo de solicitud para screening masivo de entidades"""
+    entity_names: List[str] = Field(..., min_length=1, description="Names of the entities to screen")
+    sources: Optional[List[str]] = Field(None, description="Sources to query (ofac, offshore-leaks, world-bank). All of them by default")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "entity_names": ["London Foundation", "PEMEX", "Bank"],
+                "sources": ["world-bank", "ofac"]
+            }
+        }
+
+
 class SearchResponse(BaseModel):
     """Modelo de respuesta de búsqueda"""
     source: str = Field(..., description="Data source name")
@@ -27,6 +62,8 @@ class SearchResponse(BaseModel):
     timestamp: str = Field(..., description="Timestamp of the search")
     message: Optional[str] = Field(None, description="Informational message")
     error: Optional[str] = Field(None, description="Error message if any")
+    status: str = Field("ok", description="Search status: ok, timeout, error, cancelled, rejected (source busy) or degraded (circuit open)")
+    next_cursor: Optional[str] = Field(None, description="Cursor for GET /api/v1/search/page when more results remain")
 
     class Config:
         json_schema_extra = {
@@ -54,6 +91,9 @@ class MultiSourceSearchResponse(BaseModel):
     total_hits: int
     sources: List[SearchResponse]
     timestamp: str
+    partial: bool = Field(False, description="True if any source did not finish in time")
+    mode: str = Field("all", description="Search mode used")
+    matched_source: Optional[str] = Field(None, description="In first_hit mode, the source that reported hits first")
 
 
 class ErrorResponse(BaseModel):
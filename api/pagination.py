@@ -0,0 +1,104 @@
+"""
+Paginación por cursor y proyección de campos de los resultados de búsqueda.
+
+Cuando el cliente pide `limit` y hay más resultados que esa página, el
+resultado completo queda guardado en memoria por SEARCH_RESULTS_TTL y la
+respuesta trae un `next_cursor`. GET /api/v1/search/page sirve las páginas
+siguientes desde ahí, sin volver a scrapear. El cursor es opaco para el cliente:
+lleva el id del resultado guardado, el desplazamiento, el tamaño de página y
+los campos pedidos.
+"""
+import base64
+import binascii
+import json
+import secrets
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from api.cache import TTLCache
+from api.models import SearchResponse
+from config import SEARCH_RESULTS_TTL, SEARCH_RESULTS_MAX
+
+result_sets = TTLCache("search-results", SEARCH_RESULTS_TTL, max_entries=SEARCH_RESULTS_MAX)
+
+
+class CursorExpired(Exception):
+    """El cursor no es válido, venció o es de otra API key"""
+
+
+def project(results: List[Dict], fields: Optional[List[str]]) -> List[Dict]:
+    # Los campos que no tiene una fuente se omiten: en /all cada fuente usa nombres distintos
+    if not fields:
+        return results
+    return [{field: result[field] for field in fields if field in result} for result in results]
+
+
+def encode_cursor(result_set_id: str, offset: int, limit: int, fields: Optional[List[str]]) -> str:
+    raw = json.dumps([result_set_id, offset, limit, fields], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        result_set_id, offset, limit, fields = json.loads(raw)
+        offset = max(int(offset), 0)
+    except (binascii.Error, ValueError, TypeError):
+        raise CursorExpired()
+    # El cursor viene del cliente: un limit o fields con otro tipo no es un cursor nuestro
+    if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool) or limit < 0):
+        raise CursorExpired()
+    if fields is not None and (not isinstance(fields, list) or not all(isinstance(field, str) for field in fields)):
+        raise CursorExpired()
+    return str(result_set_id), offset, limit, fields
+
+
+def _page(response: SearchResponse, results: List[Dict], result_set_id: Optional[str], offset: int,
+          limit: Optional[int], fields: Optional[List[str]]) -> SearchResponse:
+    end = len(results) if limit is None else offset + limit
+    response.results = project(results[offset:end], fields)
+    # Con limit=0 (solo el conteo) el cursor trae el resto de una vez, salvo que se pida otro limit
+    response.next_cursor = (
+        encode_cursor(result_set_id, end, limit or None, fields) if result_set_id and end < len(results) else None
+    )
+    return response
+
+
+def paginate(response: SearchResponse, api_key: str, limit: Optional[int] = None,
+             fields: Optional[List[str]] = None) -> SearchResponse:
+    """Deja en la respuesta la primera página; guarda el resto si hace falta un cursor"""
+    if limit is None and not fields:
+        return response
+
+    results = response.results
+    result_set_id = None
+    if limit is not None and len(results) > limit:
+        result_set_id = secrets.token_urlsafe(12)
+        result_sets.set(result_set_id, {
+            "api_key": api_key,
+            "source": response.source,
+            "query": response.query,
+            "results": results
+        })
+    return _page(response, results, result_set_id, 0, limit, fields)
+
+
+def next_page(cursor: str, api_key: str, limit: Optional[int] = None,
+              fields: Optional[List[str]] = None) -> SearchResponse:
+    """Página siguiente de un resultado guardado; limit y fields pueden cambiar entre páginas"""
+    result_set_id, offset, cursor_limit, cursor_fields = decode_cursor(cursor)
+    result_set = result_sets.get(result_set_id)
+    if result_set is None or result_set["api_key"] != api_key:
+        raise CursorExpired()
+
+    results = result_set["results"]
+    response = SearchResponse.model_construct(
+        source=result_set["source"],
+        query=result_set["query"],
+        hits=len(results),
+        results=[],
+        timestamp=datetime.now().isoformat()
+    )
+    return _page(response, results, result_set_id, offset,
+                 cursor_limit if limit is None else limit,
+                 cursor_fields if fields is None else fields)
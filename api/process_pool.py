@@ -0,0 +1,273 @@
+"""
+Ejecución de scrapers en procesos aislados.
+
+Con SCRAPER_EXECUTION_MODE=process cada worker de los pools por fuente
+(api/executors.py) supervisa su propio subproceso: le envía la tarea por un
+pipe y espera el resultado revisando el token de cancelación. El parseo con
+BeautifulSoup deja de competir por el GIL con el servidor, y si Playwright o
+Chromium se caen solo falla ese trabajo; el worker arranca otro proceso.
+
+Los procesos se reciclan cada PROCESS_MAX_JOBS trabajos, y al cancelar (plazo
+vencido o cliente desconectado) el proceso se termina en lugar de esperar.
+Las listas de dicts viajan en formato columnar: nombres de columnas una vez y
+filas como tuplas, lo que reduce bastante el pickle de los resultados grandes.
+La telemetría del hijo viaja con cada mensaje y se reproduce en el padre.
+"""
+import logging
+import multiprocessing
+import threading
+import weakref
+from typing import Any, Callable, Iterator, Optional
+
+from config import SCRAPER_EXECUTION_MODE, PROCESS_MAX_JOBS
+from scrappers import telemetry
+from scrappers.cancellation import CancellationToken, ScrapeCancelled
+
+logger = logging.getLogger(__name__)
+
+# spawn y no fork: el proceso padre tiene hilos y un event loop corriendo
+_context = multiprocessing.get_context("spawn")
+_local = threading.local()
+
+_COLUMNS = "__columns__"
+# Todos los subprocesos vivos, para cerrarlos al apagar el servidor
+_workers: "weakref.WeakSet[ProcessWorker]" = weakref.WeakSet()
+
+
+class WorkerCrashed(RuntimeError):
+    """El subproceso murió durante el trabajo (p. ej. se cayó el driver de Playwright)"""
+
+
+class TaskFailed(RuntimeError):
+    """La tarea lanzó una excepción dentro del subproceso"""
+
+
+def pack(value: Any) -> Any:
+    """Convierte listas de dicts en {columnas, filas} para que el pickle sea más chico"""
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        columns = list(dict.fromkeys(key for item in value for key in item))
+        return {_COLUMNS: columns, "rows": [tuple(pack(item.get(key)) for key in columns) for item in value]}
+    if isinstance(value, dict):
+        return {key: pack(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return tuple(pack(item) for item in value)
+    return value
+
+
+def unpack(value: Any) -> Any:
+    if isinstance(value, dict):
+        if _COLUMNS in value:
+            columns = value[_COLUMNS]
+            return [dict(zip(columns, (unpack(item) for item in row))) for row in value["rows"]]
+        return {key: unpack(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return tuple(unpack(item) for item in value)
+    return value
+
+
+# Tareas que sabe ejecutar el subproceso. Los imports van dentro para que el
+# proceso padre no cargue nada extra y cada hijo cargue solo lo que usa
+
+def _task_ofac(entity_name: str) -> dict:
+    from scrappers.ofac import search_ofac
+    return search_ofac(entity_name)
+
+
+def _task_offshore(query: str, max_pages: Optional[int]) -> tuple:
+    from scrappers.offshore import ICIJOffshoreLeaksScraper
+    return ICIJOffshoreLeaksScraper(headless=True).scrape_search_results(query, max_pages)
+
+
+def _task_world_bank(params: Optional[dict]) -> list:
+    from scrappers.world_bank import WorldBankScraper
+    return WorldBankScraper().scrape(params)
+
+
+def _task_browser_probe() -> float:
+    from scrappers.browser import probe_browser
+    return probe_browser()
+
+
+def _task_ofac_batch(names: Iterator[str]) -> Iterator[dict]:
+    from scrappers.ofac import search_ofac_batch
+    return search_ofac_batch(names)
+
+
+TASKS = {
+    "ofac": _task_ofac,
+    "offshore-leaks": _task_offshore,
+    "world-bank": _task_world_bank,
+    "browser-probe": _task_browser_probe
+}
+STREAM_TASKS = {
+    "ofac-batch": _task_ofac_batch
+}
+
+
+def _child_main(conn):
+    # Bucle del subproceso: una tarea a la vez hasta que el padre cierre el pipe
+    def names_from_parent() -> Iterator[str]:
+        while True:
+            conn.send(("next",))
+            name = conn.recv()
+            if name is None:
+                return
+            yield name
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        _, task, args = message
+        with telemetry.collect() as records:
+            try:
+                if task in STREAM_TASKS:
+                    for item in STREAM_TASKS[task](names_from_parent()):
+                        conn.send(("item", records[:], pack(item)))
+                        records.clear()
+                    conn.send(("done", records[:]))
+                else:
+                    result = pack(TASKS[task](*args))
+                    conn.send(("result", records[:], result))
+            except Exception as e:
+                conn.send(("error", records[:], type(e).__name__, str(e)))
+
+
+class ProcessWorker:
+    """Un subproceso y su pipe; lo usa siempre el mismo hilo del pool"""
+
+    def __init__(self):
+        self.conn, child_conn = _context.Pipe()
+        self.process = _context.Process(target=_child_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        _workers.add(self)
+
+    def _receive(self, cancel_token: Optional[CancellationToken], poll_interval: float = 0.25):
+        while True:
+            if cancel_token is not None and cancel_token.cancelled:
+                self.terminate()
+                raise ScrapeCancelled(cancel_token.reason)
+            if self.conn.poll(poll_interval):
+                try:
+                    message = self.conn.recv()
+                except (EOFError, OSError):
+                    break
+                # Los tiempos medidos en el hijo se registran como si fueran de este hilo
+                if message[0] != "next":
+                    telemetry.replay(message[1])
+                return message
+            if not self.process.is_alive():
+                break
+        self.terminate()
+        raise WorkerCrashed(f"Scraper process exited with code {self.process.exitcode}")
+
+    def _raise_error(self, message):
+        _, _, error_type, error = message
+        raise TaskFailed(f"{error_type}: {error}")
+
+    def call(self, task: str, args: tuple, cancel_token: Optional[CancellationToken] = None):
+        self.jobs += 1
+        self.conn.send(("call", task, args))
+        message = self._receive(cancel_token)
+        if message[0] == "error":
+            self._raise_error(message)
+        return unpack(message[2])
+
+    def stream(self, task: str, names: Iterator[str], cancel_token: Optional[CancellationToken] = None):
+        # El hijo pide los nombres de a uno, así se sigue respetando la cola compartida del padre
+        self.jobs += 1
+        self.conn.send(("call", task, ()))
+        while True:
+            message = self._receive(cancel_token)
+            if message[0] == "next":
+                self.conn.send(next(names, None))
+            elif message[0] == "item":
+                yield unpack(message[2])
+            elif message[0] == "done":
+                return
+            else:
+                self._raise_error(message)
+
+    def terminate(self):
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(5)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        self.conn.close()
+
+    def close(self):
+        # Cierre ordenado: el hijo termina su bucle al recibir EOF
+        self.conn.close()
+        self.process.join(5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+
+def _get_worker() -> ProcessWorker:
+    # Cada hilo del pool tiene su proceso; se recicla tras PROCESS_MAX_JOBS trabajos o si murió
+    worker: Optional[ProcessWorker] = getattr(_local, "worker", None)
+    if worker is not None and (worker.jobs >= PROCESS_MAX_JOBS or not worker.process.is_alive()):
+        worker.close()
+        worker = None
+    if worker is None:
+        worker = ProcessWorker()
+        _local.worker = worker
+    return worker
+
+
+def _discard_worker():
+    worker = getattr(_local, "worker", None)
+    if worker is not None:
+        worker.terminate()
+        _local.worker = None
+
+
+def run_task(task: str, *args, cancel_token: Optional[CancellationToken] = None):
+    worker = _get_worker()
+    try:
+        return worker.call(task, args, cancel_token)
+    except (ScrapeCancelled, WorkerCrashed):
+        _discard_worker()
+        raise
+
+
+def run_stream_task(task: str, names: Iterator[str], cancel_token: Optional[CancellationToken] = None):
+    worker = _get_worker()
+    try:
+        yield from worker.stream(task, names, cancel_token)
+    except BaseException:
+        # Si el stream se corta a mitad el proceso queda en un estado desconocido
+        _discard_worker()
+        raise
+
+
+def shutdown_workers() -> int:
+    """Termina los subprocesos de scraping (y con ellos sus navegadores); devuelve cuántos había"""
+    workers = [worker for worker in list(_workers) if worker.process.is_alive()]
+    for worker in workers:
+        worker.terminate()
+    return len(workers)
+
+
+def isolated(task: str, func: Callable) -> Callable:
+    """
+    En modo thread devuelve func tal cual. En modo process devuelve una función
+    con la misma firma (el token de cancelación como último argumento) que corre
+    la tarea en el subproceso del hilo actual.
+    """
+    if SCRAPER_EXECUTION_MODE != "process":
+        return func
+
+    def run(*args):
+        *task_args, cancel_token = args
+        if task in STREAM_TASKS:
+            return run_stream_task(task, task_args[0], cancel_token=cancel_token)
+        return run_task(task, *task_args, cancel_token=cancel_token)
+
+    return run
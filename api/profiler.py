@@ -0,0 +1,131 @@
+"""
+Profiler por muestreo para usar en producción.
+
+Un hilo aparte toma cada `interval` segundos la pila de todos los hilos del
+proceso (event loop y workers de los pools) con sys._current_frames(), sin
+instrumentar código ni frenar los requests en curso. El resultado son pilas
+colapsadas (formato de flamegraph.pl / speedscope) o un flamegraph SVG.
+"""
+import html
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+class ProfilerBusy(Exception):
+    """Ya hay un profiling en curso en este proceso"""
+
+
+_running = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    # Se agrupa por función (línea de definición), no por línea en ejecución
+    label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label.replace(";", ":")
+
+
+def sample_stacks(seconds: float, interval: float = 0.01, max_depth: int = 128) -> Counter:
+    """Muestrea durante `seconds` y devuelve {pila colapsada: muestras}"""
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusy()
+
+    try:
+        own_id = threading.get_ident()
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels: List[str] = []
+                while frame is not None and len(labels) < max_depth:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, f"thread-{thread_id}"))
+                stacks[";".join(reversed(labels))] += 1
+            time.sleep(interval)
+        return stacks
+    finally:
+        _running.release()
+
+
+def collapsed(stacks: Counter) -> str:
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
+
+
+def _build_tree(stacks: Counter) -> Dict:
+    root = {"name": "all", "value": 0, "children": {}}
+    for stack, count in stacks.items():
+        root["value"] += count
+        node = root
+        for name in stack.split(";"):
+            child = node["children"].setdefault(name, {"name": name, "value": 0, "children": {}})
+            child["value"] += count
+            node = child
+    return root
+
+
+def _color(name: str) -> str:
+    # Colores cálidos estables por nombre, como flamegraph.pl
+    seed = sum(ord(c) for c in name)
+    return f"rgb({205 + seed % 50},{80 + seed * 7 % 120},{40 + seed * 13 % 50})"
+
+
+def flamegraph_svg(stacks: Counter, title: str = "Flamegraph", width: int = 1200,
+                   row_height: int = 16, min_width: float = 0.5) -> str:
+    root = _build_tree(stacks)
+    total = root["value"] or 1
+
+    def visible_depth(node: Dict, depth: int) -> int:
+        children = [child for child in node["children"].values() if child["value"] / total * width >= min_width]
+        return max((visible_depth(child, depth + 1) for child in children), default=depth)
+
+    # Raíz abajo y hojas arriba, como un flamegraph clásico
+    header = 24
+    height = header + (visible_depth(root, 0) + 1) * row_height
+    rects: List[str] = []
+
+    def draw(node: Dict, x: float, depth: int):
+        node_width = node["value"] / total * width
+        if node_width < min_width:
+            return
+        y = height - (depth + 1) * row_height
+        name = node["name"]
+        percent = node["value"] / total * 100
+        # Caben ~7px por carácter
+        chars = int(node_width / 7)
+        text = name if len(name) <= chars else (name[:max(chars - 2, 0)] + ".." if chars > 3 else "")
+        rects.append(
+            f'<g><title>{html.escape(name)} ({node["value"]} samples, {percent:.2f}%)</title>'
+            f'<rect x="{x:.2f}" y="{y}" width="{node_width:.2f}" height="{row_height - 1}" '
+            f'fill="{_color(node["name"])}"/>'
+            f'<text x="{x + 3:.2f}" y="{y + row_height - 4}">{html.escape(text)}</text></g>'
+        )
+        child_x = x
+        for child in sorted(node["children"].values(), key=lambda c: c["name"]):
+            draw(child, child_x, depth + 1)
+            child_x += child["value"] / total * width
+
+    draw(root, 0.0, 0)
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="Verdana" font-size="11">\n'
+        f'<text x="{width / 2}" y="16" text-anchor="middle" font-size="14">{html.escape(title)}</text>\n'
+        + "\n".join(rects)
+        + "\n</svg>\n"
+    )
+
+
+def profile(seconds: float, interval: float = 0.01, output: str = "collapsed",
+            title: Optional[str] = None) -> str:
+    stacks = sample_stacks(seconds, interval)
+    if output == "svg":
+        return flamegraph_svg(stacks, title or f"{sum(stacks.values())} samples over {seconds:g}s")
+    return collapsed(stacks)
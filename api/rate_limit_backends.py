@@ -0,0 +1,257 @@
+"""
+Backends de almacenamiento para el RateLimiter.
+
+Cada backend guarda por key el estado de la ventana deslizante
+(inicio de la ventana actual, uso en la actual, uso en la anterior) y hace
+el chequeo y el incremento de forma atómica. El de memoria es por proceso;
+SQLite (WAL) y Redis comparten el estado entre workers y sobreviven a reinicios.
+"""
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# (inicio de la ventana actual, uso en la ventana actual, uso en la anterior)
+WindowState = Tuple[float, float, float]
+
+
+def roll_window(state: Optional[WindowState], now: float, time_window: int) -> WindowState:
+    window_start = now - (now % time_window)
+    if state is None:
+        return window_start, 0, 0
+
+    start, current, previous = state
+    if start == window_start:
+        return state
+
+    # Si pasó exactamente una ventana, la actual pasa a ser la anterior; si pasaron más, ambas quedan en 0
+    elapsed_windows = round((window_start - start) / time_window)
+    return window_start, 0, current if elapsed_windows == 1 else 0
+
+
+def estimate_usage(state: WindowState, now: float, time_window: int) -> float:
+    start, current, previous = state
+    previous_weight = 1 - (now - start) / time_window
+    return previous * previous_weight + current
+
+
+class RateLimitBackend:
+    # True si las operaciones bloquean (disco o red) y deben correr fuera del event loop
+    blocking = False
+
+    def hit(self, key: str, now: float, time_window: int, max_requests: int, cost: float = 1) -> Tuple[bool, WindowState]:
+        """Suma `cost` al uso de la key si cabe en el límite. Devuelve si se permitió y el estado resultante"""
+        raise NotImplementedError()
+
+    def peek(self, key: str, now: float, time_window: int) -> WindowState:
+        raise NotImplementedError()
+
+    def delete(self, key: str):
+        raise NotImplementedError()
+
+    def clear(self):
+        raise NotImplementedError()
+
+    def sweep(self, cutoff: float):
+        """Elimina las keys cuya ventana empezó antes de `cutoff`"""
+
+    def __len__(self) -> int:
+        return 0
+
+
+class MemoryBackend(RateLimitBackend):
+    """Estado en un dict del proceso. Sin awaits de por medio, en el event loop cada hit es atómico"""
+
+    def __init__(self):
+        self.windows: Dict[str, List[float]] = {}
+
+    def hit(self, key, now, time_window, max_requests, cost=1):
+        window = self.windows.get(key)
+        state = roll_window(tuple(window) if window else None, now, time_window)
+
+        allowed = estimate_usage(state, now, time_window) + cost <= max_requests
+        if allowed:
+            state = (state[0], state[1] + cost, state[2])
+        self.windows[key] = list(state)
+        return allowed, state
+
+    def peek(self, key, now, time_window):
+        window = self.windows.get(key)
+        return roll_window(tuple(window) if window else None, now, time_window)
+
+    def delete(self, key):
+        self.windows.pop(key, None)
+
+    def clear(self):
+        self.windows.clear()
+
+    def sweep(self, cutoff):
+        idle = [key for key, window in self.windows.items() if window[0] <= cutoff]
+        for key in idle:
+            del self.windows[key]
+
+    def __len__(self):
+        return len(self.windows)
+
+
+def _storage_key(key: str) -> str:
+    # Las API keys no se guardan en claro fuera del proceso
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class SQLiteBackend(RateLimitBackend):
+    """
+    Estado compartido entre los workers de una misma máquina en un archivo SQLite
+    en modo WAL. BEGIN IMMEDIATE toma el lock de escritura antes de leer, así el
+    chequeo y el incremento son atómicos entre procesos.
+    """
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        # sqlite3 no comparte conexiones entre hilos: una por hilo
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, window_start REAL NOT NULL, current REAL NOT NULL, previous REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _select(self, conn: sqlite3.Connection, key: str) -> Optional[WindowState]:
+        row = conn.execute(
+            "SELECT window_start, current, previous FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        return tuple(row) if row else None
+
+    def hit(self, key, now, time_window, max_requests, cost=1):
+        key = _storage_key(key)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            state = roll_window(self._select(conn, key), now, time_window)
+            allowed = estimate_usage(state, now, time_window) + cost <= max_requests
+            if allowed:
+                state = (state[0], state[1] + cost, state[2])
+            conn.execute(
+                "INSERT INTO rate_limits (key, window_start, current, previous) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET window_start = excluded.window_start, "
+                "current = excluded.current, previous = excluded.previous",
+                (key, *state)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, state
+
+    def peek(self, key, now, time_window):
+        return roll_window(self._select(self._connect(), _storage_key(key)), now, time_window)
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM rate_limits WHERE key = ?", (_storage_key(key),))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM rate_limits")
+
+    def sweep(self, cutoff):
+        self._connect().execute("DELETE FROM rate_limits WHERE window_start <= ?", (cutoff,))
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+# Mismo cálculo que roll_window/estimate_usage, ejecutado de forma atómica dentro de Redis
+_REDIS_HIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local time_window = tonumber(ARGV[2])
+local max_requests = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local window_start = now - (now % time_window)
+
+local state = redis.call('HMGET', KEYS[1], 'start', 'current', 'previous')
+local start = tonumber(state[1])
+local current = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+
+if start == nil then
+    start, current, previous = window_start, 0, 0
+elseif start ~= window_start then
+    local elapsed_windows = math.floor((window_start - start) / time_window + 0.5)
+    if elapsed_windows == 1 then previous = current else previous = 0 end
+    current = 0
+    start = window_start
+end
+
+local allowed = 0
+if previous * (1 - (now - start) / time_window) + current + cost <= max_requests then
+    current = current + cost
+    allowed = 1
+end
+
+redis.call('HSET', KEYS[1], 'start', tostring(start), 'current', tostring(current), 'previous', tostring(previous))
+redis.call('EXPIRE', KEYS[1], time_window * 2)
+return {allowed, tostring(start), tostring(current), tostring(previous)}
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Estado compartido en cualquier servidor que hable el protocolo de Redis
+    (Redis, Valkey, KeyDB o un stand-in local). El chequeo corre en un script
+    Lua, atómico en el servidor, y las keys expiran solas tras dos ventanas.
+    """
+    blocking = True
+    PREFIX = "ratelimit:"
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package (pip install redis)") from e
+
+        self.client = redis.Redis.from_url(url)
+        self._hit = self.client.register_script(_REDIS_HIT_SCRIPT)
+
+    def _key(self, key: str) -> str:
+        return self.PREFIX + _storage_key(key)
+
+    def hit(self, key, now, time_window, max_requests, cost=1):
+        allowed, start, current, previous = self._hit(
+            keys=[self._key(key)],
+            args=[repr(now), time_window, max_requests, cost]
+        )
+        return bool(allowed), (float(start), float(current), float(previous))
+
+    def peek(self, key, now, time_window):
+        start, current, previous = self.client.hmget(self._key(key), "start", "current", "previous")
+        state = (float(start), float(current), float(previous)) if start is not None else None
+        return roll_window(state, now, time_window)
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.PREFIX + "*"):
+            self.client.delete(key)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.PREFIX + "*"))
+
+
+def create_backend(name: str, sqlite_path: str = None, redis_url: str = None) -> RateLimitBackend:
+    name = (name or "memory").lower()
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend(sqlite_path)
+    if name == "redis":
+        return RedisBackend(redis_url)
+    raise ValueError(f"Unknown rate limit backend '{name}'. Use memory, sqlite or redis")
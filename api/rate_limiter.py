@@ -1,101 +1,206 @@
 from fastapi import HTTPException, status, Request
-from datetime import datetime, timedelta
-from collections import defaultdict
-from typing import Dict, List
+from typing import Dict, Optional
 import asyncio
+import math
+import time
+
+from api.rate_limit_backends import (
+    RateLimitBackend,
+    MemoryBackend,
+    WindowState,
+    create_backend,
+    estimate_usage
+)
+from api.auth import get_api_key_tier
+from api.metrics import rate_limit_rejections
+from config import (
+    RATE_LIMIT_BACKEND,
+    RATE_LIMIT_SQLITE_PATH,
+    RATE_LIMIT_REDIS_URL,
+    RATE_LIMIT_TIERS,
+    DEFAULT_TIER
+)
 
 
 class RateLimiter:
-    def __init__(self, max_requests: int = 20, time_window: int = 60):
+    """
+    Rate limiter de ventana deslizante aproximada (sliding window counter).
+
+    Por cada API key solo se guardan dos contadores: el de la ventana actual y
+    el de la anterior. El uso estimado pondera la ventana anterior según cuánto
+    de ella sigue dentro de los últimos `time_window` segundos, así cada
+    consulta es O(1) y la memoria por key es constante. Dónde se guardan esos
+    contadores lo decide el backend (memoria, SQLite o Redis).
+    """
+
+    def __init__(self, max_requests: int = 20, time_window: int = 60, sweep_interval: int = 60,
+                 backend: RateLimitBackend = None):
         self.max_requests = max_requests
         self.time_window = time_window
-        # Store request timestamps per API key
-        self.requests: Dict[str, List[datetime]] = defaultdict(list)
-        # Lock for thread safety
-        self._lock = asyncio.Lock()
-
-    async def check_rate_limit(self, api_key: str) -> bool:
-        async with self._lock:
-            current_time = datetime.now()
-            cutoff_time = current_time - timedelta(seconds=self.time_window)
-
-            # Get request history for this API key
-            request_history = self.requests[api_key]
-
-            # Remove old requests outside the time window
-            request_history[:] = [
-                timestamp for timestamp in request_history
-                if timestamp > cutoff_time
-            ]
-
-            # Check if rate limit is exceeded
-            if len(request_history) >= self.max_requests:
-                # Calculate when the rate limit will reset
-                oldest_request = min(request_history)
-                reset_time = oldest_request + timedelta(seconds=self.time_window)
-                wait_seconds = (reset_time - current_time).total_seconds()
-
-                raise HTTPException(
-                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                    detail={
-                        "error": "Rate limit exceeded",
-                        "message": f"Maximum {self.max_requests} requests per {self.time_window} seconds allowed",
-                        "retry_after": int(wait_seconds) + 1,
-                        "current_usage": len(request_history),
-                        "limit": self.max_requests
-                    },
-                    headers={
-                        "X-RateLimit-Limit": str(self.max_requests),
-                        "X-RateLimit-Remaining": "0",
-                        "X-RateLimit-Reset": str(int(reset_time.timestamp())),
-                        "Retry-After": str(int(wait_seconds) + 1)
-                    }
-                )
-            request_history.append(current_time)
-            self.requests[api_key] = request_history
-
-            return True
-
-    def get_rate_limit_info(self, api_key: str) -> dict:
-        current_time = datetime.now()
-        cutoff_time = current_time - timedelta(seconds=self.time_window)
-        request_history = self.requests.get(api_key, [])
-        active_requests = [
-            timestamp for timestamp in request_history
-            if timestamp > cutoff_time
-        ]
-
-        remaining = max(0, self.max_requests - len(active_requests))
-
-        if active_requests:
-            oldest_request = min(active_requests)
-            reset_time = oldest_request + timedelta(seconds=self.time_window)
-        else:
-            reset_time = current_time + timedelta(seconds=self.time_window)
-
+        self.backend = backend if backend is not None else MemoryBackend()
+        # Cada cuánto se eliminan las keys inactivas
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.time() + sweep_interval
+
+    async def _call(self, func, *args):
+        # Los backends de disco o red no deben bloquear el event loop
+        if self.backend.blocking:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    def _retry_after(self, window: WindowState, now: float, max_requests: int, cost: float) -> float:
+        # Segundos hasta que el uso estimado permita un request más de este costo
+        window_start, current, previous = window
+        allowed = max_requests - cost
+
+        if current <= allowed and previous > 0:
+            # Basta con que la ventana anterior pese lo suficiente menos
+            fraction = 1 - (allowed - current) / previous
+            return max(0.0, window_start + fraction * self.time_window - now)
+
+        # Hay que esperar a la siguiente ventana, donde la actual pasa a ser la anterior
+        fraction = max(0.0, 1 - allowed / current) if current else 0.0
+        return window_start + self.time_window - now + fraction * self.time_window
+
+    def _info(self, window: WindowState, now: float, max_requests: int) -> dict:
+        used = min(max_requests, math.ceil(estimate_usage(window, now, self.time_window)))
         return {
-            "limit": self.max_requests,
-            "remaining": remaining,
-            "reset": int(reset_time.timestamp()),
-            "used": len(active_requests),
+            "limit": max_requests,
+            "remaining": max(0, max_requests - used),
+            "reset": int(window[0] + self.time_window),
+            "used": used,
             "window_seconds": self.time_window
         }
 
+    async def _sweep(self, now: float):
+        # Una key sin requests en las últimas dos ventanas ya no aporta nada al cálculo
+        self._next_sweep = now + self.sweep_interval
+        await self._call(self.backend.sweep, now - 2 * self.time_window)
+
+    async def check_rate_limit(self, api_key: str, cost: int = 1, max_requests: Optional[int] = None) -> dict:
+        # max_requests permite aplicar el límite del plan de la key; cost es lo que consume este request
+        max_requests = max_requests or self.max_requests
+        now = time.time()
+        if now >= self._next_sweep:
+            await self._sweep(now)
+
+        # El backend verifica e incrementa de forma atómica
+        allowed, window = await self._call(
+            self.backend.hit, api_key, now, self.time_window, max_requests, cost
+        )
+
+        # Check if rate limit is exceeded
+        if not allowed:
+            rate_limit_rejections.inc(reason="quota")
+            wait_seconds = self._retry_after(window, now, max_requests, cost)
+            reset_time = now + wait_seconds
+
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail={
+                    "error": "Rate limit exceeded",
+                    "message": f"Maximum {max_requests} units per {self.time_window} seconds allowed, this request costs {cost}",
+                    "retry_after": int(wait_seconds) + 1,
+                    "current_usage": math.ceil(estimate_usage(window, now, self.time_window)),
+                    "limit": max_requests,
+                    "cost": cost
+                },
+                headers={
+                    "X-RateLimit-Limit": str(max_requests),
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset": str(int(reset_time)),
+                    "Retry-After": str(int(wait_seconds) + 1)
+                }
+            )
+
+        info = self._info(window, now, max_requests)
+        info["cost"] = cost
+        return info
+
+    async def get_rate_limit_info(self, api_key: str, max_requests: Optional[int] = None) -> dict:
+        now = time.time()
+        window = await self._call(self.backend.peek, api_key, now, self.time_window)
+        return self._info(window, now, max_requests or self.max_requests)
+
     async def clear_api_key(self, api_key: str):
-        async with self._lock:
-            if api_key in self.requests:
-                del self.requests[api_key]
+        await self._call(self.backend.delete, api_key)
 
     async def clear_all(self):
-        async with self._lock:
-            self.requests.clear()
+        await self._call(self.backend.clear)
+
+
+class ConcurrencySlot:
+    """Un lugar ocupado en el límite de concurrencia; liberarlo más de una vez no tiene efecto"""
+
+    def __init__(self, limiter: "ConcurrencyLimiter", api_key: str):
+        self.limiter = limiter
+        self.api_key = api_key
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.limiter.release(self.api_key)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class ConcurrencyLimiter:
+    """Búsquedas con navegador en curso por API key (por proceso)"""
+
+    def __init__(self):
+        self.in_flight: Dict[str, int] = {}
+
+    def acquire(self, api_key: str, max_concurrent: int) -> ConcurrencySlot:
+        current = self.in_flight.get(api_key, 0)
+        if current >= max_concurrent:
+            rate_limit_rejections.inc(reason="concurrency")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail={
+                    "error": "Too many concurrent searches",
+                    "message": f"Maximum {max_concurrent} browser searches in progress per API key allowed"
+                },
+                headers={"Retry-After": "5"}
+            )
+        self.in_flight[api_key] = current + 1
+        return ConcurrencySlot(self, api_key)
+
+    def release(self, api_key: str):
+        current = self.in_flight.get(api_key, 0) - 1
+        if current > 0:
+            self.in_flight[api_key] = current
+        else:
+            self.in_flight.pop(api_key, None)
+
+    def get_in_flight(self, api_key: str) -> int:
+        return self.in_flight.get(api_key, 0)
+
+
+def get_tier(api_key: str) -> dict:
+    tier_name = get_api_key_tier(api_key)
+    if tier_name not in RATE_LIMIT_TIERS:
+        tier_name = DEFAULT_TIER
+    return {"name": tier_name, **RATE_LIMIT_TIERS[tier_name]}
+
+
+# Cuota por defecto de 20 unidades por minuto, para evitar sobrecarga y/o bloqueos
+rate_limiter = RateLimiter(
+    max_requests=RATE_LIMIT_TIERS[DEFAULT_TIER]["quota_per_minute"],
+    time_window=60,
+    backend=create_backend(RATE_LIMIT_BACKEND, RATE_LIMIT_SQLITE_PATH, RATE_LIMIT_REDIS_URL)
+)
+concurrency_limiter = ConcurrencyLimiter()
 
 
-# Limitar a 20 requests por minuto, para evitar sobrecarga y/o bloqueos
-rate_limiter = RateLimiter(max_requests=20, time_window=60)
+async def check_rate_limit(request: Request, api_key: str, cost: int = 1) -> None:
+    tier = get_tier(api_key)
+    request.state.rate_limit = await rate_limiter.check_rate_limit(api_key, cost, tier["quota_per_minute"])
 
 
-async def check_rate_limit(request: Request, api_key: str) -> None:
-    await rate_limiter.check_rate_limit(api_key)
-    rate_info = rate_limiter.get_rate_limit_info(api_key)
-    request.state.rate_limit = rate_info
+def acquire_concurrency_slot(api_key: str) -> ConcurrencySlot:
+    return concurrency_limiter.acquire(api_key, get_tier(api_key)["max_concurrent"])
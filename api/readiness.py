@@ -0,0 +1,154 @@
+"""
+Estado de disponibilidad de cada fuente, para /health/ready.
+
+Cada fuente se reporta como:
+
+- cold: todavía no se usó ni se precalentó.
+- warm: lista para responder rápido (datos en caché o navegador verificado).
+- stale: World Bank con la lista vencida; la próxima búsqueda la vuelve a bajar.
+- degraded: READINESS_FAILURE_THRESHOLD fallas seguidas, o el navegador no arranca.
+- challenge-blocked: la fuente pidió verificación humana y no hubo una búsqueda
+  exitosa después (dura READINESS_CHALLENGE_WINDOW segundos).
+
+Los endpoints registran el resultado de cada búsqueda y el warmup registra las
+descargas y la verificación del navegador.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from api.cache import TTLCache
+from api.sources import CHALLENGE_ERROR
+from config import READINESS_FAILURE_THRESHOLD, READINESS_CHALLENGE_WINDOW
+
+# Estados con los que un worker puede responder
+SERVING_STATES = ("warm", "stale")
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+
+class SourceHealth:
+    def __init__(self, source: str):
+        self.source = source
+        self.last_refresh: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.last_failure: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.challenged_at: Optional[float] = None
+        self.consecutive_failures = 0
+        self.probed = False
+
+    def state(self, cache: Optional[Tuple[TTLCache, str]] = None) -> str:
+        now = time.time()
+        if (self.challenged_at and now - self.challenged_at < READINESS_CHALLENGE_WINDOW
+                and (self.last_success is None or self.challenged_at > self.last_success)):
+            return "challenge-blocked"
+        if self.consecutive_failures >= READINESS_FAILURE_THRESHOLD:
+            return "degraded"
+        if cache is not None:
+            # Fuentes con datos en caché: el estado depende de la lista, no de las búsquedas
+            data, key = cache
+            if data.expires_in(key) > 0:
+                return "warm"
+            return "stale" if self.last_refresh else "cold"
+        return "warm" if self.probed or self.last_success else "cold"
+
+
+_lock = threading.Lock()
+_health: Dict[str, SourceHealth] = {}
+_caches: Dict[str, Tuple[TTLCache, str]] = {}
+_warmup = {"started_at": time.time(), "finished_at": None}
+
+
+def _get(source: str) -> SourceHealth:
+    health = _health.get(source)
+    if health is None:
+        health = _health.setdefault(source, SourceHealth(source))
+    return health
+
+
+def track_cache(source: str, cache: TTLCache, key: str):
+    _caches[source] = (cache, key)
+
+
+def record_success(source: str, refreshed: bool = False):
+    with _lock:
+        health = _get(source)
+        health.last_success = time.time()
+        health.consecutive_failures = 0
+        if refreshed or source not in _caches:
+            health.last_refresh = health.last_success
+
+
+def record_failure(source: str, error: str, fatal: bool = False):
+    """fatal: la fuente no puede funcionar (p. ej. Chromium no arranca), pasa directo a degraded"""
+    with _lock:
+        health = _get(source)
+        health.last_failure = time.time()
+        health.last_error = error
+        health.consecutive_failures += 1
+        if fatal:
+            health.consecutive_failures = max(health.consecutive_failures, READINESS_FAILURE_THRESHOLD)
+
+
+def record_challenge(source: str):
+    with _lock:
+        health = _get(source)
+        health.challenged_at = time.time()
+        health.last_error = CHALLENGE_ERROR
+
+
+def record_probe(source: str):
+    with _lock:
+        health = _get(source)
+        health.probed = True
+        health.consecutive_failures = 0
+
+
+def finish_warmup():
+    _warmup["finished_at"] = time.time()
+
+
+def warmup_finished() -> bool:
+    return _warmup["finished_at"] is not None
+
+
+def report(sources: List[str], required: List[str], executor_stats: Dict[str, dict],
+           require_warm: bool = True, circuits: Optional[Dict[str, dict]] = None) -> dict:
+    """Estado por fuente (con su circuit breaker, si tiene) y si el worker está listo para recibir tráfico"""
+    circuits = circuits or {}
+    states = {}
+    with _lock:
+        for source in sources:
+            health = _get(source)
+            stats = executor_stats.get(source, {})
+            states[source] = {
+                "state": health.state(_caches.get(source)),
+                "last_refresh": _iso(health.last_refresh),
+                "last_success": _iso(health.last_success),
+                "last_error": health.last_error,
+                "last_failure": _iso(health.last_failure),
+                "consecutive_failures": health.consecutive_failures,
+                "running": stats.get("running", 0),
+                "queue_depth": stats.get("queue_depth", 0),
+                "circuit": circuits.get(source)
+            }
+
+    # Sin warmup una fuente fría igual puede responder (la primera búsqueda la carga)
+    accepted = SERVING_STATES if require_warm else SERVING_STATES + ("cold",)
+    blocking = [source for source in required if states.get(source, {}).get("state") not in accepted]
+    ready = warmup_finished() and not blocking
+    return {
+        "status": "ready" if ready else "not_ready",
+        "warmup": {
+            "finished": warmup_finished(),
+            "started_at": _iso(_warmup["started_at"]),
+            "finished_at": _iso(_warmup["finished_at"])
+        },
+        "blocking_sources": blocking,
+        "sources": states,
+        "timestamp": datetime.now().isoformat()
+    }
@@ -0,0 +1,32 @@
+"""
+Respuesta JSON rápida para los endpoints de búsqueda.
+
+Los resultados los arma la propia API (mapeos de cada scraper), así que no hace
+falta que pydantic los valide al construir el modelo ni que FastAPI los vuelva a
+validar contra response_model: los endpoints construyen el modelo con
+model_construct() y lo devuelven en una FastJSONResponse, que lo serializa
+directamente con orjson. response_model se mantiene para la documentación.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(value: Any):
+    # Modelos anidados (p. ej. las fuentes de MultiSourceSearchResponse): sus campos ya están en __dict__
+    if isinstance(value, BaseModel):
+        return value.__dict__
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse con orjson que acepta modelos pydantic sin volver a validarlos"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
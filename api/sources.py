@@ -0,0 +1,89 @@
+"""
+Registro de fuentes de búsqueda.
+
+Cada fuente declara cómo se busca (fetch), cómo se mapea cada resultado a la
+respuesta pública, cómo se nombra en los mensajes y cuánto cuesta en el rate
+limit. Los endpoints individuales y /search/all se generan desde el registro,
+así que agregar una fuente es registrarla una vez.
+
+Los scrapers (Playwright, BeautifulSoup, requests) se cargan con lazy(): el
+módulo se importa la primera vez que se llama, en el hilo del pool que hace la
+búsqueda, y no al arrancar la API.
+"""
+import importlib
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from scrappers.cancellation import CancellationToken
+
+# Error con el que una fuente indica que pidió verificación humana (captcha)
+CHALLENGE_ERROR = "Human verification challenge detected"
+
+# fetch(query, cancel_token, priority) -> (resultados crudos, error o None)
+Fetch = Callable[[str, Optional[CancellationToken], str], Awaitable[Tuple[List[Dict], Optional[str]]]]
+
+
+# Módulos cargados con lazy(), para precalentarlos al iniciar (preload_modules)
+_lazy_modules = set()
+
+
+def lazy(path: str) -> Callable:
+    """Devuelve un callable que importa "modulo:atributo" recién en el primer llamado"""
+    module_name, _, attribute = path.partition(":")
+    _lazy_modules.add(module_name)
+    target = None
+    lock = threading.Lock()
+
+    def call(*args, **kwargs):
+        nonlocal target
+        if target is None:
+            with lock:
+                if target is None:
+                    target = getattr(importlib.import_module(module_name), attribute)
+        return target(*args, **kwargs)
+
+    call.__name__ = attribute
+    call.__qualname__ = path
+    return call
+
+
+def preload_modules():
+    """Importa de una vez todos los módulos diferidos (bloquea: correr fuera del event loop)"""
+    for module_name in sorted(_lazy_modules):
+        importlib.import_module(module_name)
+
+
+class Source:
+    def __init__(self, key: str, name: str, title: str, fetch: Fetch, cost: int,
+                 map_result: Optional[Callable[[Dict], Dict]] = None, local: bool = False):
+        self.key = key              # ruta, pool, métricas y costo: "world-bank"
+        self.name = name            # campo source de la respuesta: "World Bank Debarred Firms"
+        self.title = title          # nombre en mensajes y errores: "World Bank"
+        self.fetch = fetch
+        self.cost = cost
+        self.map_result = map_result
+        # Las fuentes locales (sin navegador) no ocupan lugar de concurrencia de la key
+        # y en modo first_hit se consultan antes que las demás
+        self.local = local
+
+    def map_results(self, items: List[Dict]) -> List[Dict]:
+        if self.map_result is None:
+            return items
+        return [self.map_result(item) for item in items]
+
+
+SOURCES: Dict[str, Source] = {}
+
+
+def register(source: Source) -> Source:
+    if source.key in SOURCES:
+        raise ValueError(f"Source '{source.key}' is already registered")
+    SOURCES[source.key] = source
+    return source
+
+
+def first_hit_stages() -> List[List[Source]]:
+    """Etapas de first_hit: primero las fuentes locales y después el resto en paralelo"""
+    local = [source for source in SOURCES.values() if source.local]
+    remote = [source for source in SOURCES.values() if not source.local]
+    return [stage for stage in (local, remote) if stage]
@@ -0,0 +1,189 @@
+"""
+Desglose por etapa de cada request.
+
+Los scrapers registran cuánto tardó cada etapa (scrappers/telemetry.py). El
+middleware junta esos registros por request y los devuelve en la cabecera
+Server-Timing, los escribe en una línea de log JSON y, si OTEL_EXPORT_FILE
+está configurado, los exporta como spans OTLP/JSON a un archivo local (una
+línea por request, el formato del receiver otlpjsonfile del OpenTelemetry
+Collector).
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+from config import OTEL_EXPORT_FILE, OTEL_SERVICE_NAME
+from scrappers import telemetry
+
+logger = logging.getLogger(__name__)
+
+
+def summarize(records: List[telemetry.Record]) -> Dict[str, Tuple[float, int]]:
+    """Suma la duración de cada etapa por fuente: {"ofac.page_load": (segundos, veces)}"""
+    stages: Dict[str, Tuple[float, int]] = {}
+    for kind, name, value, labels, _ in records:
+        if kind != "timing":
+            continue
+        key = f"{labels['source']}.{name}" if labels.get("source") else name
+        total, count = stages.get(key, (0.0, 0))
+        stages[key] = (total + value, count + 1)
+    return stages
+
+
+def server_timing_header(stages: Dict[str, Tuple[float, int]], total: float) -> str:
+    entries = [f"total;dur={total * 1000:.1f}"]
+    for key, (seconds, count) in stages.items():
+        entry = f"{key};dur={seconds * 1000:.1f}"
+        if count > 1:
+            entry += f';desc="x{count}"'
+        entries.append(entry)
+    return ", ".join(entries)
+
+
+def _attributes(values: Dict) -> List[dict]:
+    attributes = []
+    for key, value in values.items():
+        if isinstance(value, bool):
+            attributes.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            attributes.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            attributes.append({"key": key, "value": {"doubleValue": value}})
+        else:
+            attributes.append({"key": key, "value": {"stringValue": str(value)}})
+    return attributes
+
+
+def _trace_ids(traceparent: Optional[str]) -> Tuple[str, Optional[str]]:
+    # Si el cliente manda un traceparent W3C se continúa esa traza
+    parts = (traceparent or "").split("-")
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+        return parts[1], parts[2]
+    return os.urandom(16).hex(), None
+
+
+class FileSpanExporter:
+    """Escribe los spans en un hilo aparte para no bloquear el event loop"""
+
+    def __init__(self, path: str, service_name: str):
+        self.path = path
+        self.service_name = service_name
+        self._queue: queue.Queue = queue.Queue(maxsize=10000)
+        self._thread = threading.Thread(target=self._writer, name="otel-file-exporter", daemon=True)
+        self._thread.start()
+
+    def _writer(self):
+        while True:
+            line = self._queue.get()
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                logger.warning(f"Could not write spans to {self.path}: {e}")
+
+    def export(self, name: str, start: float, end: float, attributes: Dict,
+               records: List[telemetry.Record], traceparent: Optional[str] = None):
+        trace_id, parent_id = _trace_ids(traceparent)
+        root_id = os.urandom(8).hex()
+        root = {
+            "traceId": trace_id,
+            "spanId": root_id,
+            "name": name,
+            "kind": 2,  # SPAN_KIND_SERVER
+            "startTimeUnixNano": str(int(start * 1e9)),
+            "endTimeUnixNano": str(int(end * 1e9)),
+            "attributes": _attributes(attributes)
+        }
+        if parent_id:
+            root["parentSpanId"] = parent_id
+
+        spans = [root]
+        for kind, stage, value, labels, started in records:
+            span = {
+                "traceId": trace_id,
+                "spanId": os.urandom(8).hex(),
+                "parentSpanId": root_id,
+                "name": f"{labels['source']}.{stage}" if labels.get("source") else stage,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(int(started * 1e9)),
+                "endTimeUnixNano": str(int((started + (value if kind == "timing" else 0)) * 1e9)),
+                "attributes": _attributes(labels)
+            }
+            spans.append(span)
+
+        line = json.dumps({"resourceSpans": [{
+            "resource": {"attributes": _attributes({"service.name": self.service_name})},
+            "scopeSpans": [{"scope": {"name": "api.tracing"}, "spans": spans}]
+        }]})
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            # Si el disco no da abasto se pierden spans, nunca se frena un request
+            pass
+
+
+exporter = FileSpanExporter(OTEL_EXPORT_FILE, OTEL_SERVICE_NAME) if OTEL_EXPORT_FILE else None
+
+
+class ServerTimingMiddleware:
+    # Middleware ASGI puro, igual que RateLimitHeadersMiddleware, para no ocultar http.disconnect
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        started_at = time.time()
+        status_code = 500
+
+        with telemetry.collect() as records:
+            async def send_with_server_timing(message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    # En respuestas en streaming solo entra lo medido antes del primer byte
+                    headers = MutableHeaders(scope=message)
+                    headers["Server-Timing"] = server_timing_header(
+                        summarize(records), time.perf_counter() - started
+                    )
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_server_timing)
+            finally:
+                if records:
+                    self._report(scope, status_code, started, started_at, records)
+
+    def _report(self, scope, status_code: int, started: float, started_at: float,
+                records: List[telemetry.Record]):
+        total = time.perf_counter() - started
+        stages = summarize(records)
+        logger.info(json.dumps({
+            "event": "request_timing",
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status_code,
+            "total_ms": round(total * 1000, 1),
+            "stages_ms": {key: round(seconds * 1000, 1) for key, (seconds, _) in stages.items()}
+        }))
+
+        if exporter is not None:
+            headers = dict(scope.get("headers") or [])
+            traceparent = headers.get(b"traceparent", b"").decode("latin-1") or None
+            exporter.export(
+                f"{scope['method']} {scope['path']}",
+                started_at,
+                started_at + total,
+                {"http.method": scope["method"], "http.target": scope["path"], "http.status_code": status_code},
+                records,
+                traceparent
+            )
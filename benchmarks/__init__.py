@@ -0,0 +1 @@
+"Benchmarks offline de la API y los scrapers"
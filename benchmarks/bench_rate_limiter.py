@@ -0,0 +1,86 @@
+"""
+Microbenchmark del RateLimiter con muchas keys y alta tasa de requests.
+
+Uso:
+    python -m benchmarks.bench_rate_limiter --keys 100000 --requests 1000000
+    python -m benchmarks.bench_rate_limiter --backend sqlite --requests 20000
+"""
+import argparse
+import asyncio
+import random
+import time
+import tracemalloc
+
+from fastapi import HTTPException
+
+from api.rate_limit_backends import create_backend
+from api.rate_limiter import RateLimiter
+
+
+async def drive(limiter: RateLimiter, sequence) -> int:
+    rejected = 0
+    for api_key in sequence:
+        try:
+            await limiter.check_rate_limit(api_key)
+        except HTTPException:
+            rejected += 1
+    return rejected
+
+
+async def run(keys: int, requests: int, max_requests: int, time_window: int,
+              backend: str = "memory", sqlite_path: str = None, redis_url: str = None) -> dict:
+    api_keys = [f"key-{i}" for i in range(keys)]
+    # Distribución sesgada: pocas keys muy activas y una cola larga de keys poco usadas
+    sequence = random.Random(42).choices(api_keys, weights=[1 / (i + 1) for i in range(keys)], k=requests)
+
+    limiter = RateLimiter(max_requests=max_requests, time_window=time_window,
+                          backend=create_backend(backend, sqlite_path, redis_url))
+    await limiter.clear_all()
+    started = time.perf_counter()
+    rejected = await drive(limiter, sequence)
+    elapsed = time.perf_counter() - started
+
+    # Memoria en una segunda pasada, tracemalloc distorsiona los tiempos
+    tracemalloc.start()
+    await limiter.clear_all()
+    await drive(limiter, sequence)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tracked = len(limiter.backend)
+    # Simula que pasaron dos ventanas sin tráfico y fuerza el barrido
+    await limiter._sweep(time.time() + 2 * time_window)
+
+    return {
+        "backend": backend,
+        "keys": keys,
+        "requests": requests,
+        "rejected": rejected,
+        "seconds": round(elapsed, 3),
+        "ops_per_second": round(requests / elapsed),
+        "microseconds_per_check": round(elapsed / requests * 1e6, 3),
+        "peak_memory_mb": round(peak / 1024 / 1024, 2),
+        "tracked_keys": tracked,
+        "tracked_keys_after_sweep": len(limiter.backend)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark del RateLimiter")
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--max-requests", type=int, default=20)
+    parser.add_argument("--time-window", type=int, default=60)
+    parser.add_argument("--backend", choices=["memory", "sqlite", "redis"], default="memory")
+    parser.add_argument("--sqlite-path", default="bench_rate_limits.sqlite3")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.keys, args.requests, args.max_requests, args.time_window,
+                             args.backend, args.sqlite_path, args.redis_url))
+    for name, value in result.items():
+        print(f"{name:>28}: {value}")
+
+
+if __name__ == "__main__":
+    main()
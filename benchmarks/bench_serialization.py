@@ -0,0 +1,97 @@
+"""
+Microbenchmark de la serialización de respuestas de búsqueda.
+
+Compara el camino anterior (modelo validado al construirlo, revalidado por
+FastAPI contra response_model y serializado con json) con el actual
+(model_construct + FastJSONResponse con orjson) sobre una búsqueda amplia en el
+World Bank ("Bank"), y mide los bytes enviados sin comprimir, con gzip y con
+brotli si está instalado.
+
+Uso:
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --scale 10 --query bank
+"""
+import argparse
+import asyncio
+import json
+import timeit
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api.compression import brotli, compress
+from api.main import map_world_bank_firm
+from api.models import SearchResponse
+from api.responses import FastJSONResponse
+from benchmarks.payloads import world_bank_firms, WORLD_BANK_FIRMS
+from scrappers.world_bank import WorldBankScraper
+
+
+def best_time(func, repeat: int) -> float:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run(scale: int, query: str, repeat: int) -> dict:
+    firms = world_bank_firms(WORLD_BANK_FIRMS * scale)
+    results = [map_world_bank_firm(firm) for firm in WorldBankScraper().filter_by_name(query, firms)]
+    fields = dict(
+        source="World Bank Debarred Firms",
+        query=query,
+        hits=len(results),
+        results=results,
+        timestamp=datetime.now().isoformat(),
+        message=f"Se encontraron {len(results)} resultado(s) para '{query}' en World Bank"
+    )
+
+    response_field = create_response_field(name="Response_search", type_=SearchResponse)
+    loop = asyncio.new_event_loop()
+
+    def previous_path() -> bytes:
+        # Igual que FastAPI con response_model: validar, revalidar, jsonable_encoder y json.dumps
+        model = SearchResponse(**fields)
+        content = loop.run_until_complete(
+            serialize_response(field=response_field, response_content=model, is_coroutine=True)
+        )
+        return JSONResponse(content).body
+
+    def fast_path() -> bytes:
+        return FastJSONResponse(SearchResponse.model_construct(**fields)).body
+
+    previous_body = previous_path()
+    body = fast_path()
+    assert json.loads(previous_body) == json.loads(body), "Los dos caminos deben producir el mismo JSON"
+
+    report = {
+        "hits": len(results),
+        "previous_ms": round(best_time(previous_path, repeat) * 1000, 3),
+        "fast_ms": round(best_time(fast_path, repeat) * 1000, 3),
+        "bytes_identity": len(body),
+        "bytes_gzip": len(compress(body, "gzip")),
+        "gzip_ms": round(best_time(lambda: compress(body, "gzip"), repeat) * 1000, 3)
+    }
+    report["speedup"] = round(report["previous_ms"] / report["fast_ms"], 1)
+    if brotli is not None:
+        report["bytes_br"] = len(compress(body, "br"))
+        report["br_ms"] = round(best_time(lambda: compress(body, "br"), repeat) * 1000, 3)
+    loop.close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark de serialización y compresión de respuestas")
+    parser.add_argument("--scale", type=int, default=1, help="Tamaño de la lista del World Bank (1x = real)")
+    parser.add_argument("--query", default="bank")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    result = run(args.scale, args.query, args.repeat)
+    for name, value in result.items():
+        print(f"{name:>16}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Tiempo de import y de arranque en frío de la API.
+
+- import: `import api.main` en un intérprete nuevo, y qué dependencias pesadas
+  (Playwright, BeautifulSoup, lxml, requests) quedaron cargadas.
+- cold start: desde que se lanza uvicorn hasta el primer /health con 200, y
+  hasta la primera búsqueda en World Bank (la que carga el scraper) contra los
+  upstreams falsos de benchmarks/fake_upstreams.py.
+
+Cada medición usa un proceso nuevo; se reporta la mediana de --runs corridas. Requiere
+`pip install -r requirements-dev.txt` (httpx).
+
+Uso:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.fake_upstreams import FakeUpstreams
+
+HEAVY_MODULES = ["playwright", "playwright.sync_api", "bs4", "lxml", "requests", "pandas", "pyarrow"]
+
+_IMPORT_PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import api.main
+elapsed = time.perf_counter() - started
+print(json.dumps({{"ms": elapsed * 1000, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _IMPORT_PROBE], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_cold_start(env: dict, timeout: float = 60) -> dict:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--loop", "asyncio"],
+        env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(timeout=timeout) as client:
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"La API terminó al iniciar (código {process.returncode})")
+                if time.perf_counter() - started > timeout:
+                    raise RuntimeError("La API no respondió /health a tiempo")
+                try:
+                    if client.get(f"{base_url}/health", timeout=1).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    time.sleep(0.01)
+            ready = time.perf_counter()
+
+            response = client.post(
+                f"{base_url}/api/v1/search/world-bank",
+                json={"entity_name": "bank"},
+                headers={"X-API-KEY": env["API_KEY_1"]}
+            )
+            response.raise_for_status()
+            first_search = time.perf_counter()
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    return {"health_ms": (ready - started) * 1000, "first_search_ms": (first_search - started) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de import y arranque en frío de la API")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Guardar el resultado en JSON")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+
+    upstreams = FakeUpstreams("127.0.0.1", latency_ms=0)
+    upstreams.start()
+    try:
+        env = {**upstreams.env(), "API_KEY_1": "bench-startup-key"}
+        starts = [measure_cold_start(env) for _ in range(args.runs)]
+    finally:
+        upstreams.stop()
+
+    report = {
+        "import_ms": round(statistics.median(run["ms"] for run in imports), 1),
+        "heavy_modules_at_import": imports[-1]["heavy"],
+        "health_ms": round(statistics.median(run["health_ms"] for run in starts), 1),
+        "first_search_ms": round(statistics.median(run["first_search_ms"] for run in starts), 1),
+        "runs": args.runs
+    }
+    for name, value in report.items():
+        print(f"{name:>24}: {value}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Suite de microbenchmarks offline de las funciones calientes de cada fuente.
+
+No hace requests de red: los parsers corren sobre páginas guardadas en
+benchmarks/fixtures/ y el World Bank sobre un payload sintético al tamaño real
+(1x) y a 10x. Cada caso se repite varias veces y se reporta el mejor tiempo por
+llamada, que es el menos afectado por el ruido de la máquina.
+
+Uso:
+    python -m benchmarks.bench_suite
+    python -m benchmarks.bench_suite --save-baseline
+    python -m benchmarks.bench_suite --compare --threshold 0.2
+    python -m benchmarks.bench_suite --only world_bank
+
+Con --compare sale con código 1 si algún caso es más lento que la baseline en
+más del umbral; la baseline solo es comparable si se generó en la misma máquina.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+from api.rate_limiter import RateLimiter
+from benchmarks.bench_rate_limiter import drive
+from benchmarks.payloads import load_fixture, world_bank_payload
+from scrappers.ofac import parse_results_html
+from scrappers.offshore import ICIJOffshoreLeaksScraper
+from scrappers.world_bank import WorldBankScraper
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+Case = Tuple[str, Callable[[], object], int]
+
+
+def _rate_limiter_case(keys: int = 1000, checks: int = 10000) -> Case:
+    api_keys = [f"key-{i}" for i in range(keys)]
+    sequence = random.Random(42).choices(api_keys, weights=[1 / (i + 1) for i in range(keys)], k=checks)
+    limiter = RateLimiter(max_requests=20, time_window=60)
+
+    async def batch():
+        await limiter.clear_all()
+        await drive(limiter, sequence)
+
+    # Un solo event loop para todas las repeticiones, como en la API
+    loop = asyncio.new_event_loop()
+    return "rate_limiter.check_rate_limit", lambda: loop.run_until_complete(batch()), checks
+
+
+def build_cases() -> List[Case]:
+    """(nombre, función sin argumentos, llamadas que representa cada ejecución)"""
+    offshore = ICIJOffshoreLeaksScraper(headless=True)
+    icij_results = load_fixture("icij_results.html")
+    icij_challenge = load_fixture("icij_challenge.html")
+    ofac_results = load_fixture("ofac_results.html")
+
+    def parse_ofac():
+        # parse_results_html imprime cada fila; no se mide la consola
+        with contextlib.redirect_stdout(io.StringIO()):
+            return parse_results_html(ofac_results)
+
+    cases: List[Case] = [
+        ("offshore.extract_entities_from_html", lambda: offshore.extract_entities_from_html(icij_results, "bank"), 1),
+        ("offshore.get_next_page_url", lambda: offshore.get_next_page_url(icij_results), 1),
+        ("offshore.detect_challenge[results]", lambda: offshore.detect_human_verification_challenge(icij_results), 1),
+        ("offshore.detect_challenge[challenge]", lambda: offshore.detect_human_verification_challenge(icij_challenge), 1),
+        ("ofac.parse_results_html", parse_ofac, 1)
+    ]
+
+    for scale in (1, 10):
+        scraper = WorldBankScraper()
+        body = world_bank_payload(scale)
+        # Igual que fetch_api_data: decodificar el JSON es parte del parseo
+        firms = scraper.parse_api_response(json.loads(body))
+        cases += [
+            (f"world_bank.parse_api_response[{scale}x]",
+             lambda scraper=scraper, body=body: scraper.parse_api_response(json.loads(body)), 1),
+            (f"world_bank.filter_by_name[{scale}x]",
+             lambda scraper=scraper, firms=firms: scraper.filter_by_name("bank", firms), 1),
+            (f"world_bank.search_by_filters[{scale}x]",
+             lambda scraper=scraper, firms=firms: scraper.search_by_filters(
+                 name="construction", country="mexico", status="debarred", firms=firms), 1)
+        ]
+
+    cases.append(_rate_limiter_case())
+    return cases
+
+
+def measure(func: Callable[[], object], calls: int, repeat: int) -> Dict[str, float]:
+    timer = timeit.Timer(func)
+    # Cantidad de ejecuciones por repetición para que cada una dure ~0.2 s
+    number, _ = timer.autorange()
+    timings = [elapsed / number / calls for elapsed in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "best_us": round(min(timings) * 1e6, 3),
+        "median_us": round(statistics.median(timings) * 1e6, 3),
+        "loops": number * calls
+    }
+
+
+def run(repeat: int = 5, only: str = None) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, func, calls in build_cases():
+        if only and only not in name:
+            continue
+        results[name] = measure(func, calls, repeat)
+        print(f"{name:>42}: {results[name]['best_us']:>12.3f} us/call "
+              f"(median {results[name]['median_us']:.3f}, {results[name]['loops']} loops)")
+    return results
+
+
+def machine_info() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, float]]):
+    baseline = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": machine_info(),
+        "results": results
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2)
+    print(f"\nBaseline guardada en {path}")
+
+
+def compare(path: str, results: Dict[str, Dict[str, float]], threshold: float) -> bool:
+    """Imprime la comparación y devuelve False si algún caso empeoró más del umbral"""
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    if baseline.get("machine") != machine_info():
+        print("\nAviso: la baseline se generó en otra máquina o con otro Python, los tiempos no son comparables")
+
+    print(f"\n{'case':>42}  {'baseline':>12}  {'current':>12}  {'change':>8}")
+    ok = True
+    for name, current in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            print(f"{name:>42}  {'-':>12}  {current['best_us']:>12.3f}  {'new':>8}")
+            continue
+        change = current["best_us"] / previous["best_us"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"{name:>42}  {previous['best_us']:>12.3f}  {current['best_us']:>12.3f}  {change:>+7.1%}{flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks offline de parsers, filtros y rate limiter")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", help="Solo los casos cuyo nombre contiene este texto")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda los resultados como baseline")
+    parser.add_argument("--compare", action="store_true", help="Compara contra la baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Empeoramiento tolerado antes de marcar regresión (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    # Los scrapers loguean por página; se mide el parseo, no el logging
+    logging.disable(logging.CRITICAL)
+
+    results = run(args.repeat, args.only)
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+    if args.compare and not compare(args.baseline, results, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Servidores locales que imitan a OFAC, ICIJ Offshore Leaks y la API del World
+Bank para pruebas de carga sin tocar los sitios reales.
+
+Sirven las páginas guardadas en benchmarks/fixtures/ y el payload sintético del
+World Bank, con latencia, tasa de errores (503) y tasa de challenges (página de
+verificación humana en ICIJ) configurables. Los scrapers se apuntan aquí con
+OFAC_URL, ICIJ_BASE_URL y WORLD_BANK_API_URL.
+
+Uso (para una API que ya está corriendo):
+    python -m benchmarks.fake_upstreams --port 8900 --latency-ms 300 --error-rate 0.05
+"""
+import argparse
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.payloads import load_fixture, world_bank_payload
+
+# Modal de términos como el de ICIJ: accept_terms marca #accept y envía el formulario
+_TERMS_MODAL = """
+  <div id="terms-modal" class="modal" style="display:block">
+    <form onsubmit="document.cookie='terms=1; path=/'; document.getElementById('terms-modal').remove(); return false;">
+      <label><input type="checkbox" id="accept"> I accept the terms of use</label>
+      <button type="submit" class="btn btn-primary">Submit</button>
+    </form>
+  </div>
+"""
+
+
+class FakeUpstreams:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0,
+                 jitter_ms: float = 0, error_rate: float = 0, challenge_rate: float = 0,
+                 icij_pages: int = 3, world_bank_scale: int = 1, seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.challenge_rate = challenge_rate
+        self.icij_pages = icij_pages
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+
+        ofac_results = load_fixture("ofac_results.html")
+        self.ofac_results = ofac_results.encode()
+        # La página inicial es el mismo formulario sin la tabla de resultados
+        self.ofac_form = re.sub(r'<div id="ctl00_MainContent_divResults">.*?</div>', "",
+                                ofac_results, flags=re.S).encode()
+        self.icij_results = load_fixture("icij_results.html")
+        self.icij_challenge = load_fixture("icij_challenge.html").encode()
+        self.world_bank = world_bank_payload(world_bank_scale)
+
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> Dict[str, str]:
+        """Variables de entorno para que la API use estos servidores"""
+        return {
+            "OFAC_URL": f"{self.base_url}/ofac/",
+            "ICIJ_BASE_URL": f"{self.base_url}/icij",
+            "WORLD_BANK_API_URL": f"{self.base_url}/world-bank"
+        }
+
+    def start(self) -> "FakeUpstreams":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-upstreams", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.requests)
+
+    def _count(self, key: str):
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    def _roll(self, rate: float) -> bool:
+        with self._lock:
+            return self._random.random() < rate
+
+    def _delay(self) -> float:
+        with self._lock:
+            return max(0.0, self._random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+    def _icij_page(self, query: Dict, cookies: str) -> bytes:
+        offset = int(query.get("from", ["0"])[0] or 0)
+        page = self.icij_results
+        next_offset = offset + 100
+        if next_offset < self.icij_pages * 100:
+            page = page.replace("from=100", f"from={next_offset}")
+        else:
+            page = re.sub(r'<a [^>]*data-more-results[^>]*>.*?</a>', "", page, flags=re.S)
+        if "terms=1" not in cookies:
+            page = page.replace("</body>", _TERMS_MODAL + "</body>")
+        return page.encode()
+
+    def _handler(self):
+        upstreams = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str = "text/html; charset=utf-8"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _serve(self, method: str):
+                url = urlparse(self.path)
+                if method == "POST":
+                    # El body del formulario no se usa, pero hay que consumirlo
+                    self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+                if url.path.startswith("/ofac"):
+                    source = "ofac"
+                elif url.path.startswith("/icij/search"):
+                    source = "offshore-leaks"
+                elif url.path.startswith("/world-bank"):
+                    source = "world-bank"
+                else:
+                    # Assets (css/js) de las páginas guardadas
+                    self._send(404, b"")
+                    return
+
+                upstreams._count(source)
+                time.sleep(upstreams._delay())
+                if upstreams._roll(upstreams.error_rate):
+                    upstreams._count(f"{source}.error")
+                    self._send(503, b"Service Unavailable", "text/plain")
+                elif source == "ofac":
+                    self._send(200, upstreams.ofac_results if method == "POST" else upstreams.ofac_form)
+                elif source == "offshore-leaks":
+                    if upstreams._roll(upstreams.challenge_rate):
+                        upstreams._count(f"{source}.challenge")
+                        self._send(200, upstreams.icij_challenge)
+                    else:
+                        self._send(200, upstreams._icij_page(parse_qs(url.query), self.headers.get("Cookie", "")))
+                else:
+                    self._send(200, upstreams.world_bank, "application/json")
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidores locales que imitan a OFAC, ICIJ y World Bank")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--challenge-rate", type=float, default=0)
+    parser.add_argument("--icij-pages", type=int, default=3)
+    parser.add_argument("--world-bank-scale", type=int, default=1)
+    args = parser.parse_args()
+
+    upstreams = FakeUpstreams(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate,
+                              args.challenge_rate, args.icij_pages, args.world_bank_scale)
+    print("Exportar antes de iniciar la API:")
+    for name, value in upstreams.env().items():
+        print(f"  export {name}={value}")
+    try:
+        upstreams.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(upstreams.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Prueba de carga de punta a punta contra /api/v1/search/*.
+
+Por defecto levanta los servidores falsos de OFAC, ICIJ y World Bank
+(benchmarks/fake_upstreams.py) y una instancia de la API con uvicorn apuntada a
+ellos, genera tráfico con concurrencia fija (--concurrency, lazo cerrado) o con
+llegadas de Poisson a una tasa dada (--rate, lazo abierto) y reporta throughput,
+latencias p50/p95/p99, mezcla de errores y, cada --sample-interval segundos, la
+cantidad de procesos de Chromium y el RSS de la API (lee /proc, solo Linux).
+Requiere `pip install -r requirements-dev.txt` (httpx).
+
+Uso:
+    python -m benchmarks.load_test --concurrency 8 --duration 60
+    python -m benchmarks.load_test --rate 2 --duration 120 --endpoints world-bank:5,ofac:1 --error-rate 0.05
+    python -m benchmarks.load_test --api-url http://localhost:8000 --api-key mi-key --api-pid 1234
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.fake_upstreams import FakeUpstreams
+
+DEFAULT_NAMES = ["Bank", "PEMEX", "Global Trading", "London Foundation", "Pacific Holdings",
+                 "Construction", "Golden Dragon", "National Energy"]
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def parse_endpoints(spec: str) -> List[Tuple[str, float]]:
+    """"world-bank:5,ofac:1" -> [("world-bank", 5.0), ("ofac", 1.0)]"""
+    endpoints = []
+    for item in spec.split(","):
+        name, _, weight = item.strip().partition(":")
+        endpoints.append((name, float(weight or 1)))
+    return endpoints
+
+
+def _process_table() -> Dict[int, Tuple[int, str, int]]:
+    """pid -> (ppid, nombre, RSS en bytes) de todos los procesos visibles en /proc"""
+    table = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+            with open(f"/proc/{entry}/statm") as f:
+                resident = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            # El proceso terminó mientras se leía
+            continue
+        name = stat[stat.index("(") + 1:stat.rindex(")")]
+        ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        table[int(entry)] = (ppid, name, resident * PAGE_SIZE)
+    return table
+
+
+def sample_processes(root_pid: int) -> Dict[str, float]:
+    table = _process_table()
+    children: Dict[int, List[int]] = {}
+    for pid, (ppid, _, _) in table.items():
+        children.setdefault(ppid, []).append(pid)
+
+    tree, pending = [], [root_pid]
+    while pending:
+        pid = pending.pop()
+        if pid in table:
+            tree.append(pid)
+            pending.extend(children.get(pid, []))
+
+    chromium = [pid for pid in tree if "chrom" in table[pid][1].lower() or "headless_shell" in table[pid][1]]
+    return {
+        "chromium_processes": len(chromium),
+        "chromium_rss_mb": round(sum(table[pid][2] for pid in chromium) / 1024 / 1024, 1),
+        "api_rss_mb": round(table[root_pid][2] / 1024 / 1024, 1) if root_pid in table else 0.0,
+        "total_rss_mb": round(sum(table[pid][2] for pid in tree) / 1024 / 1024, 1)
+    }
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class LoadTest:
+    def __init__(self, api_url: str, api_keys: List[str], endpoints: List[Tuple[str, float]],
+                 names: List[str], timeout: float, seed: int = 42):
+        self.api_url = api_url.rstrip("/")
+        self.api_keys = api_keys
+        self.endpoints = endpoints
+        self.names = names
+        self.timeout = timeout
+        self._random = random.Random(seed)
+        # (endpoint, resultado, segundos, inicio relativo)
+        self.results: List[Tuple[str, str, float, float]] = []
+        self.in_flight = 0
+        self.started = 0.0
+
+    async def request(self, client: httpx.AsyncClient, index: int):
+        endpoint = self._random.choices([e for e, _ in self.endpoints], [w for _, w in self.endpoints])[0]
+        api_key = self.api_keys[index % len(self.api_keys)]
+        payload = {"entity_name": self._random.choice(self.names)}
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            response = await client.post(f"{self.api_url}/api/v1/search/{endpoint}", json=payload,
+                                         headers={"X-API-Key": api_key}, timeout=self.timeout)
+            outcome = str(response.status_code)
+            if response.status_code == 200:
+                # Errores de la fuente que la API devuelve con 200 (status error/timeout/partial)
+                body = response.json()
+                if body.get("status") not in (None, "ok"):
+                    outcome += f"/{body['status']}"
+                elif body.get("partial"):
+                    outcome += "/partial"
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        finally:
+            self.in_flight -= 1
+        self.results.append((endpoint, outcome, time.perf_counter() - started, started - self.started))
+
+    async def closed_loop(self, client: httpx.AsyncClient, concurrency: int, duration: float):
+        deadline = self.started + duration
+
+        async def worker(worker_id: int):
+            count = 0
+            while time.perf_counter() < deadline:
+                await self.request(client, worker_id + count * concurrency)
+                count += 1
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+    async def open_loop(self, client: httpx.AsyncClient, rate: float, duration: float):
+        deadline = self.started + duration
+        tasks = []
+        index = 0
+        while True:
+            # Llegadas de Poisson: intervalos exponenciales
+            await asyncio.sleep(self._random.expovariate(rate))
+            if time.perf_counter() >= deadline:
+                break
+            tasks.append(asyncio.create_task(self.request(client, index)))
+            index += 1
+        await asyncio.gather(*tasks)
+
+    async def sampler(self, pid: Optional[int], interval: float, samples: List[Dict]):
+        while True:
+            sample = {"t": round(time.perf_counter() - self.started, 1), "in_flight": self.in_flight,
+                      "completed": len(self.results)}
+            if pid:
+                sample.update(sample_processes(pid))
+            samples.append(sample)
+            print("  " + "  ".join(f"{key}={value}" for key, value in sample.items()), flush=True)
+            await asyncio.sleep(interval)
+
+    async def run(self, concurrency: int, rate: float, duration: float, pid: Optional[int],
+                  sample_interval: float) -> Dict:
+        samples: List[Dict] = []
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+        async with httpx.AsyncClient(limits=limits) as client:
+            self.started = time.perf_counter()
+            sampler = asyncio.create_task(self.sampler(pid, sample_interval, samples))
+            try:
+                if rate:
+                    await self.open_loop(client, rate, duration)
+                else:
+                    await self.closed_loop(client, concurrency, duration)
+            finally:
+                sampler.cancel()
+            elapsed = time.perf_counter() - self.started
+        return self.report(elapsed, samples)
+
+    def report(self, elapsed: float, samples: List[Dict]) -> Dict:
+        def summary(results):
+            latencies = sorted(seconds for _, _, seconds, _ in results)
+            mix: Dict[str, int] = {}
+            for _, outcome, _, _ in results:
+                mix[outcome] = mix.get(outcome, 0) + 1
+            return {
+                "requests": len(results),
+                "throughput_rps": round(len(results) / elapsed, 3) if elapsed else 0.0,
+                "p50_s": round(percentile(latencies, 0.50), 3),
+                "p95_s": round(percentile(latencies, 0.95), 3),
+                "p99_s": round(percentile(latencies, 0.99), 3),
+                "max_s": round(latencies[-1], 3) if latencies else 0.0,
+                "outcomes": dict(sorted(mix.items()))
+            }
+
+        by_endpoint = {}
+        for endpoint, _ in self.endpoints:
+            by_endpoint[endpoint] = summary([r for r in self.results if r[0] == endpoint])
+
+        peaks = {}
+        for key in ("in_flight", "chromium_processes", "chromium_rss_mb", "api_rss_mb", "total_rss_mb"):
+            values = [sample[key] for sample in samples if key in sample]
+            if values:
+                peaks[key] = max(values)
+
+        return {
+            "duration_s": round(elapsed, 1),
+            "overall": summary(self.results),
+            "endpoints": by_endpoint,
+            "peaks": peaks,
+            "samples": samples
+        }
+
+
+def start_api(port: int, env: Dict[str, str], log_path: str, startup_timeout: float = 60) -> subprocess.Popen:
+    log = open(log_path, "w", encoding="utf-8")
+    # Con uvloop, Playwright sync en los hilos de los pools se cuelga cuando falla el navegador
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--loop", "asyncio"],
+        env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT
+    )
+    log.close()
+    deadline = time.monotonic() + startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"La API terminó al iniciar (código {process.returncode}), ver {log_path}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    stop_api(process)
+    raise RuntimeError(f"La API no respondió /health a tiempo, ver {log_path}")
+
+
+def stop_api(process: subprocess.Popen, grace: float = 10):
+    process.terminate()
+    try:
+        process.wait(timeout=grace)
+    except subprocess.TimeoutExpired:
+        # Scrapes en curso que no terminan dentro del apagado ordenado
+        process.kill()
+        process.wait()
+
+
+def print_report(report: Dict, upstream_stats: Optional[Dict[str, int]]):
+    print(f"\nDuración: {report['duration_s']}s")
+    print(f"{'endpoint':>16}  {'reqs':>6}  {'rps':>8}  {'p50':>8}  {'p95':>8}  {'p99':>8}  outcomes")
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["overall"])]
+    for endpoint, stats in rows:
+        print(f"{endpoint:>16}  {stats['requests']:>6}  {stats['throughput_rps']:>8.3f}  {stats['p50_s']:>8.3f}  "
+              f"{stats['p95_s']:>8.3f}  {stats['p99_s']:>8.3f}  {stats['outcomes']}")
+    if report["peaks"]:
+        print(f"Picos: {report['peaks']}")
+    if upstream_stats is not None:
+        print(f"Requests a los upstreams falsos: {upstream_stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de /api/v1/search/* con upstreams falsos")
+    parser.add_argument("--concurrency", type=int, default=4, help="Clientes en lazo cerrado")
+    parser.add_argument("--rate", type=float, default=0, help="Requests por segundo en lazo abierto (Poisson)")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--endpoints", default="world-bank:6,ofac:2,offshore-leaks:1,all:1",
+                        help="Endpoints con peso, p. ej. world-bank:5,ofac:1")
+    parser.add_argument("--names", default=",".join(DEFAULT_NAMES))
+    parser.add_argument("--timeout", type=float, default=300, help="Timeout de cada request del cliente")
+    parser.add_argument("--sample-interval", type=float, default=2)
+    parser.add_argument("--output", help="Guarda el reporte completo en JSON")
+    # API ya desplegada en lugar de levantar una local
+    parser.add_argument("--api-url")
+    parser.add_argument("--api-key", action="append", help="Se puede repetir; por defecto se generan keys")
+    parser.add_argument("--api-pid", type=int, help="PID de la API para medir Chromium y RSS")
+    # API local
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--keys", type=int, default=0, help="API keys a generar (por defecto una por cliente)")
+    parser.add_argument("--quota", type=int, default=1000000, help="RATE_LIMIT_PER_MINUTE de la API local")
+    parser.add_argument("--api-log", default="load_test_api.log", help="Salida de la API local")
+    parser.add_argument("--execution-mode", choices=["thread", "process"], default="thread")
+    # Upstreams falsos
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--jitter-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--challenge-rate", type=float, default=0)
+    parser.add_argument("--world-bank-scale", type=int, default=1)
+    args = parser.parse_args()
+
+    endpoints = parse_endpoints(args.endpoints)
+    names = [name.strip() for name in args.names.split(",") if name.strip()]
+
+    upstreams = None
+    api = None
+    pid = args.api_pid
+    if args.api_url:
+        api_url = args.api_url
+        api_keys = args.api_key or [os.getenv("API_KEY_1", "")]
+    else:
+        upstreams = FakeUpstreams(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                  error_rate=args.error_rate, challenge_rate=args.challenge_rate,
+                                  world_bank_scale=args.world_bank_scale).start()
+        # Varias keys del plan standard para que el límite por key no sea el cuello de botella
+        key_count = args.keys or max(args.concurrency, 1)
+        api_keys = args.api_key or [f"load-test-key-{i}" for i in range(1, key_count + 1)]
+        env = {**upstreams.env(), "RATE_LIMIT_PER_MINUTE": str(args.quota),
+               "SCRAPER_EXECUTION_MODE": args.execution_mode}
+        for i, api_key in enumerate(api_keys, 1):
+            env[f"API_KEY_{i}"] = api_key
+        env[f"API_KEY_{len(api_keys) + 1}"] = ""
+        api = start_api(args.port, env, args.api_log)
+        api_url = f"http://127.0.0.1:{args.port}"
+        pid = api.pid
+
+    mode = f"rate={args.rate}/s" if args.rate else f"concurrency={args.concurrency}"
+    print(f"Carga contra {api_url} ({mode}, {args.duration:g}s, endpoints={args.endpoints})")
+    try:
+        load = LoadTest(api_url, api_keys, endpoints, names, args.timeout)
+        report = asyncio.run(load.run(args.concurrency, args.rate, args.duration, pid, args.sample_interval))
+    finally:
+        if api is not None:
+            stop_api(api)
+        if upstreams is not None:
+            upstreams.stop()
+
+    upstream_stats = upstreams.stats() if upstreams is not None else None
+    print_report(report, upstream_stats)
+    if args.output:
+        report["upstreams"] = upstream_stats
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Reporte guardado en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Datos de prueba para los benchmarks: páginas HTML guardadas de ICIJ y OFAC
+(benchmarks/fixtures/) y un payload sintético del World Bank con la misma
+estructura que la API real (response.ZPROCSUPP).
+"""
+import json
+import os
+import random
+from typing import Dict, List
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# Tamaño aproximado de la lista real de firmas inhabilitadas
+WORLD_BANK_FIRMS = 1300
+
+_WORDS = ["GLOBAL", "PACIFIC", "HOLDINGS", "TRADING", "BANK", "CONSTRUCTION", "ENGINEERING",
+          "CONSULTING", "SERVICES", "INDUSTRIES", "SUPPLY", "TECHNOLOGIES", "MEDICAL", "ENERGY",
+          "INFRASTRUCTURE", "DEVELOPMENT", "PEMEX", "GENERAL", "NATIONAL", "INTERNATIONAL"]
+_SUFFIXES = ["LIMITED", "LTD.", "S.A.", "S.A. DE C.V.", "CO., LTD.", "INC.", "SARL", "GMBH", "PVT. LTD."]
+_COUNTRIES = [("Mexico", "MX"), ("China", "CN"), ("India", "IN"), ("Nigeria", "NG"), ("Bangladesh", "BD"),
+              ("Indonesia", "ID"), ("Kenya", "KE"), ("Brazil", "BR"), ("Viet Nam", "VN"), ("Peru", "PE"),
+              ("Colombia", "CO"), ("Philippines", "PH"), ("Pakistan", "PK"), ("Ukraine", "UA")]
+_REASONS = ["Procurement Guidelines, 1.16(a)(ii)", "Consultant Guidelines, 1.23(a)(ii)",
+            "Cross debarment: ADB", "Cross debarment: IDB", "Sanctions Board Decision No. 95"]
+_STATUSES = ["Debarred", "Debarred with conditional release", "Cross-debarred", "Temporary suspension"]
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def world_bank_firms(count: int = WORLD_BANK_FIRMS, seed: int = 42) -> List[Dict]:
+    rng = random.Random(seed)
+    firms = []
+    for i in range(count):
+        country, code = rng.choice(_COUNTRIES)
+        start_year = rng.randint(2005, 2024)
+        firms.append({
+            "SUPP_ID": 100000 + i,
+            "SUPP_NAME": " ".join(rng.sample(_WORDS, rng.randint(1, 3))) + " " + rng.choice(_SUFFIXES),
+            "SUPP_ADDR": f"{rng.randint(1, 9999)} {rng.choice(_WORDS).title()} Avenue",
+            "SUPP_CITY": rng.choice(["Capital", "Port", "North", "South"]) + " City",
+            "SUPP_STATE_CODE": "",
+            "SUPP_ZIP_CODE": str(rng.randint(10000, 99999)),
+            "COUNTRY_NAME": country,
+            "LAND1": code,
+            "DEBAR_FROM_DATE": f"{start_year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "DEBAR_TO_DATE": "Ongoing" if rng.random() < 0.1 else f"{start_year + rng.randint(1, 10)}-12-31",
+            "DEBAR_REASON": rng.choice(_REASONS),
+            "ELIG_STAT": rng.choice(_STATUSES)
+        })
+    return firms
+
+
+def world_bank_payload(scale: int = 1, seed: int = 42) -> bytes:
+    """Cuerpo JSON como lo devuelve la API; scale multiplica la cantidad de firmas"""
+    firms = world_bank_firms(WORLD_BANK_FIRMS * scale, seed)
+    return json.dumps({"response": {"ZPROCSUPP": firms}}).encode()
@@ -0,0 +1,78 @@
+"""
+Servidor local con protocolo Redis para probar RATE_LIMIT_BACKEND=redis sin un
+redis-server instalado.
+
+Usa el servidor TCP de fakeredis, con Lua (lupa) para el script de
+RedisBackend.hit. Los tests lo levantan en un puerto libre; también se puede
+dejar corriendo para una API o un benchmark locales. Requiere
+`pip install -r requirements-dev.txt`.
+
+Uso:
+    python -m benchmarks.redis_standin --port 6390
+    RATE_LIMIT_BACKEND=redis RATE_LIMIT_REDIS_URL=redis://127.0.0.1:6390/0 uvicorn api.main:app --workers 4
+    python -m benchmarks.bench_rate_limiter --backend redis --redis-url redis://127.0.0.1:6390/0
+"""
+import argparse
+import threading
+
+from api.rate_limit_backends import _REDIS_HIT_SCRIPT
+
+
+class RedisStandIn:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        try:
+            from fakeredis import TcpFakeServer
+        except ImportError as e:
+            raise RuntimeError("The Redis stand-in requires fakeredis[lua] (pip install -r requirements-dev.txt)") from e
+
+        self.server = TcpFakeServer((host, port))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def load_scripts(self):
+        # Con fakeredis la respuesta NOSCRIPT al primer EVALSHA cierra la conexión: el script
+        # de RedisBackend queda cargado de antemano, como en un Redis que ya estaba en uso
+        import redis
+
+        client = redis.Redis.from_url(self.url)
+        try:
+            client.script_load(_REDIS_HIT_SCRIPT)
+        finally:
+            client.close()
+
+    def start(self) -> "RedisStandIn":
+        self._thread = threading.Thread(target=self.server.serve_forever, name="redis-standin", daemon=True)
+        self._thread.start()
+        self.load_scripts()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local con protocolo Redis (fakeredis)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    standin = RedisStandIn(args.host, args.port).start()
+    print("Exportar antes de iniciar la API:")
+    print("  export RATE_LIMIT_BACKEND=redis")
+    print(f"  export RATE_LIMIT_REDIS_URL={standin.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        standin.stop()
+
+
+if __name__ == "__main__":
+    main()
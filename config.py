@@ -1,6 +1,7 @@
 """
 Configuración del scraper
 """
+import os
 
 # URL BASE del World Bank Debarred Firms
 BASE_URL = "https://projects.worldbank.org/en/projects-operations/procurement/debarred-firms"
@@ -27,5 +28,162 @@ REQUEST_TIMEOUT = 30  # segundos
 
 # Directorio de salida para archivos
 OUTPUT_DIR = "output"
-# Extensión de los archivos de salida
-OUTPUT_FORMATS = ['csv', 'json']
\ No newline at end of file
+# Formatos de exportación en streaming (scrappers/export.py); parquet requiere pyarrow
+OUTPUT_FORMATS = ['ndjson', 'csv', 'parquet']
+# Filas por row group de Parquet: es lo único que se retiene en memoria al exportar
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 5000))
+# Registros que pueden esperar al hilo de escritura de un archivo en segundo plano; con la cola
+# llena quien escribe espera (el screening masivo deja de leer resultados hasta que haya lugar)
+EXPORT_QUEUE_SIZE = int(os.getenv('EXPORT_QUEUE_SIZE', 1000))
+
+# Screening masivo (/api/v1/search/bulk)
+BULK_MAX_NAMES = 50000
+# Scrapers de navegador simultáneos por fuente durante un screening masivo
+BULK_BROWSER_CONCURRENCY = {
+    'ofac': 2,
+    'offshore-leaks': 1
+}
+# Cada cuántos segundos se emite una línea de progreso
+BULK_PROGRESS_INTERVAL = 2  # segundos
+# Si se define, cada screening masivo también se archiva en este directorio mientras se transmite
+# (un archivo por trabajo, una fila por nombre y fuente). Compresión: gzip o none; en parquet
+# también zstd o snappy
+BULK_ARCHIVE_DIR = os.getenv('BULK_ARCHIVE_DIR')
+BULK_ARCHIVE_FORMAT = os.getenv('BULK_ARCHIVE_FORMAT', 'ndjson')
+BULK_ARCHIVE_COMPRESSION = os.getenv('BULK_ARCHIVE_COMPRESSION', 'gzip')
+
+
+# Pools de hilos por fuente: workers simultáneos y trabajos que pueden esperar en cola.
+# Con la cola llena la API responde 503 con Retry-After en lugar de acumular navegadores
+SOURCE_EXECUTORS = {
+    'ofac': {'max_workers': int(os.getenv('OFAC_WORKERS', 4)), 'max_queue': 16},
+    'offshore-leaks': {'max_workers': int(os.getenv('OFFSHORE_WORKERS', 2)), 'max_queue': 8},
+    'world-bank': {'max_workers': int(os.getenv('WORLD_BANK_WORKERS', 4)), 'max_queue': 32}
+}
+
+
+# Servidor en modo producción (python run.py --prod). WEB_LOOP queda en asyncio: con uvloop,
+# Playwright sync en los hilos de los pools se cuelga cuando falla el navegador
+WEB_HOST = os.getenv('WEB_HOST', '0.0.0.0')
+WEB_PORT = int(os.getenv('WEB_PORT', 8000))
+WEB_WORKERS = int(os.getenv('WEB_WORKERS', min(4, os.cpu_count() or 1)))
+WEB_LOOP = os.getenv('WEB_LOOP', 'asyncio')
+# Al recibir SIGTERM: segundos que se esperan los requests en curso, y después los scrapers
+# cancelados mientras cierran su navegador
+GRACEFUL_SHUTDOWN_TIMEOUT = float(os.getenv('GRACEFUL_SHUTDOWN_TIMEOUT', 30))
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', 10))
+# Al iniciar, en segundo plano: descargar la lista del World Bank e importar los scrapers
+STARTUP_WARMUP = os.getenv('STARTUP_WARMUP', 'true').lower() == 'true'
+# Lista del World Bank ya descargada por run.py --prod antes de lanzar los workers
+WORLD_BANK_SNAPSHOT = os.getenv('WORLD_BANK_SNAPSHOT')
+
+# Readiness (/health/ready): el warmup también lanza una vez Chromium por fuente de navegador
+# (en modo process eso deja listo el subproceso del worker). Una fuente pasa a degraded tras
+# READINESS_FAILURE_THRESHOLD fallas seguidas y a challenge-blocked por READINESS_CHALLENGE_WINDOW
+# segundos tras un captcha. El worker está listo cuando terminó el warmup y las fuentes de
+# READINESS_REQUIRED_SOURCES pueden responder
+STARTUP_BROWSER_PROBE = os.getenv('STARTUP_BROWSER_PROBE', 'true').lower() == 'true'
+READINESS_FAILURE_THRESHOLD = int(os.getenv('READINESS_FAILURE_THRESHOLD', 3))
+READINESS_CHALLENGE_WINDOW = float(os.getenv('READINESS_CHALLENGE_WINDOW', 900))
+READINESS_REQUIRED_SOURCES = [
+    source.strip() for source in os.getenv('READINESS_REQUIRED_SOURCES', 'world-bank').split(',') if source.strip()
+]
+
+# Circuit breaker de las fuentes con navegador (OFAC, ICIJ). Se abre con un captcha, con
+# BREAKER_FAILURE_THRESHOLD fallas o timeouts seguidos, o si en los últimos BREAKER_WINDOW segundos
+# fallaron más de BREAKER_ERROR_RATE de al menos BREAKER_MIN_REQUESTS búsquedas. Abierto responde
+# sin lanzar el navegador (con el último resultado de la misma búsqueda si tiene menos de
+# BREAKER_FALLBACK_TTL segundos) y después deja pasar una búsqueda de prueba; si falla vuelve a
+# abrirse por el doble de tiempo, hasta BREAKER_MAX_OPEN_SECONDS
+BREAKER_ENABLED = os.getenv('BREAKER_ENABLED', 'true').lower() == 'true'
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))
+BREAKER_ERROR_RATE = float(os.getenv('BREAKER_ERROR_RATE', 0.5))
+BREAKER_MIN_REQUESTS = int(os.getenv('BREAKER_MIN_REQUESTS', 10))
+BREAKER_WINDOW = float(os.getenv('BREAKER_WINDOW', 300))
+BREAKER_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', 30))
+BREAKER_CHALLENGE_OPEN_SECONDS = float(os.getenv('BREAKER_CHALLENGE_OPEN_SECONDS', 300))
+BREAKER_MAX_OPEN_SECONDS = float(os.getenv('BREAKER_MAX_OPEN_SECONDS', 1800))
+BREAKER_FALLBACK_TTL = float(os.getenv('BREAKER_FALLBACK_TTL', 3600))
+BREAKER_FALLBACK_MAX = int(os.getenv('BREAKER_FALLBACK_MAX', 1000))
+
+
+# Dónde corren los scrapers: thread (hilos del proceso de la API) o process (cada worker
+# de los pools supervisa un subproceso; una caída de Chromium solo afecta a ese trabajo)
+SCRAPER_EXECUTION_MODE = os.getenv('SCRAPER_EXECUTION_MODE', 'thread')
+# Trabajos por subproceso antes de reciclarlo
+PROCESS_MAX_JOBS = int(os.getenv('PROCESS_MAX_JOBS', 50))
+
+# Clases de prioridad en los pools: interactive (búsquedas puntuales) se despacha antes
+# que batch (screening automatizado). Un trabajo batch que esperó más de BATCH_AGING_SECONDS
+# pasa adelante, y batch nunca ocupa todos los workers de una fuente con dos o más
+PRIORITY_CLASSES = ('interactive', 'batch')
+DEFAULT_PRIORITY = os.getenv('DEFAULT_PRIORITY', 'interactive')
+BATCH_AGING_SECONDS = float(os.getenv('BATCH_AGING_SECONDS', 30))
+
+
+# Segundos que se reutiliza la lista descargada del World Bank antes de volver a pedirla
+WORLD_BANK_CACHE_TTL = float(os.getenv('WORLD_BANK_CACHE_TTL', 300))
+
+
+# Exportar los spans de cada request en formato OTLP/JSON a este archivo (vacío = desactivado)
+OTEL_EXPORT_FILE = os.getenv('OTEL_EXPORT_FILE')
+OTEL_SERVICE_NAME = os.getenv('OTEL_SERVICE_NAME', 'ey-risk-screening-api')
+
+
+# Cache HTTP de las búsquedas (ETag + Cache-Control). World Bank usa lo que le queda a la lista
+# cacheada; OFAC e ICIJ se scrapean en vivo y se asume que sus datos cambian como mucho una vez
+# por este intervalo. Con HTTP_CACHE_SCOPE=public un proxy puede guardar las respuestas (varían
+# por X-API-Key)
+SOURCE_CACHE_MAX_AGE = {
+    'ofac': int(os.getenv('OFAC_CACHE_MAX_AGE', 3600)),
+    'offshore-leaks': int(os.getenv('OFFSHORE_CACHE_MAX_AGE', 86400))
+}
+HTTP_CACHE_SCOPE = os.getenv('HTTP_CACHE_SCOPE', 'private')
+
+
+# Resultados paginados: al pedir `limit`, el resultado completo se guarda SEARCH_RESULTS_TTL
+# segundos para servir las páginas siguientes sin volver a scrapear (por proceso, como mucho
+# SEARCH_RESULTS_MAX búsquedas; las más viejas se descartan primero)
+SEARCH_RESULTS_TTL = float(os.getenv('SEARCH_RESULTS_TTL', 600))
+SEARCH_RESULTS_MAX = int(os.getenv('SEARCH_RESULTS_MAX', 1000))
+SEARCH_PAGE_MAX_LIMIT = 1000
+
+
+# Compresión de respuestas: solo cuerpos de al menos COMPRESSION_MIN_SIZE bytes. Brotli
+# se negocia si el paquete está instalado; la calidad 4 rinde bien para respuestas dinámicas
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 6))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+
+
+# Tiempos máximos de /api/v1/search/all (se pueden sobrescribir por request)
+SEARCH_SOURCE_TIMEOUT = float(os.getenv('SEARCH_SOURCE_TIMEOUT', 90))  # segundos por fuente
+SEARCH_TOTAL_TIMEOUT = float(os.getenv('SEARCH_TOTAL_TIMEOUT', 120))  # segundos en total
+
+# Dónde guarda el rate limiter su estado: memory (por proceso), sqlite (compartido
+# entre workers de la misma máquina) o redis (compartido entre máquinas)
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_SQLITE_PATH = os.getenv('RATE_LIMIT_SQLITE_PATH', 'rate_limits.sqlite3')
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
+
+# Planes de API keys (API_KEY_TIER_n en el .env). La cuota es en unidades por minuto:
+# cada endpoint consume según su costo, y max_concurrent limita las búsquedas con
+# navegador que una key puede tener en curso a la vez
+RATE_LIMIT_PER_MINUTE = int(os.getenv('RATE_LIMIT_PER_MINUTE', 20))
+DEFAULT_TIER = os.getenv('DEFAULT_TIER', 'standard')
+RATE_LIMIT_TIERS = {
+    'free': {'quota_per_minute': 10, 'max_concurrent': 1},
+    'standard': {'quota_per_minute': RATE_LIMIT_PER_MINUTE, 'max_concurrent': 2},
+    'premium': {'quota_per_minute': 120, 'max_concurrent': 6}
+}
+
+# Costo de cada endpoint en unidades de cuota: las búsquedas con navegador cuestan más
+ENDPOINT_COSTS = {
+    'world-bank': 1,
+    'ofac': 3,
+    'offshore-leaks': 4,
+    'all': 8,
+    'bulk': 10,
+    'page': 1,
+    'not-modified': 1
+}
@@ -1,9 +1,101 @@
-import uvicorn 
+"""
+Arranque del servidor.
+
+    python run.py          # desarrollo: un proceso con recarga automática
+    python run.py --prod   # producción: WEB_WORKERS procesos, httptools y apagado ordenado
+
+En producción la lista del World Bank se descarga una sola vez antes de lanzar
+los workers y cada uno la carga desde un archivo al iniciar (uvicorn lanza los
+workers con spawn, así que no se comparte memoria con fork). Con SIGTERM cada
+worker deja de aceptar conexiones, espera los requests en curso hasta
+GRACEFUL_SHUTDOWN_TIMEOUT y cancela los scrapers que sigan corriendo.
+"""
+import argparse
+import logging
+import os
+import tempfile
+from typing import Optional
+
+import orjson
+import uvicorn
+
+from config import (
+    WEB_HOST,
+    WEB_PORT,
+    WEB_WORKERS,
+    WEB_LOOP,
+    GRACEFUL_SHUTDOWN_TIMEOUT,
+    RATE_LIMIT_BACKEND
+)
+
+logger = logging.getLogger("run")
+
+
+def preload_world_bank() -> Optional[str]:
+    """Descarga la lista del World Bank y la guarda en un archivo para los workers"""
+    from scrappers.world_bank import WorldBankScraper
+
+    try:
+        firms = WorldBankScraper().scrape()
+    except Exception as e:
+        logger.warning(f"World Bank preload failed, each worker will download the list: {str(e)}")
+        return None
+    if not firms:
+        return None
+
+    fd, path = tempfile.mkstemp(prefix="world-bank-", suffix=".json")
+    with os.fdopen(fd, "wb") as f:
+        f.write(orjson.dumps(firms))
+    logger.info(f"World Bank list preloaded ({len(firms)} firms) in {path}")
+    return path
+
+
+def run_production(host: str, port: int, workers: int, preload: bool):
+    if workers > 1 and RATE_LIMIT_BACKEND == "memory":
+        logger.warning("RATE_LIMIT_BACKEND=memory with several workers: each worker keeps its own quota")
+
+    snapshot = preload_world_bank() if preload else None
+    if snapshot:
+        # Los workers heredan el entorno y leen WORLD_BANK_SNAPSHOT de config.py
+        os.environ["WORLD_BANK_SNAPSHOT"] = snapshot
+    try:
+        uvicorn.run(
+            "api.main:app",
+            host=host,
+            port=port,
+            workers=workers,
+            loop=WEB_LOOP,
+            http="httptools",
+            proxy_headers=True,
+            timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+            log_level="info"
+        )
+    finally:
+        if snapshot:
+            os.remove(snapshot)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de la API de búsqueda en listas de riesgo")
+    parser.add_argument("--prod", action="store_true", help="Modo producción (varios workers, sin recarga)")
+    parser.add_argument("--host", default=WEB_HOST)
+    parser.add_argument("--port", type=int, default=WEB_PORT)
+    parser.add_argument("--workers", type=int, default=WEB_WORKERS, help="Solo en --prod")
+    parser.add_argument("--no-preload", action="store_true", help="No descargar el World Bank antes de lanzar los workers")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.prod:
+        run_production(args.host, args.port, max(1, args.workers), not args.no_preload)
+    else:
+        uvicorn.run("api.main:app",
+                    host=args.host,
+                    port=args.port,
+                    reload=True,
+                    log_level="info"
+                    )
+
 
 if __name__ == "__main__":
-    uvicorn.run("api.main:app", 
-                host="0.0.0.0",
-                port=8000,
-                reload=True,
-                log_level="info"
-                )
\ No newline at end of file
+    main()
@@ -0,0 +1,25 @@
+"""
+Verificación de que Playwright puede lanzar Chromium.
+
+La usa el warmup: si el navegador no arranca (no está instalado, falta una
+librería del sistema) las fuentes que lo necesitan se reportan como degraded
+en /health/ready antes de que llegue la primera búsqueda.
+"""
+import time
+from typing import Optional
+
+from playwright.sync_api import sync_playwright
+
+from scrappers import telemetry
+from scrappers.cancellation import CancellationToken, check
+
+
+def probe_browser(cancel_token: Optional[CancellationToken] = None) -> float:
+    """Lanza y cierra Chromium headless; devuelve los segundos que tardó"""
+    started = time.perf_counter()
+    with sync_playwright() as p:
+        with telemetry.timed("browser_launch", source="probe"):
+            browser = p.chromium.launch(headless=True)
+        browser.close()
+    check(cancel_token)
+    return time.perf_counter() - started
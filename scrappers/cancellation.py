@@ -0,0 +1,67 @@
+"""
+Cancelación cooperativa para los scrapers que corren en hilos del executor.
+
+Un hilo no se puede matar desde fuera, así que el scraper revisa el token en
+cada espera y pausa; al cancelarlo se lanza ScrapeCancelled y el scraper
+cierra su navegador de inmediato.
+"""
+import threading
+import time
+from typing import Optional
+
+
+class ScrapeCancelled(Exception):
+    """Se lanza dentro del scraper cuando su token fue cancelado"""
+
+
+class CancellationToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._children = []
+        self.reason: Optional[str] = None
+
+    def child(self) -> "CancellationToken":
+        """Token que se cancela junto con este, pero que también se puede cancelar solo"""
+        token = CancellationToken()
+        with self._lock:
+            if not self._event.is_set():
+                self._children.append(token)
+                return token
+        token.cancel(self.reason)
+        return token
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            children, self._children = self._children, []
+        for child in children:
+            child.cancel(reason)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise ScrapeCancelled(self.reason)
+
+    def sleep(self, seconds: float):
+        # Espera interrumpible: despierta en cuanto se cancela
+        if self._event.wait(seconds):
+            raise ScrapeCancelled(self.reason)
+
+
+def sleep(seconds: float, token: Optional[CancellationToken] = None):
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.sleep(seconds)
+
+
+def check(token: Optional[CancellationToken] = None):
+    if token is not None:
+        token.check()
@@ -0,0 +1,240 @@
+"""
+Exportación en streaming de resultados a NDJSON, CSV o Parquet.
+
+Los registros se escriben a medida que llegan de un iterador (páginas de ICIJ,
+búsquedas de OFAC, firmas del World Bank o líneas del screening masivo), así
+que la memoria no crece con el tamaño del resultado: NDJSON y CSV escriben fila
+a fila (con gzip opcional) y Parquet retiene como mucho EXPORT_BATCH_SIZE filas
+antes de escribir cada row group. Parquet requiere `pip install pyarrow`.
+"""
+import csv
+import gzip
+import os
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import orjson
+
+from config import OUTPUT_DIR, OUTPUT_FORMATS, EXPORT_BATCH_SIZE, EXPORT_QUEUE_SIZE
+
+# Compresiones válidas por formato; la primera es la que se usa si no se indica otra
+COMPRESSIONS = {
+    "ndjson": ("gzip", None),
+    "csv": ("gzip", None),
+    "parquet": ("zstd", "snappy", "gzip", None)
+}
+_EXTENSIONS = {"ndjson": ".ndjson", "csv": ".csv", "parquet": ".parquet"}
+
+
+class ExportError(Exception):
+    """Formato o compresión no soportados, o falta pyarrow para Parquet"""
+
+
+def infer_format(path: str) -> str:
+    name = path[:-3] if path.endswith(".gz") else path
+    for fmt, extension in _EXTENSIONS.items():
+        if name.endswith(extension):
+            return fmt
+    if name.endswith((".jsonl", ".json")):
+        return "ndjson"
+    raise ExportError(f"Cannot infer the export format of '{path}'. Valid formats: {', '.join(OUTPUT_FORMATS)}")
+
+
+def default_path(prefix: str, fmt: str, compression: Optional[str] = None, directory: str = OUTPUT_DIR) -> str:
+    """output/<prefijo>_<fecha>.<ext>, con .gz si NDJSON o CSV van comprimidos"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    suffix = ".gz" if compression == "gzip" and fmt != "parquet" else ""
+    return os.path.join(directory, f"{prefix}_{timestamp}{_EXTENSIONS[fmt]}{suffix}")
+
+
+def _pyarrow():
+    # pyarrow se importa recién al exportar a Parquet: importar la API no lo carga
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ExportError("Parquet export requires pyarrow (pip install pyarrow)")
+    return pyarrow, pyarrow.parquet
+
+
+def _cell(value):
+    # CSV y Parquet son planos: listas y diccionarios se guardan como JSON
+    if isinstance(value, (dict, list, tuple)):
+        return orjson.dumps(value).decode()
+    return value
+
+
+class ExportWriter:
+    """
+    Escritor incremental de registros (diccionarios).
+
+    Las columnas de CSV y Parquet salen de `fields` o del primer registro; las
+    claves que no estén en ellas se ignoran y las que falten quedan vacías.
+    """
+
+    def __init__(self, path: str, fmt: Optional[str] = None, compression: Optional[str] = "default",
+                 fields: Optional[List[str]] = None, batch_size: int = EXPORT_BATCH_SIZE):
+        self.fmt = fmt or infer_format(path)
+        if self.fmt not in COMPRESSIONS:
+            raise ExportError(f"Unknown export format '{self.fmt}'. Valid formats: {', '.join(OUTPUT_FORMATS)}")
+        if compression == "default":
+            compression = "gzip" if path.endswith(".gz") else (COMPRESSIONS[self.fmt][0] if self.fmt == "parquet" else None)
+        if compression not in COMPRESSIONS[self.fmt]:
+            raise ExportError(f"Compression '{compression}' is not supported for {self.fmt}")
+        self._pa = self._pq = None
+        if self.fmt == "parquet":
+            self._pa, self._pq = _pyarrow()
+
+        self.path = path
+        self.compression = compression
+        self.fields = list(fields) if fields else None
+        self.batch_size = max(1, batch_size)
+        self.count = 0
+        self._file = None
+        self._csv = None
+        self._parquet = None
+        self._batch: List[Dict] = []
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.fmt == "ndjson":
+            self._file = gzip.open(path, "wb") if compression == "gzip" else open(path, "wb")
+        elif self.fmt == "csv":
+            # utf-8-sig para que Excel reconozca los acentos, como el CSV anterior
+            if compression == "gzip":
+                self._file = gzip.open(path, "wt", encoding="utf-8-sig", newline="")
+            else:
+                self._file = open(path, "w", encoding="utf-8-sig", newline="")
+
+    def write(self, record: Dict):
+        if self.fmt == "ndjson":
+            self._file.write(orjson.dumps(record) + b"\n")
+        elif self.fmt == "csv":
+            if self._csv is None:
+                self.fields = self.fields or list(record)
+                self._csv = csv.DictWriter(self._file, fieldnames=self.fields, extrasaction="ignore")
+                self._csv.writeheader()
+            self._csv.writerow({field: _cell(record.get(field)) for field in self.fields})
+        else:
+            self.fields = self.fields or list(record)
+            self._batch.append({field: _cell(record.get(field)) for field in self.fields})
+            if len(self._batch) >= self.batch_size:
+                self._flush_parquet()
+        self.count += 1
+
+    def write_all(self, records: Iterable[Dict]) -> int:
+        for record in records:
+            self.write(record)
+        return self.count
+
+    def _flush_parquet(self):
+        if not self._batch:
+            return
+        pa, pq = self._pa, self._pq
+        if self._parquet is None:
+            table = pa.Table.from_pylist(self._batch)
+            # Una columna vacía en el primer lote se infiere como null: se fija como texto
+            schema = pa.schema([
+                pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                for field in table.schema
+            ])
+            self._parquet = pq.ParquetWriter(self.path, schema, compression=self.compression or "none")
+        try:
+            table = pa.Table.from_pylist(self._batch, schema=self._parquet.schema)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise ExportError(f"Records do not match the Parquet schema of the first batch: {e}")
+        self._parquet.write_table(table)
+        self._batch = []
+
+    def close(self):
+        if self.fmt == "parquet":
+            self._flush_parquet()
+            if self._parquet is None and self.fields:
+                # Sin filas igual queda un archivo válido con las columnas conocidas
+                pa, pq = self._pa, self._pq
+                self._parquet = pq.ParquetWriter(
+                    self.path, pa.schema([pa.field(field, pa.string()) for field in self.fields]),
+                    compression=self.compression or "none"
+                )
+            if self._parquet is not None:
+                self._parquet.close()
+                self._parquet = None
+        elif self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+_CLOSE = object()
+
+
+class BackgroundWriter:
+    """
+    Envuelve un ExportWriter para escribir en un hilo propio. La cola tiene como
+    mucho max_pending registros: write() espera lugar y try_write() devuelve False
+    sin bloquear, para productores que no pueden bloquearse (el event loop de la
+    API). close() espera a que se escriba todo lo encolado y cierra el archivo.
+    """
+
+    def __init__(self, writer: ExportWriter, max_pending: int = EXPORT_QUEUE_SIZE):
+        self.writer = writer
+        self.path = writer.path
+        # Primer error de escritura; los registros siguientes se descartan
+        self.error: Optional[Exception] = None
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_pending))
+        self._thread = threading.Thread(target=self._run, name=f"export-{os.path.basename(writer.path)}", daemon=True)
+        self._thread.start()
+
+    @property
+    def count(self) -> int:
+        return self.writer.count
+
+    def write(self, record: Dict):
+        self._queue.put(record)
+
+    def try_write(self, record: Dict) -> bool:
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            record = self._queue.get()
+            if record is _CLOSE:
+                break
+            if self.error is None:
+                try:
+                    self.writer.write(record)
+                except Exception as e:
+                    self.error = e
+        try:
+            self.writer.close()
+        except Exception as e:
+            self.error = self.error or e
+
+    def close(self):
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+
+def export_records(records: Iterable[Dict], path: str, fmt: Optional[str] = None,
+                   compression: Optional[str] = "default", fields: Optional[List[str]] = None) -> int:
+    """Escribe todos los registros del iterador y devuelve cuántos se escribieron"""
+    with ExportWriter(path, fmt, compression, fields) as writer:
+        return writer.write_all(records)
+
+
+def match_rows(result: Dict) -> Iterator[Dict]:
+    """Una fila por coincidencia de un resultado {query, results}, con la búsqueda que la encontró"""
+    for match in result.get("results") or []:
+        yield {"query": result.get("query"), **match}
@@ -1,69 +1,228 @@
 from playwright.sync_api import sync_playwright, TimeoutError
+from bs4 import BeautifulSoup
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import os
 import time
 import random
 
-def search_ofac(entity_name: str):
+from scrappers.cancellation import CancellationToken, ScrapeCancelled, check, sleep
+from scrappers import export, recording, telemetry
+
+# Se puede apuntar a un servidor local (benchmarks/fake_upstreams.py) para pruebas de carga
+OFAC_URL = os.getenv("OFAC_URL", "https://sanctionssearch.ofac.treas.gov/")
+
+# Selectores del formulario de búsqueda
+NAME_INPUT = "#ctl00_MainContent_txtLastName"
+SEARCH_BUTTON = "#ctl00_MainContent_btnSearch"
+RESULTS_TABLE = "#gvSearchResults"
+
+
+def parse_results_html(html: str) -> List[Dict]:
     results = []
+    soup = BeautifulSoup(html, 'html.parser')
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=True, 
-            slow_mo=50  # Para tener delay y no quedar bloqueado
-        )
-        page = browser.new_page()
-        page.goto("https://sanctionssearch.ofac.treas.gov/", wait_until="networkidle", timeout=60000)
-        
-        time.sleep(random.uniform(2, 4))
-
-        # Esperar input principal
-        page.wait_for_selector("#ctl00_MainContent_txtLastName", state="visible", timeout=10000)
-        time.sleep(random.uniform(1, 2))
-        page.fill("#ctl00_MainContent_txtLastName", entity_name)
-        time.sleep(random.uniform(1, 2))
-        # Click en Search
-        page.click("#ctl00_MainContent_btnSearch")
-        time.sleep(random.uniform(3, 5))
+    # Buscar filas específicamente en la tabla gvSearchResults
+    rows = soup.select(f"{RESULTS_TABLE} tr")
 
-        try:
-            page.wait_for_selector("#gvSearchResults", state="visible", timeout=20000)
-            time.sleep(random.uniform(2, 3))
-            # Buscar filas específicamente en la tabla gvSearchResults
-            rows = page.query_selector_all("#gvSearchResults tr")
-
-            for i, row in enumerate(rows, 1):
-                cols = row.query_selector_all("td")
-                #Name, Address, Type, Program, List, Score
-                if len(cols) >= 6:
-                    name_cell = cols[0]
-                    name_link = name_cell.query_selector("a")
-                    name_text = name_link.inner_text().strip() if name_link else name_cell.inner_text().strip()
-                    name_url = name_link.get_attribute("href") if name_link else None
-                    
-                    result = {
-                        "name": name_text,
-                        "name_url": f"https://sanctionssearch.ofac.treas.gov/{name_url}" if name_url else None,
-                        "address": cols[1].inner_text().strip(),
-                        "type": cols[2].inner_text().strip(),
-                        "programs": cols[3].inner_text().strip(),
-                        "list": cols[4].inner_text().strip(),
-                        "score": cols[5].inner_text().strip()
-                    }
-                    results.append(result)
-                    print(f"  {i}. {result['name']} | {result['address']} | {result['type']} | {result['programs']} | Score: {result['score']}")
+    for i, row in enumerate(rows, 1):
+        cols = row.find_all("td")
+        #Name, Address, Type, Program, List, Score
+        if len(cols) >= 6:
+            name_cell = cols[0]
+            name_link = name_cell.find("a")
+            name_text = name_link.get_text(" ", strip=True) if name_link else name_cell.get_text(" ", strip=True)
+            name_url = name_link.get("href") if name_link else None
+
+            result = {
+                "name": name_text,
+                "name_url": f"{OFAC_URL}{name_url}" if name_url else None,
+                "address": cols[1].get_text(" ", strip=True),
+                "type": cols[2].get_text(" ", strip=True),
+                "programs": cols[3].get_text(" ", strip=True),
+                "list": cols[4].get_text(" ", strip=True),
+                "score": cols[5].get_text(" ", strip=True)
+            }
+            results.append(result)
+            print(f"  {i}. {result['name']} | {result['address']} | {result['type']} | {result['programs']} | Score: {result['score']}")
+
+    return results
+
+
+def _pause(min_seconds: float, max_seconds: float, cancel_token: Optional[CancellationToken] = None):
+    # Pausa aleatoria para no quedar bloqueados; se mide como etapa human_delay
+    with telemetry.timed("human_delay", source="ofac"):
+        if recording.pacing_enabled():
+            sleep(random.uniform(min_seconds, max_seconds), cancel_token)
 
+
+def _open_search_page(browser, cancel_token: Optional[CancellationToken] = None):
+    # browser puede ser un Browser o un BrowserContext: los dos crean páginas
+    page = browser.new_page()
+    with telemetry.timed("page_load", source="ofac"):
+        page.goto(OFAC_URL, wait_until="networkidle", timeout=60000)
+
+    _pause(2, 4, cancel_token)
+
+    # Esperar input principal
+    with telemetry.timed("form_ready", source="ofac"):
+        page.wait_for_selector(NAME_INPUT, state="visible", timeout=10000)
+    return page
+
+
+def _wait_for_results(page, timeout: int, cancel_token: Optional[CancellationToken] = None):
+    # Espera en tramos de 1s para poder abandonar la búsqueda si se cancela
+    deadline = time.monotonic() + timeout / 1000
+    while True:
+        check(cancel_token)
+        remaining = int((deadline - time.monotonic()) * 1000)
+        if remaining <= 0:
+            raise TimeoutError(f"Timeout {timeout}ms exceeded waiting for {RESULTS_TABLE}")
+        try:
+            page.wait_for_selector(f"{RESULTS_TABLE}:not([data-stale])", state="visible", timeout=min(remaining, 1000))
+            return
         except TimeoutError:
-            print("No se encontraron resultados o timeout alcanzado")
-            results = []
-        time.sleep(3)
-        
-        browser.close()
+            continue
+
+
+def _submit_search(page, entity_name: str, cancel_token: Optional[CancellationToken] = None) -> List[Dict]:
+    # Marcar la tabla anterior para no leer resultados de la búsqueda previa
+    page.evaluate(
+        "selector => { const table = document.querySelector(selector); if (table) table.setAttribute('data-stale', '1'); }",
+        RESULTS_TABLE
+    )
+    _pause(1, 2, cancel_token)
+    with telemetry.timed("submit", source="ofac"):
+        page.fill(NAME_INPUT, entity_name)
+    _pause(1, 2, cancel_token)
+    # Click en Search
+    with telemetry.timed("submit", source="ofac"):
+        page.click(SEARCH_BUTTON)
+    _pause(3, 5, cancel_token)
+
+    try:
+        with telemetry.timed("results_wait", source="ofac"):
+            _wait_for_results(page, 20000, cancel_token)
+        _pause(2, 3, cancel_token)
+        # Una sola lectura del HTML de la tabla en vez de una llamada al navegador por celda
+        with telemetry.timed("parse", source="ofac"):
+            html = page.eval_on_selector(RESULTS_TABLE, "table => table.outerHTML")
+            return parse_results_html(html)
+    except TimeoutError:
+        print("No se encontraron resultados o timeout alcanzado")
+        return []
+
 
-    return {
+def _result(entity_name: str, results: List[Dict], error: str = None) -> Dict:
+    result = {
         "source": "OFAC",
         "query": entity_name,
         "hits": len(results),
         "results": results
     }
+    if error:
+        result["error"] = error
+    return result
+
+
+def _launch_browser(p):
+    with telemetry.timed("browser_launch", source="ofac"):
+        return p.chromium.launch(
+            headless=True,
+            slow_mo=50 if recording.pacing_enabled() else 0  # Para tener delay y no quedar bloqueado
+        )
+
+
+def search_ofac(entity_name: str, cancel_token: Optional[CancellationToken] = None):
+    with sync_playwright() as p:
+        browser = _launch_browser(p)
+        try:
+            # Contexto propio para grabar o reproducir el tráfico de esta búsqueda (UPSTREAM_MODE)
+            context = browser.new_context(**recording.context_options("ofac", entity_name))
+            try:
+                recording.attach_replay(context, "ofac", entity_name)
+                page = _open_search_page(context, cancel_token)
+                results = _submit_search(page, entity_name, cancel_token)
+                with telemetry.timed("human_delay", source="ofac"):
+                    if recording.pacing_enabled():
+                        sleep(3, cancel_token)
+            finally:
+                # El HAR se escribe al cerrar el contexto
+                context.close()
+        finally:
+            # Si se canceló, el navegador se cierra sin esperar
+            browser.close()
+
+    return _result(entity_name, results)
+
+
+def search_ofac_batch(entity_names: Iterable[str],
+                      pacing: Tuple[float, float] = (2, 4),
+                      cancel_token: Optional[CancellationToken] = None) -> Iterator[Dict]:
+    """
+    Busca varios nombres en una misma sesión del navegador: la página se carga una vez
+    y el formulario se reutiliza, con una pausa aleatoria entre búsquedas.
+    Produce un resultado por nombre, en el mismo formato que search_ofac.
+    """
+    if recording.MODE != "live":
+        # Las grabaciones son por búsqueda: cada nombre usa su propia sesión
+        yield from _search_ofac_each(entity_names, pacing, cancel_token)
+        return
+
+    with sync_playwright() as p:
+        browser = _launch_browser(p)
+        try:
+            page = _open_search_page(browser, cancel_token)
+            first = True
+            for entity_name in entity_names:
+                if not first:
+                    _pause(*pacing, cancel_token)
+                first = False
+
+                try:
+                    results = _submit_search(page, entity_name, cancel_token)
+                except ScrapeCancelled:
+                    raise
+                except Exception as e:
+                    # Si la página queda en mal estado se recarga y se sigue con el siguiente nombre
+                    print(f"Error buscando '{entity_name}' en OFAC: {e}")
+                    yield _result(entity_name, [], str(e))
+                    with telemetry.timed("page_load", source="ofac"):
+                        page.goto(OFAC_URL, wait_until="networkidle", timeout=60000)
+                    page.wait_for_selector(NAME_INPUT, state="visible", timeout=10000)
+                    continue
+
+                yield _result(entity_name, results)
+        finally:
+            browser.close()
+
+
+def export_ofac_batch(entity_names: Iterable[str], path: str, fmt: Optional[str] = None,
+                      compression: Optional[str] = "default",
+                      cancel_token: Optional[CancellationToken] = None) -> int:
+    """Busca varios nombres y escribe una fila por coincidencia a medida que llegan"""
+    with export.ExportWriter(path, fmt, compression) as writer:
+        for result in search_ofac_batch(entity_names, cancel_token=cancel_token):
+            if result.get("error"):
+                print(f"'{result['query']}' no se exportó: {result['error']}")
+            writer.write_all(export.match_rows(result))
+    return writer.count
+
+
+def _search_ofac_each(entity_names: Iterable[str], pacing: Tuple[float, float],
+                      cancel_token: Optional[CancellationToken] = None) -> Iterator[Dict]:
+    first = True
+    for entity_name in entity_names:
+        if not first:
+            _pause(*pacing, cancel_token)
+        first = False
+        try:
+            yield search_ofac(entity_name, cancel_token)
+        except ScrapeCancelled:
+            raise
+        except Exception as e:
+            print(f"Error buscando '{entity_name}' en OFAC: {e}")
+            yield _result(entity_name, [], str(e))
+
 
 # Ya no se usa en este archivo, pero útil para pruebas rápidas
 if __name__ == "__main__":
@@ -1,14 +1,16 @@
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
 from bs4 import BeautifulSoup
-import pandas as pd
-import json
 import logging
 import os
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import Iterator, List, Dict, Optional, Tuple
 import time
 import random
 
+from scrappers.cancellation import CancellationToken, ScrapeCancelled, check
+from scrappers import export, recording, telemetry
+from config import OUTPUT_FORMATS
+
 # Configurar logging
 logging.basicConfig(
     level=logging.INFO,
@@ -18,7 +20,7 @@ logger = logging.getLogger(__name__)
 
 
 class ICIJOffshoreLeaksScraper:   
-    BASE_URL = "https://offshoreleaks.icij.org"
+    BASE_URL = os.getenv("ICIJ_BASE_URL", "https://offshoreleaks.icij.org")
     SEARCH_URL = f"{BASE_URL}/search"
     
     MIN_DELAY = 4  # segundos mínimos entre páginas
@@ -29,27 +31,40 @@ class ICIJOffshoreLeaksScraper:
         self.headless = headless
         self.all_entities = []
         self.human_challenge_detected = False
+        self.cancel_token: Optional[CancellationToken] = None
+    
+    def sleep(self, seconds: float):
+        # Pausa interrumpible si el scraping en curso tiene token de cancelación
+        if not recording.pacing_enabled():
+            return
+        if self.cancel_token is None:
+            time.sleep(seconds)
+        else:
+            self.cancel_token.sleep(seconds)
         
     def human_delay(self, min_seconds: float = None, max_seconds: float = None):
         min_s = min_seconds or self.MIN_DELAY
         max_s = max_seconds or self.MAX_DELAY
         delay = random.uniform(min_s, max_s)
-        time.sleep(delay)
+        with telemetry.timed("human_delay", source="offshore-leaks"):
+            self.sleep(delay)
     
     def simulate_human_reading(self, page):
         try:
             page.evaluate("window.scrollTo(0, document.body.scrollHeight * 0.3)")
-            time.sleep(random.uniform(0.5, 1.5))
+            self.sleep(random.uniform(0.5, 1.5))
             
             page.evaluate("window.scrollTo(0, document.body.scrollHeight * 0.6)")
-            time.sleep(random.uniform(0.5, 1.5))
+            self.sleep(random.uniform(0.5, 1.5))
             
             page.evaluate("window.scrollTo(0, document.body.scrollHeight * 0.9)")
-            time.sleep(random.uniform(0.5, 1.0))
+            self.sleep(random.uniform(0.5, 1.0))
             
             page.evaluate("window.scrollTo(0, 0)")
-            time.sleep(random.uniform(0.3, 0.8))
+            self.sleep(random.uniform(0.3, 0.8))
             
+        except ScrapeCancelled:
+            raise
         except Exception as e:
             logger.warning(f"No se pudo simular scroll: {e}")
     
@@ -82,18 +97,20 @@ class ICIJOffshoreLeaksScraper:
             # Esperar el checkbox y marcarlo
             checkbox = page.locator('input[type="checkbox"]#accept')
             if checkbox.is_visible(timeout=5000):
-                time.sleep(random.uniform(1, 2)) 
+                self.sleep(random.uniform(1, 2)) 
                 checkbox.click()
                 logger.info("Checkbox pasado")
                 
-                time.sleep(random.uniform(0.5, 1.5)) 
+                self.sleep(random.uniform(0.5, 1.5)) 
                 
                 # Submit
                 submit_btn = page.locator('button[type="submit"]').filter(has_text="Submit")
                 submit_btn.click()
                 logger.info("Términos click")
-                time.sleep(random.uniform(2, 4))
+                self.sleep(random.uniform(2, 4))
                 return True
+        except ScrapeCancelled:
+            raise
         except Exception as e:
             logger.warning(f"No se encontró modal de términos: {e}")
             return False
@@ -172,25 +189,37 @@ class ICIJOffshoreLeaksScraper:
         
         return None
     
-    def scrape_search_results(self, query: str, max_pages: int = None) -> Tuple[List[Dict], bool]:
-        entities = []
+    def scrape_search_results(self, query: str, max_pages: int = None,
+                              cancel_token: Optional[CancellationToken] = None) -> Tuple[List[Dict], bool]:
+        entities = list(self.iter_search_results(query, max_pages, cancel_token))
+        self.all_entities = entities
+        return entities, self.human_challenge_detected
+
+    def iter_search_results(self, query: str, max_pages: int = None,
+                            cancel_token: Optional[CancellationToken] = None) -> Iterator[Dict]:
+        """Produce las entidades página a página; al terminar, human_challenge_detected indica si hubo challenge"""
         self.human_challenge_detected = False
+        self.cancel_token = cancel_token
         
         if max_pages is None:
             max_pages = self.MAX_PAGES_PER_RUN
         
         with sync_playwright() as p:
-            browser = p.chromium.launch(
-                headless=self.headless,
-                slow_mo=50  
-            )
+            with telemetry.timed("browser_launch", source="offshore-leaks"):
+                browser = p.chromium.launch(
+                    headless=self.headless,
+                    slow_mo=50 if recording.pacing_enabled() else 0
+                )
             
             context = browser.new_context(
                 user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 viewport={'width': 1920, 'height': 1080},
                 locale='en-US',
-                timezone_id='America/New_York'
+                timezone_id='America/New_York',
+                # Grabar el tráfico de esta búsqueda si UPSTREAM_MODE=record
+                **recording.context_options("offshore-leaks", query)
             )
+            recording.attach_replay(context, "offshore-leaks", query)
             
             page = context.new_page()
             
@@ -201,26 +230,32 @@ class ICIJOffshoreLeaksScraper:
                 while current_url and page_count < max_pages:
                     page_count += 1                    
                     try:
-                        page.goto(current_url, wait_until="networkidle", timeout=30000)
+                        with telemetry.timed("page_load", source="offshore-leaks"):
+                            page.goto(current_url, wait_until="networkidle", timeout=30000)
                     except PlaywrightTimeout:
-                        time.sleep(3)
+                        self.sleep(3)
+                    check(cancel_token)
                     
                     if page_count == 1:
-                        self.accept_terms(page)
+                        with telemetry.timed("accept_terms", source="offshore-leaks"):
+                            self.accept_terms(page)
                         self.human_delay(3, 6)
                     
-                    self.simulate_human_reading(page)
+                    with telemetry.timed("human_reading", source="offshore-leaks"):
+                        self.simulate_human_reading(page)
 
                     html = page.content()
                     
                     if self.detect_human_verification_challenge(html):
                         self.human_challenge_detected = True
+                        telemetry.event("challenge_detected", source="offshore-leaks")
                         break
                     
-                    page_entities = self.extract_entities_from_html(html, query)
+                    with telemetry.timed("parse", source="offshore-leaks"):
+                        page_entities = self.extract_entities_from_html(html, query)
                     
                     if page_entities:
-                        entities.extend(page_entities)
+                        yield from page_entities
                     else:
                         debug_file = f"debug_page_{page_count}.html"
                         with open(debug_file, 'w', encoding='utf-8') as f:
@@ -249,17 +284,21 @@ class ICIJOffshoreLeaksScraper:
                 print(f"Challenge detectado: {'SÍ' if self.human_challenge_detected else 'NO'}")
                 print(f"{'='*60}")
                 
+            except ScrapeCancelled:
+                logger.warning(f"Scraping cancelado: {cancel_token.reason}")
+                raise
             except Exception as e:
                 logger.error(f"Error durante el scraping: {e}")
                 import traceback
                 traceback.print_exc()
                 
             finally:
-                time.sleep(2)
+                # Si se canceló, el navegador se cierra sin esperar
+                if not (cancel_token and cancel_token.cancelled):
+                    self.sleep(2)
+                # El HAR se escribe al cerrar el contexto
+                context.close()
                 browser.close()
-        
-        self.all_entities = entities
-        return entities, self.human_challenge_detected
     
     def display_results(self, entities: List[Dict] = None, max_display: int = 20):
         if entities is None:
@@ -284,23 +323,9 @@ class ICIJOffshoreLeaksScraper:
                 print(f"   URL: {entity['entity_url']}")
             print()
     
-    def get_as_dataframe(self, entities: List[Dict] = None) -> pd.DataFrame:
-        if entities is None:
-            entities = self.all_entities
-        
-        if not entities:
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(entities)
-        
-        print(f"\n{'='*60}")
-        print(f"DATAFRAME - {len(df)} registros")
-        print(f"{'='*60}")
-        print(df[['entity_name', 'jurisdiction', 'linked_to', 'data_from']].head(20))
-        
-        return df
-    
-    def save_to_csv(self, entities: List[Dict] = None, filename: str = None) -> str:
+    def save(self, entities: List[Dict] = None, fmt: str = "csv", filename: str = None,
+             compression: Optional[str] = "default") -> Optional[str]:
+        """Guarda las entidades en output/ como NDJSON, CSV o Parquet"""
         if entities is None:
             entities = self.all_entities
         
@@ -308,48 +333,21 @@ class ICIJOffshoreLeaksScraper:
             logger.warning("No hay datos para guardar")
             return None
         
-        if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"icij_offshore_leaks_{timestamp}.csv"
-        
-        os.makedirs('output', exist_ok=True)
-        filepath = os.path.join('output', filename)
-        
-        df = pd.DataFrame(entities)
-        df.to_csv(filepath, index=False, encoding='utf-8-sig')
-        
-        logger.info(f"Datos guardados en CSV: {filepath}")
-        print(f"Done CSV: {filepath}")
+        filepath = os.path.join('output', filename) if filename else export.default_path("icij_offshore_leaks", fmt)
+        count = export.export_records(entities, filepath, fmt, compression)
         
+        logger.info(f"{count} entidades guardadas en {fmt.upper()}: {filepath}")
         return filepath
     
-    def save_to_json(self, entities: List[Dict] = None, filename: str = None) -> str:
-        if entities is None:
-            entities = self.all_entities
-        
-        if not entities:
-            logger.warning("No hay datos para guardar")
-            return None
-        
-        if not filename:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"icij_offshore_leaks_{timestamp}.json"
-        
-        os.makedirs('output', exist_ok=True)
-        filepath = os.path.join('output', filename)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump({
-                'timestamp': datetime.now().isoformat(),
-                'source': self.SEARCH_URL,
-                'total_entities': len(entities),
-                'challenge_detected': self.human_challenge_detected,
-                'data': entities
-            }, f, indent=2, ensure_ascii=False)
-        
-        logger.info(f"Datos guardados en JSON: {filepath}")
-        print(f"Done JSON: {filepath}")
-        
+    def export_search_results(self, query: str, fmt: str = "ndjson", filename: str = None,
+                              max_pages: int = None, compression: Optional[str] = "default",
+                              cancel_token: Optional[CancellationToken] = None) -> Optional[str]:
+        """Scrapea y escribe cada página a medida que llega, sin juntar todo en memoria"""
+        filepath = os.path.join('output', filename) if filename else export.default_path("icij_offshore_leaks", fmt)
+        with export.ExportWriter(filepath, fmt, compression) as writer:
+            writer.write_all(self.iter_search_results(query, max_pages, cancel_token))
+        
+        logger.info(f"{writer.count} entidades exportadas en {fmt.upper()}: {filepath}")
         return filepath
 
 # Esto ya no se usa en este archivo, pero útil para pruebas rápidas
@@ -362,6 +360,7 @@ def main():
         print("="*60)
         print("1. Buscar entidades (con límite de seguridad)")
         print("2. Ver resultados actuales")
+        print("3. Guardar resultados actuales")
         print("="*60)
         
         opcion = input("\nSelecciona una opción: ").strip()
@@ -383,6 +382,16 @@ def main():
         
         elif opcion == "2":
             scraper.display_results()
+        
+        elif opcion == "3":
+            fmt = input(f"Formato ({', '.join(OUTPUT_FORMATS)}, Enter = csv): ").strip() or "csv"
+            try:
+                filepath = scraper.save(fmt=fmt)
+            except export.ExportError as e:
+                print(f"\n {e}")
+            else:
+                if filepath:
+                    print(f"Done {fmt.upper()}: {filepath}")
         else:
             print("\n No es una opción válida.")
 
@@ -0,0 +1,219 @@
+"""
+Grabación y reproducción del tráfico con las fuentes.
+
+Con UPSTREAM_MODE=record cada búsqueda guarda lo que intercambió con la fuente:
+un HAR de Playwright por búsqueda para OFAC e ICIJ y el request/response HTTP
+para el World Bank. Con UPSTREAM_MODE=replay los scrapers no salen a la red:
+las páginas se sirven desde esos archivos y un request sin grabación se aborta.
+
+UPSTREAM_REPLAY_TIMING=recorded respeta lo que tardó cada respuesta al grabar;
+fast responde al instante y además omite las pausas humanas de los scrapers,
+para que las pruebas de rendimiento y de regresión sean deterministas.
+"""
+import base64
+import collections
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Deque, Dict, Optional, Tuple
+
+from requests import PreparedRequest, Response
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+MODE = os.getenv("UPSTREAM_MODE", "live")  # live | record | replay
+RECORDINGS_DIR = os.getenv("UPSTREAM_RECORDINGS_DIR", "recordings")
+REPLAY_TIMING = os.getenv("UPSTREAM_REPLAY_TIMING", "recorded")  # recorded | fast
+
+# El body ya se guarda decodificado, estas cabeceras no aplican al reproducirlo
+_SKIPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class RecordingNotFound(Exception):
+    """No hay grabación para una búsqueda en modo replay"""
+
+
+def recording_path(source: str, key: str, extension: str) -> str:
+    # Nombre legible más un hash corto para no mezclar búsquedas parecidas
+    slug = re.sub(r"[^a-z0-9]+", "-", key.lower()).strip("-")[:60] or "empty"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:8]
+    return os.path.join(RECORDINGS_DIR, source, f"{slug}-{digest}.{extension}")
+
+
+def pacing_enabled() -> bool:
+    """Las pausas humanas solo tienen sentido contra el sitio real o al reproducir con tiempos"""
+    return not (MODE == "replay" and REPLAY_TIMING == "fast")
+
+
+def _replay_delay(seconds: float):
+    if REPLAY_TIMING == "recorded" and seconds > 0:
+        time.sleep(seconds)
+
+
+# Playwright
+
+def _har_started(entry: Dict) -> Optional[float]:
+    # startedDateTime es ISO 8601 con "Z"; fromisoformat no la acepta antes de Python 3.11
+    started = entry.get("startedDateTime")
+    if not started:
+        return None
+    try:
+        return datetime.fromisoformat(started.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def context_options(source: str, key: str) -> Dict:
+    """Opciones extra para browser.new_context(); el HAR se escribe al cerrar el contexto"""
+    if MODE != "record":
+        return {}
+    path = recording_path(source, key, "har")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return {"record_har_path": path, "record_har_content": "embed"}
+
+
+def attach_replay(context, source: str, key: str):
+    """En modo replay sirve todos los requests del contexto desde el HAR grabado"""
+    if MODE != "replay":
+        return
+
+    path = recording_path(source, key, "har")
+    if not os.path.exists(path):
+        raise RecordingNotFound(f"No recording for {source} '{key}' at {path}")
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)["log"]["entries"]
+
+    # Las respuestas a la misma URL se devuelven en el orden en que se grabaron
+    pending: Dict[Tuple[str, str], Deque[Dict]] = collections.defaultdict(collections.deque)
+    for entry in entries:
+        pending[(entry["request"]["method"], entry["request"]["url"])].append(entry)
+    last: Dict[Tuple[str, str], Dict] = {}
+    # Cada navegación fija el ancla: sus subrecursos se responden cuando terminaron al grabar,
+    # contado desde el inicio de la navegación (los que iban en paralelo no se suman)
+    anchor = {"recorded": None, "replayed": None}
+
+    def wait_until_recorded(route, entry: Dict):
+        started = _har_started(entry)
+        if REPLAY_TIMING != "recorded" or started is None:
+            return
+        if route.request.is_navigation_request() or anchor["recorded"] is None:
+            anchor["recorded"], anchor["replayed"] = started, time.monotonic()
+        ready = anchor["replayed"] + (started - anchor["recorded"]) + max(entry.get("time", 0), 0) / 1000
+        delay = ready - time.monotonic()
+        if delay <= 0:
+            return
+        try:
+            page = route.request.frame.page
+        except Exception:
+            # Requests sin página (p. ej. service workers)
+            page = None
+        if page is None:
+            time.sleep(delay)
+        else:
+            # Espera sin bloquear el dispatcher de Playwright: los demás requests se siguen
+            # atendiendo mientras tanto, como en paralelo al grabar
+            page.wait_for_timeout(delay * 1000)
+
+    def handle(route):
+        request = route.request
+        key = (request.method, request.url)
+        queue = pending.get(key)
+        entry = queue.popleft() if queue else last.get(key)
+        if entry is None:
+            # Nunca se sale a la red en modo replay
+            route.abort()
+            return
+        last[key] = entry
+
+        wait_until_recorded(route, entry)
+        response = entry["response"]
+        content = response.get("content", {})
+        text = content.get("text", "")
+        body = base64.b64decode(text) if content.get("encoding") == "base64" else text.encode()
+        headers = {header["name"]: header["value"] for header in response.get("headers", [])
+                   if header["name"].lower() not in _SKIPPED_HEADERS}
+        route.fulfill(status=response["status"], headers=headers, body=body)
+
+    context.route("**/*", handle)
+
+
+# requests (World Bank)
+
+def _exchange_key(request: PreparedRequest) -> str:
+    return f"{request.method} {request.url}"
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Hace el request real y guarda request, response y tiempo en un JSON"""
+
+    def __init__(self, source: str, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.source = source
+        self._lock = threading.Lock()
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        # Lee el body completo; la descarga por bloques sigue funcionando sobre el contenido leído
+        body = response.content
+        exchange = {
+            "request": {"method": request.method, "url": request.url},
+            "response": {
+                "status": response.status_code,
+                "headers": {name: value for name, value in response.headers.items()
+                            if name.lower() not in _SKIPPED_HEADERS},
+                "body": base64.b64encode(body).decode()
+            },
+            "time": time.perf_counter() - started
+        }
+        path = recording_path(self.source, _exchange_key(request), "json")
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(exchange, f)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Responde con el intercambio grabado para el mismo método y URL"""
+
+    def __init__(self, source: str):
+        super().__init__()
+        self.source = source
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        path = recording_path(self.source, _exchange_key(request), "json")
+        if not os.path.exists(path):
+            raise RecordingNotFound(f"No recording for {self.source} '{_exchange_key(request)}' at {path}")
+        with open(path, encoding="utf-8") as f:
+            exchange = json.load(f)
+
+        _replay_delay(exchange.get("time", 0))
+        response = Response()
+        response.status_code = exchange["response"]["status"]
+        response.headers = CaseInsensitiveDict(exchange["response"]["headers"])
+        response.raw = io.BytesIO(base64.b64decode(exchange["response"]["body"]))
+        response.url = request.url
+        response.request = request
+        response.encoding = None
+        return response
+
+    def close(self):
+        pass
+
+
+def mount(session, source: str):
+    """Instala en una sesión de requests el adaptador del modo actual"""
+    if MODE == "record":
+        adapter = RecordingAdapter(source)
+    elif MODE == "replay":
+        adapter = ReplayAdapter(source)
+    else:
+        return
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
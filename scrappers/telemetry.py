@@ -0,0 +1,75 @@
+"""
+Telemetría liviana para los scrapers.
+
+Los scrapers solo registran tiempos de cada etapa (lanzar el navegador, cargar
+la página, pausas humanas, parseo) y eventos (challenges detectados); quién los
+consume lo decide la API con add_sink. Sin sinks ni colector activo el costo
+es una llamada vacía.
+
+collect() junta los registros del contexto actual (el hilo del worker o la
+tarea asyncio del request) para armar el desglose por request. Cuando el
+scraper corre en un subproceso no hay sinks: los registros viajan con el
+resultado y se reproducen en el proceso de la API con replay().
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# (tipo, nombre, valor, etiquetas, inicio): tipo es "timing" (valor en segundos)
+# o "event" (cantidad); inicio es el timestamp Unix en que empezó
+Record = Tuple[str, str, float, Dict[str, str], float]
+
+_sinks: List[Callable[[Record], None]] = []
+# Una variable de contexto se comporta como local al hilo en los workers y local a la tarea en asyncio
+_records: contextvars.ContextVar[Optional[List[Record]]] = contextvars.ContextVar("telemetry_records", default=None)
+
+
+def add_sink(sink: Callable[[Record], None]):
+    _sinks.append(sink)
+
+
+def attach(records: List[Record]):
+    """Agrega registros ya reportados a los sinks al colector del contexto actual"""
+    collected = _records.get()
+    if collected is not None:
+        collected.extend(records)
+
+
+def _emit(record: Record):
+    attach([record])
+    for sink in _sinks:
+        sink(record)
+
+
+def timing(name: str, seconds: float, **labels):
+    _emit(("timing", name, seconds, labels, time.time() - seconds))
+
+
+def event(name: str, **labels):
+    _emit(("event", name, 1, labels, time.time()))
+
+
+@contextmanager
+def timed(name: str, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing(name, time.perf_counter() - started, **labels)
+
+
+@contextmanager
+def collect():
+    """Junta los registros emitidos en este contexto mientras dure el bloque"""
+    records: List[Record] = []
+    token = _records.set(records)
+    try:
+        yield records
+    finally:
+        _records.reset(token)
+
+
+def replay(records: List[Record]):
+    for record in records:
+        _emit(record)
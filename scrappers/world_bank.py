@@ -1,6 +1,4 @@
 import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 import json
 from datetime import datetime
 import time
@@ -8,7 +6,11 @@ import os
 from dotenv import load_dotenv
 from typing import List, Dict, Optional
 import logging
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+from bisect import bisect_right
+
+from scrappers.cancellation import CancellationToken, check, sleep
+from scrappers import export, recording, telemetry
+from config import OUTPUT_FORMATS
 
 logging.basicConfig(
     level=logging.INFO,
@@ -30,43 +32,58 @@ class WorldBankScraper:
         }
         self.session = requests.Session()
         self.session.headers.update(self.headers)
+        # En modo record/replay los requests pasan por el grabador (UPSTREAM_MODE)
+        recording.mount(self.session, "world-bank")
         self.all_firms = []  
         self.api_firms = []  
         self.web_firms = []  
         
-    def fetch_api_data(self, params: Dict = None, retries: int = 3) -> Optional[Dict]:
+    def fetch_api_data(self, params: Dict = None, retries: int = 3,
+                       cancel_token: Optional[CancellationToken] = None) -> Optional[Dict]:
         if params is None:
             params = {}
             
         for attempt in range(retries):
+            check(cancel_token)
             try:               
-                response = self.session.get(
+                # El with cierra la respuesta (y devuelve la conexión al pool) también si se
+                # cancela a mitad de la descarga o falla raise_for_status
+                with telemetry.timed("download", source="world-bank"), self.session.get(
                     self.API_URL,
                     params=params,
-                    timeout=30
-                )                
-                response.raise_for_status()
+                    timeout=30,
+                    stream=True
+                ) as response:
+                    response.raise_for_status()
+                    
+                    # Descarga por bloques para poder abandonarla si se cancela
+                    chunks = []
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        check(cancel_token)
+                        chunks.append(chunk)
+                    body = b"".join(chunks)
                 
-                data = response.json()
+                with telemetry.timed("parse", source="world-bank"):
+                    data = json.loads(body)
                 logger.info(f"Obtención correcta de datos")
                 return data
                 
             except requests.HTTPError as e:
                 if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
+                    sleep(2 ** attempt, cancel_token)
                 else:
                     return None
                     
             except requests.RequestException as e:
                 logger.warning(f"Error al consultar API (intento {attempt + 1}): {e}")
                 if attempt < retries - 1:
-                    time.sleep(2 ** attempt)
+                    sleep(2 ** attempt, cancel_token)
                 else:
                     logger.error(f"Fallo tras {retries} intentos")
                     return None
                     
             except json.JSONDecodeError as e:
-                print(f"Respuesta: {response.text[:500]}")
+                print(f"Respuesta: {body[:500].decode('utf-8', errors='replace')}")
                 return None
     
     def parse_api_response(self, data: Dict) -> List[Dict]:
@@ -110,6 +127,41 @@ class WorldBankScraper:
                 filtered.append(firm)        
         return filtered
     
+    def match_names(self, names: List[str], firms: List[Dict] = None) -> Dict[str, List[Dict]]:
+        # Búsqueda de muchos nombres en una sola pasada: los SUPP_NAME se indexan una sola vez
+        # en un texto único y cada nombre se busca con str.find, sin recorrer la lista por nombre
+        if firms is None:
+            firms = self.all_firms
+        
+        matches = {name: [] for name in names}
+        if not firms:
+            logger.warning("No hay empresas para filtrar")
+            return matches
+        
+        offsets = []
+        parts = []
+        position = 0
+        for firm in firms:
+            supp_name = (firm.get('SUPP_NAME') or '').lower().replace('\n', ' ')
+            offsets.append(position)
+            parts.append(supp_name)
+            position += len(supp_name) + 1
+        haystack = '\n'.join(parts)
+        
+        for name in names:
+            needle = name.lower().strip()
+            if not needle or '\n' in needle:
+                continue
+            start = haystack.find(needle)
+            while start != -1:
+                index = bisect_right(offsets, start) - 1
+                matches[name].append(firms[index])
+                # Continuar desde la siguiente empresa para no repetir coincidencias
+                if index + 1 >= len(offsets):
+                    break
+                start = haystack.find(needle, offsets[index + 1])
+        return matches
+    
     def search_by_filters(self, 
                           name: str = None, 
                           country: str = None,
@@ -170,8 +222,23 @@ class WorldBankScraper:
         print(f"\nGROUNDS: {firm.get('DEBAR_REASON', 'N/A')}")
         print("="*60)
     
-    def scrape(self, params: Dict = None) -> List[Dict]:        
-        data = self.fetch_api_data(params)
+    def export(self, firms: List[Dict] = None, fmt: str = "csv", filename: str = None,
+               compression: Optional[str] = "default") -> Optional[str]:
+        """Guarda las firmas en output/ como NDJSON, CSV o Parquet, fila a fila"""
+        if firms is None:
+            firms = self.all_firms
+        
+        if not firms:
+            logger.warning("No hay datos para guardar")
+            return None
+        
+        filepath = os.path.join('output', filename) if filename else export.default_path("world_bank_debarred_firms", fmt)
+        count = export.export_records(firms, filepath, fmt, compression)
+        logger.info(f"{count} empresas guardadas en {fmt.upper()}: {filepath}")
+        return filepath
+    
+    def scrape(self, params: Dict = None, cancel_token: Optional[CancellationToken] = None) -> List[Dict]:        
+        data = self.fetch_api_data(params, cancel_token=cancel_token)
         
         if not data:
             logger.error("No se pudo obtener datos de la API")
@@ -211,13 +278,14 @@ def main():
         print("="*60)
         print("1. Ver todas las empresas")
         print("2. Buscar por nombre")
+        print("3. Guardar todas las empresas")
         print("="*60)
         
         opcion = input("\nSelecciona una opción: ").strip()
         
         if opcion == "1":
             # Ver todas
-            df = client.get_as_dataframe(all_firms)
+            client.display_firm_list(all_firms)
             print(f"\n✅ Total: {len(all_firms)} empresas")
             
         elif opcion == "2":
@@ -235,6 +303,15 @@ def main():
                             client.display_firm_details(firm)
                 else:
                     print("\n No se encontraron resultados")
+        
+        elif opcion == "3":
+            fmt = input(f"Formato ({', '.join(OUTPUT_FORMATS)}, Enter = csv): ").strip() or "csv"
+            try:
+                filepath = client.export(all_firms, fmt)
+            except export.ExportError as e:
+                print(f"\n {e}")
+            else:
+                print(f"Done {fmt.upper()}: {filepath}")
         else:
             print("\n No es una opción")
 
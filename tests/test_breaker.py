@@ -0,0 +1,44 @@
+import time
+
+from api.breaker import CircuitBreaker
+
+
+def half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("ofac")
+    breaker.record_challenge("Human verification required")
+    assert breaker.state == "open"
+    # Vence el plazo: la próxima búsqueda pasa como prueba
+    breaker.open_until = time.monotonic() - 1
+    return breaker
+
+
+def test_in_flight_failure_during_half_open_does_not_reopen():
+    breaker = half_open_breaker()
+    allowed, probe = breaker.allow()
+    assert allowed and probe
+    assert breaker.state == "half_open"
+
+    # Búsquedas que ya estaban en curso cuando se abrió el breaker
+    breaker.record_failure("Timeout 30000ms exceeded")
+    breaker.record_challenge("Human verification required")
+
+    assert breaker.state == "half_open"
+    assert breaker.trips == 1
+    assert breaker.snapshot()["window_requests"] == 3
+
+    breaker.record_success(probe=True)
+    assert breaker.state == "closed"
+
+
+def test_probe_failure_reopens_with_backoff():
+    breaker = half_open_breaker()
+    first_open = breaker.open_until
+    allowed, probe = breaker.allow()
+    assert allowed and probe
+
+    breaker.record_failure("Timeout 30000ms exceeded", probe=True)
+
+    assert breaker.state == "open"
+    assert breaker.trips == 2
+    assert breaker.reason == "Probe failed: Timeout 30000ms exceeded"
+    assert breaker.open_until > first_open
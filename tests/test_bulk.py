@@ -0,0 +1,58 @@
+import asyncio
+
+from api.bulk import stream_bulk_screening
+
+
+def collect(names, session_sources):
+    async def run():
+        return [line async for line in stream_bulk_screening(names, {}, {}, session_sources)]
+    return asyncio.run(asyncio.wait_for(run(), timeout=10))
+
+
+def test_session_failing_before_taking_names_reports_every_name():
+    # La sesión falla antes de tomar nombres (p. ej. Chromium no arranca): no debe quedar colgado
+    def screener(names):
+        raise RuntimeError("browser failed to launch")
+        yield
+
+    lines = collect(["a", "b", "c"], {"ofac": (screener, 2)})
+
+    results = [line for line in lines if line["type"] == "result"]
+    assert sorted(line["query"] for line in results) == ["a", "b", "c"]
+    assert all(line["error"] == "browser failed to launch" for line in results)
+    assert lines[-1]["type"] == "summary"
+
+
+def test_session_answers_every_name():
+    def screener(names):
+        for name in names:
+            yield name, {"hits": 1, "results": [{"name": name}], "error": None}
+
+    lines = collect(["a", "b", "c"], {"ofac": (screener, 2)})
+
+    results = [line for line in lines if line["type"] == "result"]
+    assert sorted(line["query"] for line in results) == ["a", "b", "c"]
+    assert all(line["error"] is None for line in results)
+
+
+def test_worker_dying_before_emitting_reports_every_name():
+    # El pool falla antes de correr el worker de sesión: el stream no debe esperar para siempre
+    class BrokenExecutor:
+        async def run(self, func, *args, **kwargs):
+            raise RuntimeError("executor shut down")
+
+    def screener(names):
+        for name in names:
+            yield name, {"hits": 0, "results": [], "error": None}
+
+    async def run():
+        return [line async for line in stream_bulk_screening(
+            ["a", "b"], {}, {}, {"ofac": (screener, 2)}, session_executors={"ofac": BrokenExecutor()}
+        )]
+    lines = asyncio.run(asyncio.wait_for(run(), timeout=10))
+
+    results = [line for line in lines if line["type"] == "result"]
+    assert sorted(line["query"] for line in results) == ["a", "b"]
+    assert all(line["error"] == "executor shut down" for line in results)
+    assert lines[-1]["type"] == "summary"
+    assert lines[-1]["completed"] == 2
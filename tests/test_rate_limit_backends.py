@@ -0,0 +1,73 @@
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from api.rate_limit_backends import MemoryBackend, RedisBackend, SQLiteBackend
+
+WINDOW = 60
+# Mitad de una ventana: el uso de la anterior pesa 0.5
+NOW = 6000 + WINDOW / 2
+
+
+@pytest.fixture
+def redis_backend():
+    pytest.importorskip("redis")
+    pytest.importorskip("lupa")
+    redis_standin = pytest.importorskip("benchmarks.redis_standin")
+    standin = redis_standin.RedisStandIn().start()
+    try:
+        yield RedisBackend(standin.url)
+    finally:
+        standin.stop()
+
+
+def test_redis_hit_at_the_limit_boundary(redis_backend):
+    assert redis_backend.hit("key", NOW, WINDOW, 5, cost=2) == (True, (6000, 2, 0))
+    assert redis_backend.hit("key", NOW, WINDOW, 5, cost=2) == (True, (6000, 4, 0))
+    # 4 + 2 > 5: se rechaza sin sumar, pero una unidad todavía entra justo en el límite
+    assert redis_backend.hit("key", NOW, WINDOW, 5, cost=2) == (False, (6000, 4, 0))
+    assert redis_backend.hit("key", NOW, WINDOW, 5, cost=1) == (True, (6000, 5, 0))
+    assert redis_backend.hit("key", NOW, WINDOW, 5, cost=1) == (False, (6000, 5, 0))
+    assert redis_backend.peek("key", NOW, WINDOW) == (6000, 5, 0)
+
+
+def test_redis_script_matches_memory_backend(redis_backend):
+    memory = MemoryBackend()
+    # Cruza ventanas: la anterior pesa según el tiempo transcurrido y dos ventanas después no cuenta
+    steps = [(6001, 3), (6030, 2), (6059, 1), (6061, 2), (6075, 3), (6090, 1), (6119, 2), (6200, 4), (6201, 2)]
+    for now, cost in steps:
+        assert redis_backend.hit("key", now, WINDOW, 5, cost) == memory.hit("key", now, WINDOW, 5, cost)
+
+
+def test_redis_admits_exactly_max_requests_across_clients(redis_backend):
+    url = redis_backend.client.connection_pool.connection_kwargs
+    backends = [RedisBackend(f"redis://{url['host']}:{url['port']}/0") for _ in range(4)]
+    with ThreadPoolExecutor(max_workers=len(backends)) as pool:
+        results = list(pool.map(lambda i: backends[i % len(backends)].hit("shared", NOW, WINDOW, 50)[0], range(200)))
+    assert results.count(True) == 50
+
+
+def _sqlite_worker(path: str, hits: int, max_requests: int, start, queue):
+    # Cada proceso abre su propia conexión, como un worker de uvicorn
+    backend = SQLiteBackend(path)
+    start.wait()
+    queue.put(sum(backend.hit("shared", NOW, WINDOW, max_requests)[0] for _ in range(hits)))
+
+
+def test_sqlite_admits_exactly_max_requests_across_processes(tmp_path):
+    path = str(tmp_path / "rate_limits.sqlite3")
+    SQLiteBackend(path)
+    context = multiprocessing.get_context("spawn")
+    start = context.Event()
+    queue = context.Queue()
+    workers = [context.Process(target=_sqlite_worker, args=(path, 40, 50, start, queue)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    start.set()
+    admitted = [queue.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join(timeout=10)
+
+    assert sum(admitted) == 50
+    assert SQLiteBackend(path).peek("shared", NOW, WINDOW) == (6000, 50, 0)